@@ -0,0 +1,68 @@
+"""Benchmark for writing Anki packages.
+
+Run with `python benchmarks/bench_apkg.py` from the repository root. It writes a package with 100k notes in 1000 decks
+with genanki (a `genanki.Note` per item) and with the writer of manki. Then 10 notes are changed and the package of
+manki is updated.
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from genanki import Deck, Model, Note, Package
+
+from manki.exporter.apkg_writer import ApkgWriter
+
+N_NOTES = 100_000
+NOTES_PER_DECK = 100
+N_CHANGED = 10
+MODEL = Model(
+    1234567890,
+    "Benchmark",
+    fields=[{"name": "Front"}, {"name": "Back"}],
+    templates=[{"name": "Card", "qfmt": "{{Front}}", "afmt": "{{FrontSide}}<hr/>{{Back}}"}],
+)
+
+
+def notes(deck: int, changed: bool = False):
+    for i in range(deck * NOTES_PER_DECK, (deck + 1) * NOTES_PER_DECK):
+        answer = "a changed answer" if changed and i % (N_NOTES // N_CHANGED) == 0 else "some more text"
+        yield i, [f"<p>Question {i}?</p>", f"<p>Answer {i} with {answer}.</p>"]
+
+
+def write_genanki(file_name: Path):
+    decks = []
+    for d in range(N_NOTES // NOTES_PER_DECK):
+        deck = Deck(d + 1, f"Benchmark::Deck {d}")
+        for guid, fields in notes(d):
+            deck.add_note(Note(model=MODEL, fields=fields, guid=guid))
+        decks.append(deck)
+    Package(decks).write_to_file(file_name)
+
+
+def write_manki(file_name: Path, changed: bool = False):
+    writer = ApkgWriter(MODEL)
+    for d in range(N_NOTES // NOTES_PER_DECK):
+        writer.add_deck(d + 1, f"Benchmark::Deck {d}")
+        for guid, fields in notes(d, changed):
+            writer.add_note(guid, fields)
+    if changed:
+        writer.update(file_name)
+    else:
+        writer.write(file_name)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'':>10}{'write [s]':>12}")
+        for name, write in [
+            ("genanki", lambda: write_genanki(Path(directory, "genanki.apkg"))),
+            ("manki", lambda: write_manki(Path(directory, "manki.apkg"))),
+            ("update", lambda: write_manki(Path(directory, "manki.apkg"), changed=True)),
+        ]:
+            start = time.perf_counter()
+            write()
+            print(f"{name:>10}{time.perf_counter() - start:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark for compressing the media files of Anki packages.
+
+Run with `python benchmarks/bench_compression.py` from the repository root. It writes a package with 40 images of
+2 MB, half of them compressed already (like PNG or JPEG), half of them text (like SVG): deflating all of them in one
+thread, with the default compression in one thread and with the default compression in one thread per CPU.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from genanki import Model
+
+from manki.exporter.apkg_writer import ApkgWriter
+
+N_IMAGES = 20
+IMAGE_SIZE = 2 * 2**20
+MODEL = Model(
+    1234567890,
+    "Benchmark",
+    fields=[{"name": "Front"}, {"name": "Back"}],
+    templates=[{"name": "Card", "qfmt": "{{Front}}", "afmt": "{{FrontSide}}<hr/>{{Back}}"}],
+)
+
+
+def create_media(directory: Path):
+    media = []
+    for i in range(N_IMAGES):
+        png = directory.joinpath(f"image-{i}.png")
+        png.write_bytes(os.urandom(IMAGE_SIZE))
+        svg = directory.joinpath(f"image-{i}.svg")
+        circles = (f'<circle cx="{j % 997}" cy="{j % 991}" r="{j % 13}"/>' for j in range(IMAGE_SIZE // 36))
+        svg.write_text("".join(circles))
+        media += [(png.name, png), (svg.name, svg)]
+    return media
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        media = create_media(Path(directory))
+        print(f"{'':>16}{'write [s]':>12}{'size [MB]':>12}")
+        for name, compression, workers in [
+            ("deflate all", {".png": 6}, 1),
+            ("policy", None, 1),
+            (f"policy, {os.cpu_count()} CPUs", None, None),
+        ]:
+            writer = ApkgWriter(MODEL, compression, workers)
+            writer.add_deck(1, "Benchmark")
+            file_name = Path(directory, "benchmark.apkg")
+            start = time.perf_counter()
+            writer.write(file_name, media)
+            print(f"{name:>16}{time.perf_counter() - start:>12.2f}{file_name.stat().st_size / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
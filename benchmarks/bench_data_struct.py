@@ -0,0 +1,80 @@
+"""Memory benchmark for the items of a package.
+
+Run with `python benchmarks/bench_data_struct.py` from the repository root. It builds a package with 100k items and
+compares its memory usage with items that are plain dataclasses (as `QAItem` was before it used `__slots__`).
+"""
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List
+
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.util import get_hash
+
+N_ITEMS = 100_000
+ITEMS_PER_CHAPTER = 100
+TAGS = ["lecture", "exam", "optional"]
+
+
+@dataclass
+class DataclassItem:
+    question: str
+    answer: str
+    comment: str = None
+    tags: List[str] = None
+    media: List[str] = field(default_factory=list)
+    item_id: str = field(init=False)
+
+    def __post_init__(self):
+        self.item_id = get_hash(self.question + self.answer)
+
+
+def create_fields(i: int):
+    # the tags are read from the sources, so every item gets its own (equal) strings
+    return f"<p>Question {i}?</p>", f"<p>Answer {i}.</p>", None, ["".join(tag) for tag in TAGS[: i % 4]], []
+
+
+def create_items(item_cls):
+    return [item_cls(*create_fields(i)) for i in range(N_ITEMS)]
+
+
+def create_package():
+    package = QAPackage("Benchmark", ["Manki"])
+    for i in range(0, N_ITEMS, ITEMS_PER_CHAPTER):
+        chapter = QAChapter(f"Chapter {i // ITEMS_PER_CHAPTER}")
+        package.add_chapter(chapter)
+        for j in range(i, i + ITEMS_PER_CHAPTER):
+            chapter.add_item(QAItem(*create_fields(j)))
+    return package
+
+
+def measure(create):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = create()
+    duration = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, duration
+
+
+def main():
+    print(f"{'':>16}{'memory [MB]':>14}{'time [ms]':>12}")
+    for name, create in [
+        ("dataclass items", lambda: create_items(DataclassItem)),
+        ("QAItem", lambda: create_items(QAItem)),
+        ("QAPackage", create_package),
+    ]:
+        result, size, duration = measure(create)
+        print(f"{name:>16}{size / 2**20:>14.1f}{duration * 1e3:>12.1f}")
+        del result
+
+    package = create_package()
+    start = time.perf_counter()
+    for _ in range(1000):
+        package.n_items
+    print(f"1000 x n_items: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark for the HTML parsers that can be selected with `processor.html_parser`.
+
+Run with `python benchmarks/bench_html_parser.py` from the repository root. Every available parser imports the test
+projects and a large synthetic deck (without using the cache).
+"""
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+from manki.configuration import MankiConfig
+from manki.importer.importer_markdown import MarkdownImporter
+from manki.util import resolve_html_parser
+
+PARSERS = ["html.parser", "lxml", "html5lib"]
+TEST_PROJECTS = ["plain", "math", "images", "code"]
+N_SYNTHETIC_ITEMS = 2000
+
+
+def create_synthetic_project(path: Path) -> Path:
+    items = []
+    for i in range(N_SYNTHETIC_ITEMS):
+        if i % 100 == 0:
+            items.append(f"# Chapter {i // 100}\n")
+        items.append(
+            f"## Question {i} with $x_{i}^2$?\n\n"
+            f"Answer with **bold** text, a [link](https://example.com/{i}) and math:\n\n"
+            f"$$\\sum_{{k=0}}^{{{i}}} k$$\n\n"
+            "- first\n- second\n  - nested\n\n"
+            "| A | B |\n| - | - |\n| 1 | 2 |\n\n"
+            "---\n\nA comment.\n"
+        )
+    path.joinpath("synthetic.md").write_text("\n".join(items))
+    path.joinpath("manki.toml").write_text('[general]\ntitle = "Synthetic"\n\n[input]\nsource = ["synthetic.md"]\n')
+    return path
+
+
+def import_project(path: Path, parser: str) -> float:
+    config = MankiConfig(root=path)
+    config.set("cache.enabled", False)
+    config.set("processor.html_parser", parser)
+    importer = MarkdownImporter(config)
+    sources = {src: path.joinpath(src).read_text() for src in config.get("input.source")}
+    start = time.perf_counter()
+    importer.create_package(sources)
+    return time.perf_counter() - start
+
+
+def main():
+    warnings.simplefilter("ignore")
+    parsers = [parser for parser in PARSERS if resolve_html_parser(parser) == parser]
+    with tempfile.TemporaryDirectory() as tmp:
+        projects = {name: Path("tests").joinpath(name) for name in TEST_PROJECTS}
+        projects["synthetic"] = create_synthetic_project(Path(tmp))
+
+        # warm up, so that the first parser does not pay for imports and compiled regular expressions
+        for path in projects.values():
+            import_project(path, parsers[0])
+
+        print(f"{'project':>12}" + "".join(f"{parser:>14}" for parser in parsers) + "   [ms]")
+        for name, path in projects.items():
+            times = [import_project(path, parser) for parser in parsers]
+            print(f"{name:>12}" + "".join(f"{t * 1e3:>14.1f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
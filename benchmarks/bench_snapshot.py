@@ -0,0 +1,61 @@
+"""Benchmark for package snapshots.
+
+Run with `python benchmarks/bench_snapshot.py` from the repository root. It saves and loads a package with 100k items
+as snapshot and, for comparison, as JSON (as it is stored in the import cache).
+"""
+import json
+import time
+import zlib
+
+from manki import snapshot
+from manki.data_struct import QAChapter, QAItem, QAPackage
+
+N_ITEMS = 100_000
+ITEMS_PER_CHAPTER = 100
+
+
+def create_package() -> QAPackage:
+    package = QAPackage("Benchmark", ["Manki"])
+    for i in range(0, N_ITEMS, ITEMS_PER_CHAPTER):
+        chapter = QAChapter(f"Chapter {i // ITEMS_PER_CHAPTER}")
+        for j in range(i, i + ITEMS_PER_CHAPTER):
+            chapter.add_item(
+                QAItem(
+                    f"<p>Question {j} with <span>\\(x_{{{j}}}^2\\)</span>?</p>",
+                    f"<p>Answer {j}.</p><p><img alt=\"\" src=\"img/figure_{j % 50}.png\"/></p>",
+                    tags=["lecture", f"week-{j % 12}"],
+                    media=[f"img/figure_{j % 50}.png"],
+                )
+            )
+        package.add_chapter(chapter)
+    return package
+
+
+def save_json(package: QAPackage) -> bytes:
+    return zlib.compress(json.dumps([chapter.to_dict() for chapter in package.chapters]).encode("utf-8"))
+
+
+def load_json(data: bytes):
+    return [QAChapter.from_dict(chapter) for chapter in json.loads(zlib.decompress(data))]
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    package = create_package()
+    print(f"{'':>10}{'size [kB]':>12}{'save [ms]':>12}{'load [ms]':>12}")
+    for name, save, load in [
+        ("snapshot", lambda pack: snapshot.dumps(pack, "."), lambda data: snapshot.loads(data, ".")),
+        ("json", save_json, load_json),
+    ]:
+        data, save_time = measure(save, package)
+        _, load_time = measure(load, data)
+        print(f"{name:>10}{len(data) / 1024:>12.0f}{save_time * 1e3:>12.0f}{load_time * 1e3:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Benchmark for splitting a converted document into chapters and items.
+
+Run with `python benchmarks/bench_splitter.py`. The time per item should stay (roughly) constant with a growing number
+of items, i.e. the splitter scales linearly.
+"""
+import time
+
+from bs4 import BeautifulSoup
+
+from manki.util import split_at_tags
+
+ITEMS_PER_CHAPTER = 50
+
+
+def create_document(n_items: int) -> str:
+    html = []
+    for i in range(n_items):
+        if i % ITEMS_PER_CHAPTER == 0:
+            html.append(f"<h1>Chapter {i // ITEMS_PER_CHAPTER}</h1>\n")
+        html.append(f"<h2>Question {i}?</h2>\n<p>Answer {i} with <strong>markup</strong>.</p>\n<ul><li>A</li></ul>\n")
+    return "".join(html)
+
+
+def split(soup: BeautifulSoup) -> int:
+    n_items = 0
+    for chapter in split_at_tags("h1", soup.contents):
+        n_items += len(split_at_tags("h2", chapter[1:]))
+    return n_items
+
+
+def main():
+    print(f"{'items':>8} {'total [ms]':>12} {'per item [us]':>14}")
+    for n_items in [1000, 2000, 4000, 8000, 16000]:
+        soup = BeautifulSoup(create_document(n_items), features="html.parser")
+        start = time.perf_counter()
+        assert split(soup) == n_items
+        duration = time.perf_counter() - start
+        print(f"{n_items:>8} {duration * 1e3:>12.2f} {duration / n_items * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
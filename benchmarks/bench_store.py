@@ -0,0 +1,64 @@
+"""Benchmark for packages stored in SQLite.
+
+Run with `python benchmarks/bench_store.py` from the repository root. It builds a package with 100k items in memory
+and in an SQLite database, compares the memory that is kept by the package and measures a full iteration and a query
+of the items of one chapter with one tag.
+"""
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.store import SQLitePackage
+
+N_ITEMS = 100_000
+ITEMS_PER_CHAPTER = 100
+
+
+def fill(package):
+    for i in range(0, N_ITEMS, ITEMS_PER_CHAPTER):
+        chapter = QAChapter(f"Chapter {i // ITEMS_PER_CHAPTER}")
+        for j in range(i, i + ITEMS_PER_CHAPTER):
+            chapter.add_item(
+                QAItem(f"<p>Question {j}?</p>", f"<p>Answer {j} with some more text.</p>", tags=[f"week-{j % 12}"])
+            )
+        package.add_chapter(chapter)
+    return package
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'':>8}{'memory [MB]':>14}{'build [ms]':>12}{'iterate [ms]':>14}{'query [ms]':>12}")
+        for name, create in [
+            ("memory", lambda: QAPackage("Benchmark", ["Manki"])),
+            ("sqlite", lambda: SQLitePackage(Path(directory, "package.sqlite"), "Benchmark", ["Manki"])),
+        ]:
+            tracemalloc.start()
+            package, build_time = measure(lambda: fill(create()))
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            _, iterate_time = measure(lambda: sum(1 for chp in package.chapters for _ in chp.items))
+            chapter = package.chapters[500]
+            if isinstance(package, SQLitePackage):
+                query = lambda: list(package.query(chapter_id=chapter.chapter_id, tag="week-3"))  # noqa: E731
+            else:
+                query = lambda: [itm for itm in chapter.items if "week-3" in itm.tags]  # noqa: E731
+            _, query_time = measure(query)
+            print(
+                f"{name:>8}{size / 2**20:>14.1f}{build_time * 1e3:>12.0f}{iterate_time * 1e3:>14.0f}"
+                f"{query_time * 1e3:>12.2f}"
+            )
+            if isinstance(package, SQLitePackage):
+                package.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark for loading the templates.
+
+Run with `python benchmarks/bench_templates.py` from the repository root. It loads all templates of the `lrt`
+template, as a new run of manki does: without a bytecode cache (compiling every template), with a warm bytecode cache
+in the cache directory and with the environment that is shared within a process (e.g. by the builds of watch mode).
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from manki.configuration import template_environment
+
+TEMPLATE_DIR = Path(__file__).parent.parent.joinpath("templates")
+TEMPLATE_DIRS = (TEMPLATE_DIR.joinpath("lrt"), TEMPLATE_DIR.joinpath("default"))
+TEMPLATES = [
+    "html/page.html.j2",
+    "html/chapter.html.j2",
+    "anki/question.html.j2",
+    "anki/answer.html.j2",
+    "anki/style.css.j2",
+    "anki/preamble.html.j2",
+]
+REPEAT = 20
+
+
+def load_all(env):
+    for name in TEMPLATES:
+        env.get_template(name)
+
+
+def measure(create_env) -> float:
+    """Returns the mean time to load all templates in ms."""
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        load_all(create_env())
+    return (time.perf_counter() - start) / REPEAT * 1e3
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+
+        def new_env(cache_dir=None):
+            # a new process does not know the environment of the previous one
+            template_environment.cache_clear()
+            return template_environment(TEMPLATE_DIRS, cache_dir)
+
+        load_all(new_env(Path(cache_dir)))
+        print(f"{'':>16}{'load [ms]':>12}")
+        print(f"{'compile':>16}{measure(new_env):>12.2f}")
+        print(f"{'bytecode cache':>16}{measure(lambda: new_env(Path(cache_dir))):>12.2f}")
+        shared = new_env(Path(cache_dir))
+        print(f"{'shared':>16}{measure(lambda: shared):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
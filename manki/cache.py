@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+CACHE_DIR = ".manki-cache"
+
+
+def hash_key(*parts: Any) -> str:
+    """Creates a stable key from arbitrary (JSON serializable) parts."""
+    sha = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        sha.update(part.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+class DiskCache:
+    """A simple key-value store on disk. Every entry is stored in its own file inside of `directory`, the key is used
+    as the file name.
+
+    If `max_size` (in bytes) is given, the least recently used entries are removed as soon as the entries exceed this
+    size. The modification time of an entry is updated whenever it is read, so it marks the last usage.
+    """
+
+    def __init__(self, directory: Path, max_size: Optional[int] = None):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory.joinpath(key[:2], key)
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*/*"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                pass
+        return entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+        except OSError:
+            return None
+        if self.max_size is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return value
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        try:
+            old_size = path.stat().st_size
+        except OSError:
+            old_size = 0
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first so that concurrent runs never read half written entries. Every writer
+            # has its own file, so that two runs writing the same key do not write into the same file.
+            fd, tmp = tempfile.mkstemp(prefix=f".{key}.", suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write cache entry '%s': %s", path, e)
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return
+
+        if self.max_size is not None:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            else:
+                # an entry that is overwritten is replaced, not added
+                self._size += len(value) - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache has shrunk to 90 % of its maximum size."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        self._size = sum(stat.st_size for _, stat in entries)
+        n_removed = 0
+        for path, stat in entries:
+            if self._size <= 0.9 * self.max_size:
+                break
+            try:
+                path.unlink()
+                self._size -= stat.st_size
+                n_removed += 1
+            except OSError:
+                pass
+        logger.debug("Removed %d entries from the cache '%s'", n_removed, self.directory)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value.decode("utf-8"))
+        except ValueError:
+            logger.debug("Ignoring corrupt cache entry '%s'", key)
+            return None
+
+    def set_json(self, key: str, value: Any):
+        self.set(key, json.dumps(value).encode("utf-8"))
+
+
+def project_cache(config, name: str, max_size: Optional[int] = None) -> Optional[DiskCache]:
+    """Returns the cache `name` inside of the projects cache directory or `None` if caching is disabled.
+
+    Args:
+        config (MankiConfig): The projects configuration
+        name (str): The name of the cache (a subdirectory of the cache directory)
+        max_size (Optional[int]): The maximum size of the cache in bytes
+    """
+    if not config.get("cache.enabled", True):
+        return None
+    root = Path(config.get("general.root"))
+    return DiskCache(root.joinpath(config.get("cache.dir", CACHE_DIR), name), max_size=max_size)
@@ -1,5 +1,7 @@
 import argparse
 
+from manki.snapshot import SUFFIX
+
 parser = argparse.ArgumentParser(prog="Manki",
                                  add_help=True,
                                  description="This program allows you to convert question and answer-style markdown "
@@ -30,8 +32,8 @@ parser.add_argument(
 parser.add_argument(
     "--format", "-f",
     type=str,
-    default="apkg",
-    help="Output format to be converted to. Default is 'apkg' which is the default Anki-package format. "
+    help="Output format(s) to be converted to, several formats are separated by commas (e.g. 'apkg,html,pdf'). "
+         "Default is 'output.formats' of the configuration or else 'apkg' which is the default Anki-package format. "
          "Other options are 'pdf' or 'html' or custom defined output types"
 )
 parser.add_argument(
@@ -41,6 +43,30 @@ parser.add_argument(
     const="my_anki_project",
     help="Create a new dummy project with some defaults."
 )
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    help="Number of processes that convert the source files in parallel. Use 0 to use all available cores. "
+         "Overrides 'input.jobs' of the configuration"
+)
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    default=False,
+    help="Pass the chapters one after another from the sources to the output to keep the memory usage low"
+)
+parser.add_argument(
+    "--watch", "-w",
+    action="store_true",
+    default=False,
+    help="Build the project again whenever a source, the macros, an image, the template or the configuration changes"
+)
+parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    default=False,
+    help="Do not use the cache in the project directory and convert all sources from scratch"
+)
 parser.add_argument(
     "--git-action",
     action="store_true",
@@ -64,4 +90,45 @@ parser.add_argument(
     action="store_true",
     default=False,
     help="Set the output to DEBUG mode"
+)
+subparsers = parser.add_subparsers(dest="command", metavar="command")
+serve_parser = subparsers.add_parser(
+    "serve",
+    help="Serve a live preview of the HTML export that is updated whenever a file of the project changes"
+)
+serve_parser.add_argument(
+    "--host",
+    type=str,
+    default="127.0.0.1",
+    help="The address the preview is served at. Default is '127.0.0.1'"
+)
+serve_parser.add_argument(
+    "--port", "-p",
+    type=int,
+    default=8000,
+    help="The port the preview is served at. Default is 8000"
+)
+import_parser = subparsers.add_parser(
+    "import",
+    help="Import the sources and save the package to a snapshot that can be exported later on"
+)
+import_parser.add_argument(
+    "--output", "-o",
+    type=str,
+    help=f"The file the snapshot is saved to. Default is the sanitized title with the suffix '{SUFFIX}'"
+)
+export_parser = subparsers.add_parser(
+    "export",
+    help="Export a package from a snapshot instead of importing the sources again"
+)
+export_parser.add_argument(
+    "snapshot",
+    type=str,
+    help="The snapshot created by 'manki import'"
+)
+export_parser.add_argument(
+    "--format", "-f",
+    type=str,
+    default=argparse.SUPPRESS,
+    help="Output format to be converted to, see the '--format' of the main command"
 )
\ No newline at end of file
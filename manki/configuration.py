@@ -1,12 +1,15 @@
+import copy
 from datetime import datetime
-from functools import reduce
+from functools import lru_cache, reduce
 from pathlib import Path
-from typing import Any, Dict, Union
-from jinja2 import ChoiceLoader, Environment, FileSystemLoader
+from typing import List, Optional, Tuple, Union
+from jinja2 import BytecodeCache, ChoiceLoader, Environment, FileSystemLoader
+from jinja2.bccache import Bucket
 import toml
 
 import logging
 
+from manki.cache import CACHE_DIR, DiskCache
 from manki.util import ensure_list
 
 
@@ -25,16 +28,59 @@ def get_dict_branches(tree, parent_path=()):
             yield current_path + (node,)
 
 
+class TemplateBytecodeCache(BytecodeCache):
+    """Stores the compiled templates in the cache directory of the project, so that they do not have to be compiled
+    again on the next run. Jinja checks the source of a template before it uses the cached code, so changed templates
+    are compiled again.
+    """
+
+    def __init__(self, directory: Path):
+        self.cache = DiskCache(directory)
+
+    def load_bytecode(self, bucket: Bucket):
+        data = self.cache.get(bucket.key)
+        if data is not None:
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket: Bucket):
+        self.cache.set(bucket.key, bucket.bytecode_to_string())
+
+
+@lru_cache(maxsize=None)
+def template_environment(template_dirs: Tuple[Path, ...], cache_dir: Optional[Path] = None) -> Environment:
+    """Returns the environment for the templates in `template_dirs`. It is created once per process, so every
+    template is loaded and compiled only once, even if the configuration is loaded again (e.g. in watch mode).
+
+    Args:
+        template_dirs (Tuple[Path, ...]): The template directories, the first one that contains a template is used
+        cache_dir (Optional[Path]): The directory of the bytecode cache, templates are not cached on disk if not given
+    """
+    loader = ChoiceLoader([FileSystemLoader(directory) for directory in template_dirs])
+    bytecode_cache = TemplateBytecodeCache(cache_dir) if cache_dir is not None else None
+    return Environment(loader=loader, bytecode_cache=bytecode_cache)
+
+
 class MankiConfig(object):
     def __init__(self, root: Union[str, Path], file_name="manki.toml") -> None:
         self.root = Path(root).resolve()
         self._config_file = self.root.joinpath(file_name)
         self._config_dict = {}
-        self.template_env: Environment = None
+        self.template_dirs: List[Path] = []
+        self._frozen = False
         self._load_config_file()
         self._init_template()
         self._update_config()
 
+    @property
+    def template_env(self) -> Environment:
+        """The template environment, shared by all configurations with the same templates. The compiled templates
+        are cached in the cache directory, unless caching is disabled.
+        """
+        cache_dir = None
+        if self.get("cache.enabled", True):
+            cache_dir = self.root.joinpath(self.get("cache.dir", CACHE_DIR), "templates")
+        return template_environment(tuple(self.template_dirs), cache_dir)
+
     def get(self, key: str, default=None):
         return reduce(
             lambda d, key: d.get(key, default) if isinstance(d, dict) else default,
@@ -42,7 +88,21 @@ class MankiConfig(object):
             self._config_dict,
         )
 
+    def freeze(self) -> "MankiConfig":
+        """Returns a read-only copy of the configuration. Exporters that run in parallel each get their own copy, so
+        none of them can change the configuration of the others.
+
+        Returns:
+            MankiConfig: The frozen copy, `set` raises a `TypeError`
+        """
+        frozen = copy.copy(self)
+        frozen._config_dict = copy.deepcopy(self._config_dict)
+        frozen._frozen = True
+        return frozen
+
     def set(self, key: str, value, overwrite=True):
+        if self._frozen:
+            raise TypeError(f"The configuration is frozen, '{key}' cannot be set")
         keys = key.split(".")
         dic = self._config_dict
         for key in keys[:-1]:
@@ -52,9 +112,18 @@ class MankiConfig(object):
 
         dic[keys[-1]] = value
 
-    def render_template(self, name: str):
-        self.template_env.globals = self._config_dict
-        return self.template_env.get_template(name).render()
+    def render_template(self, name: str, **context):
+        # the configuration is passed with the context instead of as globals of the (shared) environment, so that
+        # templates can be rendered from several threads at once
+        return self.template_env.get_template(name).render({**self._config_dict, **context})
+
+    def dump_template(self, name: str, file_path: Union[str, Path], **context):
+        """Renders a template like `render_template`, but writes the output to `file_path` chunk by chunk while it is
+        rendered. So the whole output never has to be kept in memory.
+        """
+        stream = self.template_env.get_template(name).stream({**self._config_dict, **context})
+        with open(file_path, "w") as f:
+            stream.dump(f)
 
     def _load_config_file(self):
         logger.debug("Loading configuration file from '%s", self._config_file)
@@ -75,13 +144,7 @@ class MankiConfig(object):
     def _init_template(self):
         TMPLT_PATH = Path(__file__).parent.parent.joinpath("templates").resolve()
         tmplt_name = self.get("general.template", default="default")
-        loader = ChoiceLoader(
-            [
-                FileSystemLoader(TMPLT_PATH.joinpath(tmplt_name)),
-                FileSystemLoader(TMPLT_PATH.joinpath("default")),
-            ]
-        )
-        self.template_env = Environment(loader=loader)
+        self.template_dirs = [TMPLT_PATH.joinpath(tmplt_name), TMPLT_PATH.joinpath("default")]
 
     def _update_config(self):
         """This method is called to update some values in the config object. This includes
@@ -90,7 +153,9 @@ class MankiConfig(object):
         - Ensuring that the authors are given as a list.
         """
         MANKI_TOML = "manki.toml.j2"
-        config = self.render_template("_common/" + MANKI_TOML)
+        # `--no-cache` is only applied after the configuration is loaded, so this template is not cached on disk
+        template = template_environment(tuple(self.template_dirs)).get_template("_common/" + MANKI_TOML)
+        config = template.render(self._config_dict)
         if config:
             config = toml.loads(config)
             for branch in get_dict_branches(config):
@@ -1,9 +1,11 @@
 import importlib.resources as pkg_resources
 import json
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 from bs4.element import PageElement, ResultSet
 from genanki import Note, Deck, Model, Package
 from .deck import AnkiDeck
+from .media import MediaRegistry
+from .util import parse_html
 from typing import List, Union
 
 import markdown
@@ -29,9 +31,9 @@ class Html2AnkiDeck:
     def __init__(self, raw_html: str, model: Model, root: Union[Path, str]):
         raw_html = raw_html.replace("\n", "")
         splitted = ["<h1" + i for i in raw_html.split("<h1") if i]
-        self.html_raw = [BeautifulSoup(i, features="html.parser") for i in splitted]
+        self.html_raw = [parse_html(i) for i in splitted]
         self.model: Model = model
-        self.media = []
+        self.media = MediaRegistry()
         self.decks = []
         self._root: Path = Path(root)
 
@@ -93,36 +95,10 @@ class Html2AnkiDeck:
                 img: Tag
                 for img in elem.find_all("img", recursive=True):
                     img_path = self._root.joinpath(img.attrs["src"]).resolve()
-                    if img_path.exists():
-                        if not self._is_duplicate_image(img_path):
-                            self.media.append(img_path)
-                            img.attrs["src"] = img_path.name
-                            logger.debug("Found image: '%s' at '%s'", img.attrs["src"], img_path)
-                        else:
-                            logger.debug("Skipping duplicate image")
-                    else:
-                        logger.warning("Image at '%s' does not exists. Ignoring it.", img_path)
-
-    def _is_duplicate_image(self, img_path: Path):
-        for path in self.media:
-            if path == img_path:
-                logger.info(
-                    "Reusing image '%s' at '%s'",
-                    img_path.name,
-                    img_path,
-                )
-                return False
-            elif path.name == img_path.name:
-                logger.warning(
-                    "A (different) image of name '%s' is already used. "
-                    + "Please rename the image to prevent unwanted results! "
-                    + "Current image is at '%s', but I already use an image at '%s'",
-                    img_path.name,
-                    img_path,
-                    path,
-                )
-                return True
-        return False
+                    name = self.media.add(img_path)
+                    if name is not None:
+                        img.attrs["src"] = name
+                        logger.debug("Found image: '%s' at '%s'", img.attrs["src"], img_path)
 
 
 class Markdown2AnkiDeck:
@@ -1,54 +1,196 @@
-from dataclasses import asdict, dataclass, field
-from functools import reduce
-from pathlib import Path
-from typing import Any, Dict, List, Union
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from .media import MediaRegistry
 from .util import get_hash
 
 
-@dataclass
 class QAItem:
     """
     Question-answer pair with an optional comment.
     Questions and answers have to be formatted with valid HTML.
+
+    Items use `__slots__` to keep large packages small in memory. The `item_id` is derived from the question and the
+    answer when it is used for the first time. It does not change if the question or the answer are changed later on
+    (e.g. when the sources of images are rewritten), so the ID of an item stays the same through all processors.
     """
 
-    question: str
-    answer: str
-    comment: str = None
-    tags: List[str] = None
-    item_id: str = field(init=False)
+    __slots__ = ("_question", "_answer", "comment", "_tags", "media", "_item_id")
+
+    def __init__(
+        self,
+        question: str,
+        answer: str,
+        comment: str = None,
+        tags: Iterable[str] = None,
+        media: List[str] = None,
+    ):
+        self._question = question
+        self._answer = answer
+        self.comment = comment
+        self.tags = tags
+        self.media: List[str] = media if media is not None else []
+        """The sources of all images in the item, as given by their `src` attribute"""
+        self._item_id: Optional[int] = None
+
+    @property
+    def question(self) -> str:
+        return self._question
+
+    @question.setter
+    def question(self, question: str):
+        self._freeze_id()
+        self._question = question
+
+    @property
+    def answer(self) -> str:
+        return self._answer
+
+    @answer.setter
+    def answer(self, answer: str):
+        self._freeze_id()
+        self._answer = answer
+
+    @property
+    def tags(self) -> Optional[Tuple[str, ...]]:
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags: Optional[Iterable[str]]):
+        if isinstance(tags, str):
+            tags = [tags]
+        # the same tags are used by many items, interned they are stored only once
+        self._tags = tuple(sys.intern(tag) for tag in tags) if tags is not None else None
+
+    @property
+    def item_id(self) -> int:
+        if self._item_id is None:
+            self._item_id = get_hash(self._question + self._answer)
+        return self._item_id
+
+    def _freeze_id(self):
+        # the ID always depends on the original question and answer
+        self.item_id
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, QAItem):
+            return NotImplemented
+        return (self.question, self.answer, self.comment, self.tags, self.media, self.item_id) == (
+            other.question,
+            other.answer,
+            other.comment,
+            other.tags,
+            other.media,
+            other.item_id,
+        )
 
-    def __post_init__(self):
-        self.item_id = get_hash(self.question + self.answer)
+    def __repr__(self) -> str:
+        return (
+            f"QAItem(question={self.question!r}, answer={self.answer!r}, comment={self.comment!r}, "
+            f"tags={self.tags!r}, media={self.media!r}, item_id={self.item_id!r})"
+        )
+
+    def __getstate__(self) -> Tuple:
+        return self._question, self._answer, self.comment, self._tags, self.media, self._item_id
+
+    def __setstate__(self, state: Tuple):
+        self._question, self._answer, self.comment, self._tags, self.media, self._item_id = state
 
     def to_dict(self) -> Dict[str, Any]:
         dct = {}
         dct["question"] = self.question
         dct["answer"] = self.answer
         dct["comment"] = self.comment
-        dct["tags"] = self.tags
+        dct["tags"] = list(self.tags) if self.tags is not None else None
+        dct["media"] = self.media
         dct["item_id"] = self.item_id
         return dct
 
-@dataclass()
+    @classmethod
+    def from_dict(cls, dct: Dict[str, Any]) -> "QAItem":
+        item = cls(dct["question"], dct["answer"], dct.get("comment"), dct.get("tags"), dct.get("media", []))
+        item._item_id = dct.get("item_id")
+        return item
+
+
 class QAChapter:
     """
     A chapter with multiple QA-items
+
+    Items have to be added with `add_item` or `insert_item` (and removed with `remove_item`), so that the package of
+    the chapter can keep track of the number of its items. `items` is a tuple for this reason.
     """
 
-    title: str
-    items: List[QAItem] = field(default_factory=list)
-    chapter_id: str = field(init=False)
+    __slots__ = ("_title", "_items", "_chapter_id", "_package")
+
+    def __init__(self, title: str, items: Iterable[QAItem] = None):
+        self._title = title
+        self._items: List[QAItem] = []
+        self._chapter_id: Optional[int] = None
+        # the package that contains the chapter (if any)
+        self._package: Optional["QAPackage"] = None
+        self._add_items(items or ())
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, title: str):
+        self.chapter_id
+        self._title = title
+
+    @property
+    def items(self) -> Tuple[QAItem, ...]:
+        return tuple(self._items)
 
-    def __post_init__(self):
-        self.chapter_id = get_hash(self.title)
+    @property
+    def chapter_id(self) -> int:
+        if self._chapter_id is None:
+            self._chapter_id = get_hash(self._title)
+        return self._chapter_id
 
     def add_item(self, item: QAItem):
-        self.items.append(item)
+        self._items.append(item)
+        if self._package is not None:
+            self._package._n_items += 1
+
+    def insert_item(self, index: int, item: QAItem):
+        self._items.insert(index, item)
+        if self._package is not None:
+            self._package._n_items += 1
+
+    def remove_item(self, item: QAItem):
+        """Removes the first item that is equal to `item` like `list.remove`."""
+        self._items.remove(item)
+        if self._package is not None:
+            self._package._n_items -= 1
+
+    def _add_items(self, items: Iterable[QAItem]):
+        # adds many items at once (e.g. when a chapter is loaded)
+        n_items = len(self._items)
+        self._items.extend(items)
+        if self._package is not None:
+            self._package._n_items += len(self._items) - n_items
 
     @property
     def n_items(self) -> int:
-        return len(self.items)
+        return len(self._items)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, QAChapter):
+            return NotImplemented
+        return (self.title, self._items) == (other.title, other._items)
+
+    def __repr__(self) -> str:
+        return f"QAChapter(title={self.title!r}, items={self.items!r}, chapter_id={self.chapter_id!r})"
+
+    def __getstate__(self) -> Tuple:
+        # the package is not part of the state, chapters are pickled on their own (e.g. to pass them between processes)
+        return self._title, self._items, self._chapter_id
+
+    def __setstate__(self, state: Tuple):
+        self._title, self._items, self._chapter_id = state
+        self._package = None
 
     def to_dict(self) -> Dict[str, Any]:
         dct = {}
@@ -58,36 +200,93 @@ class QAChapter:
         dct["items"] = [itm.to_dict() for itm in self.items]
         return dct
 
+    @classmethod
+    def from_dict(cls, dct: Dict[str, Any]) -> "QAChapter":
+        return cls(dct["title"], [QAItem.from_dict(itm) for itm in dct["items"]])
+
 
-@dataclass()
 class QAPackage:
-    """Contains one or more chapters with questions and answers."""
+    """Contains one or more chapters with questions and answers.
 
-    title: str
-    author: Union[str, List[str]]
-    chapters: List[QAChapter] = field(default_factory=list)
-    media: List[Path] = field(default_factory=list)
-    package_id: str = field(init=False)
+    The number of items is counted when chapters and items are added, so `n_items` does not have to visit all
+    chapters.
+    """
+
+    __slots__ = ("title", "author", "_chapters", "media", "_package_id", "_n_items")
+
+    def __init__(
+        self,
+        title: str,
+        author: Union[str, List[str]],
+        chapters: List[QAChapter] = None,
+        media: MediaRegistry = None,
+    ):
+        self.title = title
+        self.author = author
+        self._chapters: List[QAChapter] = []
+        self.media: MediaRegistry = media if media is not None else MediaRegistry()
+        self._package_id: Optional[int] = None
+        self._n_items = 0
+        for chapter in chapters or []:
+            self.add_chapter(chapter)
 
-    def __post_init__(self):
-        self.package_id = get_hash(self.title)
+    @property
+    def chapters(self) -> Tuple[QAChapter, ...]:
+        return tuple(self._chapters)
+
+    @property
+    def package_id(self) -> int:
+        if self._package_id is None:
+            self._package_id = get_hash(self.title)
+        return self._package_id
 
     def add_chapter(self, chapter: QAChapter):
-        self.chapters.append(chapter)
+        self._chapters.append(chapter)
+        chapter._package = self
+        self._n_items += chapter.n_items
+
+    def remove_chapter(self, chapter: QAChapter):
+        """Removes the first chapter that is equal to `chapter` with all of its items like `list.remove`."""
+        removed = self._chapters.pop(self._chapters.index(chapter))
+        removed._package = None
+        self._n_items -= removed.n_items
 
     @property
     def n_chapters(self) -> int:
-        return len(self.chapters)
+        return len(self._chapters)
 
     @property
     def n_items(self) -> int:
-        return sum([chap.n_items for chap in self.chapters])
+        return self._n_items
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, QAPackage):
+            return NotImplemented
+        return (self.title, self.author, self._chapters, self.media) == (
+            other.title,
+            other.author,
+            other._chapters,
+            other.media,
+        )
+
+    def __repr__(self) -> str:
+        return f"QAPackage(title={self.title!r}, author={self.author!r}, chapters={self.chapters!r})"
+
+    def __getstate__(self) -> Tuple:
+        return self.title, self.author, self._chapters, self.media, self._package_id
+
+    def __setstate__(self, state: Tuple):
+        self.title, self.author, chapters, self.media, self._package_id = state
+        self._chapters = []
+        self._n_items = 0
+        for chapter in chapters:
+            self.add_chapter(chapter)
 
     def to_dict(self) -> Dict[str, Any]:
         dct = {}
         dct["title"] = self.title
         dct["author"] = self.author
-        dct["media"] = self.media
+        dct["media"] = list(self.media)
         dct["package_id"] = self.package_id
         dct["n_chapters"] = self.n_chapters
         dct["n_items"] = self.n_items
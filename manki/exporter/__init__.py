@@ -0,0 +1,71 @@
+"""The registry of all output formats.
+
+Exporters are only imported when their format is used, as some of them pull in large dependencies (e.g. genanki or
+pdfkit). Besides the built-in formats, other packages can provide exporters with an entry point in the group
+`manki.exporters`, the name of the entry point is the format:
+
+    [options.entry_points]
+    manki.exporters =
+        csv = my_package.exporter:CsvExporter
+"""
+from importlib import import_module
+from typing import Dict, List, Type
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+ENTRY_POINT_GROUP = "manki.exporters"
+
+# the built-in exporters as 'module:class'
+EXPORTERS: Dict[str, str] = {
+    "apkg": "manki.exporter.exporter_anki:AnkiExporter",
+    "html": "manki.exporter.exporter_html:HTMLExporter",
+    "pdf": "manki.exporter.exporter_pdf:PdfExporter",
+}
+
+
+def _entry_points() -> list:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        return []
+
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return list(eps.select(group=ENTRY_POINT_GROUP))
+    return list(eps.get(ENTRY_POINT_GROUP, []))
+
+
+def available_formats() -> List[str]:
+    """Returns the names of all formats, the built-in ones first."""
+    formats = list(EXPORTERS)
+    formats += [ep.name for ep in _entry_points() if ep.name not in EXPORTERS]
+    return formats
+
+
+def get_exporter(name: str) -> Type:
+    """Imports the exporter of a format. The entry points are only searched if there is no built-in exporter for the
+    format, so using a built-in format does not have to scan the installed packages.
+
+    Args:
+        name (str): The name of the format, e.g. `"apkg"`
+
+    Raises:
+        KeyError: If there is no exporter for the format
+
+    Returns:
+        Type[MankiExporter]: The exporter class
+    """
+    if name in EXPORTERS:
+        module, _, cls = EXPORTERS[name].partition(":")
+        return getattr(import_module(module), cls)
+
+    for ep in _entry_points():
+        if ep.name == name:
+            logger.debug("Loading the exporter '%s' from '%s'", name, ep.value)
+            return ep.load()
+    raise KeyError(name)
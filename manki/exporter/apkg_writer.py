@@ -0,0 +1,550 @@
+"""A writer for Anki packages (`.apkg`).
+
+It writes the same collection as `genanki.Package`, but without a `genanki.Note` per item: the notes are moved to a
+temporary database while they are added, so that only a batch of them is kept in memory. When the package is written,
+they are converted to rows batch by batch and inserted with `executemany` in a single transaction, instead of one
+statement (and one query of the collection) per note and card. The models and decks are still described by genanki, so
+their JSON stays the same.
+
+Unlike genanki, the checksum of the sort field of the notes (`csum`) is filled in, as Anki computes it. Anki uses it
+to find duplicates.
+
+A package can also be updated: the collection of the previous build is compared with the notes by GUID and deck, only
+notes that changed are written again. Media files that did not change are copied from the previous archive without
+compressing them again.
+
+The members of the archive are compressed by their extension (see `COMPRESSION`): formats that are compressed already
+(e.g. PNG or JPEG) are stored, all others are deflated. Large members are deflated in parallel before they are added
+to the archive. The level of a deflated member is kept as its comment, so that it is deflated again if the level
+changes.
+"""
+from hashlib import sha1
+from html import unescape
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+import itertools
+import json
+import os
+from pathlib import Path
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import zipfile
+import zlib
+
+from genanki import Deck, Model
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+INSERT_NOTES = "INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?)"
+INSERT_CARDS = "INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+# the ID of the default deck of a collection
+DEFAULT_DECK = "1"
+CHUNK_SIZE = 2**20
+# the number of notes that are kept in memory: moved to the temporary database or converted to rows at once
+BATCH_SIZE = 10_000
+STORE = "store"
+# the compression of the members of the archive by extension: `STORE` or the level of deflate, `"*"` is the default
+COMPRESSION: Dict[str, Union[str, int]] = {
+    "*": 6,
+    **{
+        ext: STORE
+        for ext in [".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".mp3", ".ogg", ".m4a", ".mp4", ".webm", ".zip"]
+    },
+}
+# members of at least this size are deflated in parallel, smaller ones while they are added to the archive
+PARALLEL_SIZE = 2**18
+# the fixed part of the local header of a member of a zip archive, the name and the extra field follow it
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+# `ZipFile.write` and `ZipFile.writestr` only take the level of deflate since Python 3.7
+_COMPRESSLEVEL = sys.version_info >= (3, 7)
+
+
+def _raw_members_supported() -> bool:
+    """Checks if data that is compressed already can be added to an archive (see `_write_member`). `zipfile` has no
+    API for this, the internals that are used instead are the same from Python 3.6 to 3.13.
+    """
+    return (3, 6) <= sys.version_info[:2] <= (3, 13) and all(
+        hasattr(zipfile.ZipInfo, name) for name in ("FileHeader", "from_file")
+    )
+
+
+# whether members are deflated in parallel and copied from a previous package, otherwise they are all compressed by
+# `ZipFile.write`
+RAW_MEMBERS = _raw_members_supported()
+
+# the same expressions as `stripHTMLMedia` of Anki
+_IMG = re.compile(r"(?i)<img[^>]+src=[\"']?([^\"'>]+)[\"']?[^>]*>")
+_COMMENT = re.compile(r"(?s)<!--.*?-->")
+_STYLE = re.compile(r"(?si)<style.*?>.*?</style>")
+_SCRIPT = re.compile(r"(?si)<script.*?>.*?</script>")
+_TAG = re.compile(r"(?s)<.*?>")
+
+
+def _strip_html_media(text: str) -> str:
+    text = _IMG.sub(r" \1 ", text)
+    for expression in (_COMMENT, _STYLE, _SCRIPT, _TAG):
+        text = expression.sub("", text)
+    return unescape(text).strip()
+
+
+def field_checksums(fields: Iterable[str]) -> List[int]:
+    """Returns the checksums of the fields as Anki computes them: the first 8 hex digits of the SHA1 of the field
+    without HTML.
+    """
+    return [int(sha1(_strip_html_media(field).encode("utf-8")).hexdigest()[:8], 16) for field in fields]
+
+
+class ApkgWriter:
+    """Collects the decks and notes of a package and writes them as `.apkg`.
+
+    All notes use the same model. The cards of the notes are created when the package is written, with the same IDs
+    genanki would give them. Until then, the notes are kept in a temporary database (which is removed with the
+    writer).
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        compression: Optional[Dict[str, Union[str, int]]] = None,
+        workers: Optional[int] = None,
+    ):
+        """
+        Args:
+            model (Model): The model of all notes
+            compression (Optional[Dict[str, Union[str, int]]]): Changes of the compression of the members by
+                extension (see `COMPRESSION`)
+            workers (Optional[int]): The number of threads that deflate large members, defaults to the number of CPUs
+
+        Raises:
+            ValueError: If the compression of an extension is neither `"store"` nor a level from 0 to 9
+        """
+        self.model = model
+        self.compression = {**COMPRESSION, **{ext.lower(): level for ext, level in (compression or {}).items()}}
+        for ext, level in self.compression.items():
+            if level != STORE and (isinstance(level, bool) or level not in range(10)):
+                raise ValueError(f"The compression of '{ext}' must be '{STORE}' or a level from 0 to 9, not '{level}'")
+        self.workers = workers or os.cpu_count() or 1
+        self.decks: List[Deck] = []
+        # the number of notes of every deck (decks of different chapters may have the same ID)
+        self._n_notes: List[int] = []
+        # the deck ID, GUID, fields and tags of the notes that are not moved to the temporary database yet
+        self._pending: List[Tuple[int, Union[str, int], Sequence[str], Sequence[str]]] = []
+        # a private database on disk that is removed when it is closed, the notes are read by the thread that writes
+        # the package
+        self._staged = sqlite3.connect("", check_same_thread=False)
+        self._staged.execute("CREATE TABLE entries (deck, guid, fields, tags)")
+
+    def add_deck(self, deck_id: int, name: str, description: str = "") -> Deck:
+        deck = Deck(deck_id=deck_id, name=name, description=description)
+        self.decks.append(deck)
+        self._n_notes.append(0)
+        return deck
+
+    def add_note(self, guid: Union[str, int], fields: Sequence[str], tags: Sequence[str] = ()):
+        """Adds a note to the deck that was added last."""
+        if len(fields) != len(self.model.fields):
+            raise ValueError(f"The model has {len(self.model.fields)} fields, but the note has {len(fields)} fields")
+        self._n_notes[-1] += 1
+        self._pending.append((self.decks[-1].deck_id, guid, fields, tags))
+        if len(self._pending) >= BATCH_SIZE:
+            self._stage()
+
+    @property
+    def n_notes(self) -> int:
+        return sum(self._n_notes)
+
+    def _stage(self):
+        # moves the pending notes to the temporary database
+        pending, self._pending = self._pending, []
+        with self._staged:
+            rows = [(deck_id, guid, json.dumps(fields), json.dumps(tags)) for deck_id, guid, fields, tags in pending]
+            self._staged.executemany("INSERT INTO entries VALUES(?,?,?,?)", rows)
+
+    def _entries(self) -> Iterator[Tuple[int, Union[str, int], Sequence[str], Sequence[str]]]:
+        # the deck ID, GUID, fields and tags of all notes, deck by deck like genanki writes them
+        self._stage()
+        for deck_id, guid, fields, tags in self._staged.execute("SELECT * FROM entries ORDER BY rowid"):
+            yield deck_id, guid, json.loads(fields), json.loads(tags)
+
+    def _insert_rows(
+        self, conn: sqlite3.Connection, entries: Iterable[tuple], timestamp: float, id_gen: Iterator[int]
+    ) -> Tuple[int, int]:
+        """Inserts the notes and cards of the entries batch by batch, returns the number of notes and cards."""
+        n_notes, n_cards = 0, 0
+        entries = iter(entries)
+        for batch in iter(lambda: list(itertools.islice(entries, BATCH_SIZE)), []):
+            notes, cards = self._rows(batch, timestamp, id_gen)
+            conn.executemany(INSERT_NOTES, notes)
+            conn.executemany(INSERT_CARDS, cards)
+            n_notes, n_cards = n_notes + len(notes), n_cards + len(cards)
+        return n_notes, n_cards
+
+    def _card_ords(self, fields: Sequence[str]) -> List[int]:
+        # a card is only created if its required fields are not empty (like `genanki.Note`)
+        return [
+            card_ord
+            for card_ord, rule, required in self.model._req
+            if (any if rule == "any" else all)(fields[i] for i in required)
+        ]
+
+    def _rows(self, entries: list, timestamp: float, id_gen: Iterator[int]) -> Tuple[List[tuple], List[tuple]]:
+        """Returns the rows of the notes and cards of the entries, the IDs are taken from `id_gen`."""
+        mod = int(timestamp)
+        model_id = self.model.model_id
+        sort_field = self.model.sort_field_index
+        checksums = field_checksums(fields[sort_field] for _, _, fields, _ in entries)
+
+        notes, cards = [], []
+        for (deck_id, guid, fields, tags), checksum in zip(entries, checksums):
+            note_id = next(id_gen)
+            tags, flds = _format_tags(tags), "\x1f".join(fields)
+            notes.append((note_id, guid, model_id, mod, -1, tags, flds, fields[sort_field], checksum, 0, ""))
+            for card_ord in self._card_ords(fields):
+                # a new card that is not scheduled yet
+                cards.append((next(id_gen), note_id, deck_id, card_ord, mod, -1) + (0,) * 11 + ("",))
+        return notes, cards
+
+    def _update_col(self, conn: sqlite3.Connection, timestamp: float):
+        (decks_json,) = conn.execute("SELECT decks FROM col").fetchone()
+        # the default deck of every collection, the decks of a previous build are replaced
+        decks = {DEFAULT_DECK: json.loads(decks_json)[DEFAULT_DECK]}
+        for deck in self.decks:
+            decks[str(deck.deck_id)] = deck.to_json()
+        # genanki adds the model to the decks with notes, it refers to the last of them
+        models: Dict[str, dict] = {}
+        with_notes = [deck.deck_id for deck, n_notes in zip(self.decks, self._n_notes) if n_notes]
+        if with_notes:
+            models[str(self.model.model_id)] = self.model.to_json(timestamp, with_notes[-1])
+        conn.execute("UPDATE col SET decks = ?, models = ?", (json.dumps(decks), json.dumps(models)))
+
+    def _write_collection(self, file_name: str, timestamp: float):
+        conn = _connect(file_name)
+        try:
+            conn.executescript(APKG_SCHEMA)
+            conn.executescript(APKG_COL)
+            with conn:
+                self._update_col(conn, timestamp)
+                # genanki gives the IDs in the same order
+                id_gen = itertools.count(int(timestamp * 1000))
+                n_notes, n_cards = self._insert_rows(conn, self._entries(), timestamp, id_gen)
+        finally:
+            conn.close()
+        logger.debug("Wrote %d notes and %d cards to the collection", n_notes, n_cards)
+
+    def _update_collection(self, file_name: str, timestamp: float):
+        """Changes the collection of a previous build to the current notes. Notes with the same GUID, deck, fields and
+        tags are kept (with their IDs), all other notes of the collection are removed and the new ones are added.
+        """
+        conn = _connect(file_name)
+        try:
+            # the fields of the notes are compared by their digest, so the previous collection is not kept in memory
+            old_notes: Dict[str, Tuple[int, int, str, bytes]] = {}
+            removed: List[int] = []
+            for guid, note_id, model_id, tags, flds in conn.execute("SELECT guid, id, mid, tags, flds FROM notes"):
+                if guid in old_notes:
+                    removed.append(note_id)
+                else:
+                    old_notes[guid] = (note_id, model_id, tags, _digest(flds))
+            # the cards of a note are created in the order of the card templates, a different order only causes the
+            # note to be written again
+            old_cards: Dict[int, List[Tuple[int, int]]] = {}
+            for note_id, card_ord, deck_id in conn.execute("SELECT nid, ord, did FROM cards ORDER BY id"):
+                old_cards.setdefault(note_id, []).append((card_ord, deck_id))
+            n_kept = 0
+
+            def added():
+                nonlocal n_kept
+                for entry in self._entries():
+                    deck_id, guid, fields, tags = entry
+                    old = old_notes.pop(str(guid), None)
+                    if old is not None:
+                        note_id, *note = old
+                        cards = [(card_ord, deck_id) for card_ord in self._card_ords(fields)]
+                        unchanged = note == [self.model.model_id, _format_tags(tags), _digest("\x1f".join(fields))]
+                        if unchanged and cards == old_cards.get(note_id, []):
+                            n_kept += 1
+                            continue
+                        removed.append(note_id)
+                    yield entry
+
+            # the new notes and cards get IDs that are not used by the collection yet
+            (max_id,) = conn.execute(
+                "SELECT max(coalesce((SELECT max(id) FROM notes), 0), coalesce((SELECT max(id) FROM cards), 0))"
+            ).fetchone()
+            id_gen = itertools.count(max(int(timestamp * 1000), max_id + 1))
+            with conn:
+                self._update_col(conn, timestamp)
+                n_added, _ = self._insert_rows(conn, added(), timestamp, id_gen)
+                # the notes that are not part of the package anymore
+                removed += [note_id for note_id, *_ in old_notes.values()]
+                conn.executemany("DELETE FROM cards WHERE nid = ?", [(note_id,) for note_id in removed])
+                conn.executemany("DELETE FROM notes WHERE id = ?", [(note_id,) for note_id in removed])
+        finally:
+            conn.close()
+        logger.debug("Updated the collection: kept %d notes, removed %d and added %d", n_kept, len(removed), n_added)
+
+    def _compression(self, name: str) -> Tuple[int, Optional[int]]:
+        # the compression type and level of a member
+        level = self.compression.get(os.path.splitext(name)[1].lower(), self.compression["*"])
+        if level == STORE:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, level
+
+    def _write_archive(
+        self,
+        file_name: Union[str, Path],
+        collection: str,
+        media: Iterable[Tuple[str, Path]],
+        previous: Optional[zipfile.ZipFile] = None,
+        old_media: Optional[Dict[str, zipfile.ZipInfo]] = None,
+    ):
+        # `old_media` are the media files of the `previous` package by name
+        old_media = old_media or {}
+        media = list(media)
+        members = [("collection.anki2", collection, "collection.anki2")]
+        members += [(str(idx), path, name) for idx, (name, path) in enumerate(media)]
+        n_copied = 0
+
+        with zipfile.ZipFile(file_name, "w") as apkg, ThreadPoolExecutor(self.workers) as executor:
+            # the members are added in order, but the next ones are deflated already. Only a few of them are kept in
+            # memory at the same time.
+            pending: Deque[Callable[[], None]] = deque()
+            for arcname, path, name in members:
+                compress_type, level = self._compression(name)
+                info = old_media.get(name)
+                if (
+                    RAW_MEMBERS
+                    and info is not None
+                    and (info.compress_type, info.comment) == (compress_type, _level_comment(level))
+                    and _same_content(info, path)
+                ):
+                    pending.append(partial(_copy_member, previous, apkg, info, arcname))
+                    n_copied += 1
+                elif RAW_MEMBERS and compress_type == zipfile.ZIP_DEFLATED and os.path.getsize(path) >= PARALLEL_SIZE:
+                    future = executor.submit(_deflate, path, level)
+                    pending.append(partial(_write_deflated, apkg, path, arcname, level, future))
+                else:
+                    pending.append(partial(_write_file, apkg, path, arcname, compress_type, level))
+                if arcname == "collection.anki2":
+                    # the names of the media files follow the collection, like in the packages of genanki
+                    media_json = json.dumps({str(idx): name for idx, (name, _) in enumerate(media)})
+                    compression = self._compression("media") if _COMPRESSLEVEL else self._compression("media")[:1]
+                    pending.append(partial(apkg.writestr, "media", media_json, *compression))
+                while len(pending) > 2 * self.workers:
+                    pending.popleft()()
+            while pending:
+                pending.popleft()()
+        if previous is not None:
+            logger.debug("Copied %d of %d media files from the previous build", n_copied, len(media))
+
+    def write(
+        self,
+        file_name: Union[str, Path],
+        media: Iterable[Tuple[str, Path]] = (),
+        timestamp: Optional[float] = None,
+    ):
+        """Writes the package.
+
+        Args:
+            file_name (Union[str, Path]): The path of the `.apkg`
+            media (Iterable[Tuple[str, Path]]): The name in the package and the path of every media file. The files
+                are read straight into the archive, they do not have to be named like in the package.
+            timestamp (Optional[float]): The time of the notes and cards, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        db_file, db_name = tempfile.mkstemp(suffix=".anki2")
+        os.close(db_file)
+        try:
+            self._write_collection(db_name, timestamp)
+            self._write_archive(file_name, db_name, media)
+        finally:
+            os.remove(db_name)
+
+    def update(
+        self,
+        file_name: Union[str, Path],
+        media: Iterable[Tuple[str, Path]] = (),
+        timestamp: Optional[float] = None,
+    ):
+        """Updates a package that was written before, only the notes and media files that changed are written again.
+        Media files that did not change are copied from the previous package as they are (without compressing them
+        again, but their CRC is checked). If there is no previous package (or it cannot be read, e.g. a member is
+        broken), the package is written from scratch.
+
+        Args:
+            file_name (Union[str, Path]): The path of the `.apkg`
+            media (Iterable[Tuple[str, Path]]): The name in the package and the path of every media file
+            timestamp (Optional[float]): The time of the changed notes and cards, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            previous = zipfile.ZipFile(file_name)
+        except (FileNotFoundError, zipfile.BadZipFile):
+            logger.debug("There is no previous package '%s' to update", file_name)
+            self.write(file_name, media, timestamp)
+            return
+
+        # the new package replaces the previous one once it is complete
+        directory = os.path.dirname(os.path.abspath(file_name))
+        apkg_file, apkg_name = tempfile.mkstemp(suffix=".apkg", dir=directory)
+        os.close(apkg_file)
+        try:
+            with previous, tempfile.TemporaryDirectory() as tmp:
+                db_name = os.path.join(tmp, "collection.anki2")
+                try:
+                    media_json = json.loads(previous.read("media"))
+                    old_media = {name: previous.getinfo(idx) for idx, name in media_json.items()}
+                    previous.extract("collection.anki2", tmp)
+                    self._update_collection(db_name, timestamp)
+                except (KeyError, ValueError, sqlite3.DatabaseError, zipfile.BadZipFile, zlib.error) as e:
+                    logger.warning("Could not update the previous package '%s' (%s), writing it again", file_name, e)
+                    old_media = {}
+                    if os.path.exists(db_name):
+                        os.remove(db_name)
+                    self._write_collection(db_name, timestamp)
+                try:
+                    self._write_archive(apkg_name, db_name, media, previous, old_media)
+                except (zipfile.BadZipFile, zlib.error) as e:
+                    logger.warning("Could not copy the media files of '%s' (%s), compressing them again", file_name, e)
+                    self._write_archive(apkg_name, db_name, media)
+            os.replace(apkg_name, file_name)
+        finally:
+            if os.path.exists(apkg_name):
+                os.remove(apkg_name)
+
+
+def _connect(file_name: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(file_name)
+    # the collection is a temporary file until it is added to the archive, it does not have to survive a crash
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    return conn
+
+
+def _format_tags(tags: Sequence[str]) -> str:
+    return " " + " ".join(tags) + " "
+
+
+def _digest(text: str) -> bytes:
+    return sha1(text.encode("utf-8")).digest()
+
+
+def _same_content(info: zipfile.ZipInfo, path: Path) -> bool:
+    """Checks if a file has the same content as a member of an archive (by size and CRC)."""
+    if os.path.getsize(path) != info.file_size:
+        return False
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+def _deflate(path: Path, level: int) -> Tuple[int, int, List[bytes]]:
+    """Returns the CRC, the size and the deflated data of a file."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc, size, data = 0, 0, []
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data.append(compressor.compress(chunk))
+    data.append(compressor.flush())
+    return crc, size, data
+
+
+def _level_comment(level: Optional[int]) -> bytes:
+    # the comment of a member with the level of deflate (stored members have none)
+    return b"" if level is None else f"level={level}".encode("ascii")
+
+
+def _write_file(target: zipfile.ZipFile, path: Path, name: str, compress_type: int, level: Optional[int]):
+    if not _COMPRESSLEVEL:
+        # the file is deflated with the default level, so its level is unknown
+        target.write(path, name, compress_type)
+        return
+    target.write(path, name, compress_type, level)
+    target.getinfo(name).comment = _level_comment(level)
+
+
+def _write_deflated(
+    target: zipfile.ZipFile, path: Path, name: str, level: int, future: "Future[Tuple[int, int, List[bytes]]]"
+):
+    member = zipfile.ZipInfo.from_file(path, name)
+    member.compress_type = zipfile.ZIP_DEFLATED
+    member.comment = _level_comment(level)
+    member.CRC, member.file_size, data = future.result()
+    member.compress_size = sum(len(chunk) for chunk in data)
+    _write_member(target, member, data)
+
+
+def _copy_member(source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo, name: str):
+    """Copies the compressed data of a member to another archive, without compressing it again. The data is still
+    decompressed to check its CRC (which is much faster than compressing it).
+
+    Raises:
+        zipfile.BadZipFile: If the member is truncated or its CRC does not match
+        zlib.error: If the deflated data is broken
+    """
+    source.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(source.fp.read(_LOCAL_HEADER.size))
+    # skip the name and the extra field of the member
+    source.fp.seek(header[-2] + header[-1], os.SEEK_CUR)
+
+    def chunks():
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if info.compress_type == zipfile.ZIP_DEFLATED else None
+        remaining, crc = info.compress_size, 0
+        while remaining > 0:
+            chunk = source.fp.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"The member '{info.filename}' is truncated")
+            if decompressor is None:
+                crc = zlib.crc32(chunk, crc)
+            else:
+                data = chunk
+                while data:
+                    crc = zlib.crc32(decompressor.decompress(data, CHUNK_SIZE), crc)
+                    data = decompressor.unconsumed_tail
+            yield chunk
+            remaining -= len(chunk)
+        if decompressor is not None:
+            crc = zlib.crc32(decompressor.flush(), crc)
+        if crc != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for the member '{info.filename}'")
+
+    member = zipfile.ZipInfo(name, info.date_time)
+    member.compress_type = info.compress_type
+    member.comment = info.comment
+    member.external_attr = info.external_attr
+    member.CRC = info.CRC
+    member.compress_size = info.compress_size
+    member.file_size = info.file_size
+    _write_member(target, member, chunks())
+
+
+def _write_member(target: zipfile.ZipFile, member: zipfile.ZipInfo, data: Iterable[bytes]):
+    """Adds a member with data that is compressed already. `zipfile` has no API for this, so the local header is
+    written like `ZipFile.write` does. Only used if `RAW_MEMBERS` is true.
+    """
+    member.header_offset = target.fp.tell()
+    target.fp.write(member.FileHeader())
+    for chunk in data:
+        target.fp.write(chunk)
+    target.filelist.append(member)
+    target.NameToInfo[member.filename] = member
+    target.start_dir = target.fp.tell()
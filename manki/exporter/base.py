@@ -1,7 +1,9 @@
-from typing import Any, Dict, Generic, TypeVar
+from pathlib import Path
+from typing import Any, Dict, Generic, TypeVar, Union
 from manki.configuration import MankiConfig
 
-from manki.data_struct import QAPackage
+from manki.data_struct import QAChapter, QAPackage
+from manki.view import PackageView
 
 T = TypeVar("T")
 
@@ -11,6 +13,43 @@ class MankiExporter(Generic[T]):
         self.config = config
         self.package = package
 
+    def add_chapter(self, chapter: QAChapter):
+        """Adds a chapter to the exported package. Exporters that can export chapters one after another should
+        override this method, so that the chapter does not have to be kept in memory until `export` is called.
+
+        Args:
+            chapter (QAChapter): The chapter to be exported
+        """
+        self.package.add_chapter(chapter)
+
+    @property
+    def n_chapters(self) -> int:
+        return self.package.n_chapters
+
+    @property
+    def n_items(self) -> int:
+        return self.package.n_items
+
+    def package_view(self, **extra) -> PackageView:
+        """Returns the lazy view of the exported package that templates see as `package`.
+
+        Args:
+            **extra: Values that are added to the view or replace values of the package
+        """
+        return PackageView(self.package, n_chapters=self.n_chapters, n_items=self.n_items, **extra)
+
+    def render_template(self, name: str, **context) -> str:
+        """Renders a template of the project. Besides the configuration, the template can use the exported package
+        as `package`.
+        """
+        context.setdefault("package", self.package_view())
+        return self.config.render_template(name, **context)
+
+    def dump_template(self, name: str, file_path: Union[str, Path], **context):
+        """Renders a template like `render_template`, but streams the output to `file_path` instead of returning it."""
+        context.setdefault("package", self.package_view())
+        self.config.dump_template(name, file_path, **context)
+
     def export(self) -> T:
         """Custom method that exports the QAPackage to a custom format.
 
@@ -1,17 +1,13 @@
 import html
 from pathlib import Path
 from typing import Dict, Any, List
-from bs4 import BeautifulSoup
-
-from pygments.formatters import HtmlFormatter
 from manki.configuration import MankiConfig
 
-from manki.data_struct import QAItem, QAPackage
+from manki.data_struct import QAChapter, QAItem, QAPackage
 from .base import MankiExporter
-from manki.util import deep_get, sanitize_string, get_hash
-from genanki import Deck, Model, Package, Note
-from rich import print, inspect
-import importlib.resources as pkg_resources
+from manki.util import replace_img_src, sanitize_string, get_hash
+from .apkg_writer import ApkgWriter
+from genanki import Model
 
 
 import logging
@@ -65,57 +61,73 @@ class TemplateModel(Model):
 class AnkiExporter(MankiExporter):
     def __init__(self, config: MankiConfig, package: QAPackage):
         super().__init__(config, package)
-        sanitized_title = sanitize_string(self.package.title)
-        model = TemplateModel(config, sanitized_title + "_model")
-
-        decks = [
-            Deck(
-                get_hash(sanitized_title + "_deck"),
-                self.package.title,
-                self.config.render_template("anki/preamble.html.j2"),
-            )
-        ]
+        self.sanitized_title = sanitize_string(self.package.title)
+        self.model = TemplateModel(config, self.sanitized_title + "_model")
+        self.writer = ApkgWriter(self.model, config.get("output.apkg.compression"))
+        # the description of the root deck (the preamble) is rendered when the package is exported
+        self.root_deck = self.writer.add_deck(get_hash(self.sanitized_title + "_deck"), self.package.title)
+        self._n_chapters = 0
+        self.root = Path(config.get("general.root"))
+        self._media_names: Dict[str, str] = {}
+        self._n_items = 0
 
         for chap in self.package.chapters:
-            chap_name = self.package.title + "::" + chap.title
-            deck = Deck(deck_id=chap.chapter_id, name=chap_name)
-            deck.add_model(model=model)
-            for item in chap.items:
-                self._fix_img_src_name(item)
-                fields = [item.question, item.answer]
-                logger.debug("New Item with fields\nQuesion: %s...\nAnswer: %s...", fields[0][:50], fields[1][:50])
-                note = Note(model=model, fields=fields, guid=item.item_id)
-                deck.add_note(note)
-            decks.append(deck)
-
-        self.apkg = Package(decks, self.package.media)
-
-    def _fix_img_src_name(self, item: QAItem):
+            self._add_deck(chap)
+
+    def add_chapter(self, chapter: QAChapter):
+        # the chapter is converted to a deck right away and does not have to be kept in the package
+        self._add_deck(chapter)
+
+    @property
+    def n_chapters(self) -> int:
+        return self._n_chapters
+
+    @property
+    def n_items(self) -> int:
+        return self._n_items
+
+    def _add_deck(self, chap: QAChapter):
+        chap_name = self.package.title + "::" + chap.title
+        self.writer.add_deck(chap.chapter_id, chap_name)
+        for item in chap.items:
+            fields = self._fix_img_src_name(item)
+            logger.debug("New Item with fields\nQuesion: %s...\nAnswer: %s...", fields[0][:50], fields[1][:50])
+            self.writer.add_note(item.item_id, fields)
+        self._n_chapters += 1
+        self._n_items += chap.n_items
+
+    def _fix_img_src_name(self, item: QAItem) -> List[str]:
         """Anki expects the source of the images to be only the stem of the filepath. So instead of `<img
         src="/foo/bar/image.png"/>` it expects `<img
         src="image.png"/>`
 
+        The images are known from the item already, so the fields do not have to be parsed again.
+
         Args:
             item (QAItem): The item for which the names should be fixed
-        """
-
-        def _fix(field):
-            if field is None:
-                return None
 
-            field_bs = BeautifulSoup(field, features="html.parser")
-            for img in field_bs.find_all("img", recursive=True):
-                img_path = Path(img.attrs["src"])
-                img.attrs["src"] = img_path.name
-            return str(field_bs)
+        Returns:
+            List[str]: The question and answer field of the note
+        """
+        sources = {src: self._media_name(src) for src in item.media}
+        return [replace_img_src(item.question, sources), replace_img_src(item.answer, sources)]
 
-        item.question = _fix(item.question)
-        item.answer = _fix(item.answer)
-        item.comment = _fix(item.comment)
+    def _media_name(self, src: str) -> str:
+        # the name of the image inside of the package, it might have been renamed to be unique
+        if src not in self._media_names:
+            img_path = self.root.joinpath(src).resolve()
+            self._media_names[src] = self.package.media.name(img_path) or Path(src).name
+        return self._media_names[src]
 
     def export(self):
-        file_name = sanitize_string(self.package.title) + ".apkg"
-        n_decks = self.package.n_chapters
-        n_cards = self.package.n_items
+        file_name = self.sanitized_title + ".apkg"
+        n_decks = self.n_chapters
+        n_cards = self.n_items
         logger.info("Exporting '%s' with '%d' decks and %d cards in total", file_name, n_decks, n_cards)
-        self.apkg.write_to_file(file_name)
+        # the preamble is rendered last, as it may contain information about the whole package
+        self.root_deck.description = self.render_template("anki/preamble.html.j2")
+        # the images are read from their paths, renamed images do not have to be copied
+        if self.config.get("output.apkg.incremental", False):
+            self.writer.update(file_name, self.package.media.files())
+        else:
+            self.writer.write(file_name, self.package.media.files())
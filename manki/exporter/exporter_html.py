@@ -1,17 +1,14 @@
 from pathlib import Path
-from pprint import pprint
-from typing import Dict, Any, ItemsView, List
-from bs4 import BeautifulSoup, Tag
-
-from pygments.formatters import HtmlFormatter
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from manki.cache import hash_key, project_cache
 from manki.configuration import MankiConfig
 
-from manki.data_struct import QAPackage
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.search import SUFFIX as SEARCH_SUFFIX, WORD_PATTERN, SearchIndex
+from manki.view import ChapterView, ItemView
 from .base import MankiExporter
-from manki.util import deep_get, sanitize_string, get_hash
-from genanki import Deck, Model, Package, Note
-from rich import print, inspect
-import importlib.resources as pkg_resources
+from manki.util import sanitize_string
 
 
 import logging
@@ -21,22 +18,187 @@ logger.addHandler(logging.NullHandler())
 logger.setLevel(logging.DEBUG)
 
 
+class Page(NamedTuple):
+    """A page of the paginated output with (a part of) a chapter."""
+
+    file_name: str
+    index: int
+    """The index of the chapter in the package, starting at 1"""
+    chapter: QAChapter
+    items: Sequence[QAItem]
+    title: str
+
+
 class HTMLExporter(MankiExporter):
-    def __init__(self, config: MankiConfig, package: QAPackage):
+    def __init__(self, config: MankiConfig, package: QAPackage, fragments: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            config (MankiConfig): The projects configuration
+            package (QAPackage): The package to be exported
+            fragments (Optional[Dict[str, str]]): Rendered chapters by their content. If given, only chapters that
+                are not part of it are rendered (and added to it). Chapters that are not part of the package anymore
+                are removed.
+        """
         super().__init__(config, package)
+        self.fragments = fragments
 
-        macros = self._get_macros()
-        self.config.set("input.macros", macros)
-        self.html = self.config.render_template("html/page.html.j2")
+        # the rendered macros are passed to the templates, the configuration is not changed
+        self.macros = self._get_macros()
 
     def export(self):
         file_name = sanitize_string(self.package.title) + ".html"
-        n_decks = self.package.n_chapters
-        n_cards = self.package.n_items
+        n_decks = self.n_chapters
+        n_cards = self.n_items
         logger.info("Exporting '%s' with '%d' decks and %d cards in total to html", file_name, n_decks, n_cards)
 
+        context = {}
+        if self.config.get("output.html.search", False):
+            context["search"] = {"src": Path(file_name).stem + SEARCH_SUFFIX, "word": WORD_PATTERN}
+        if self.config.get("output.html.paginate", False):
+            self.export_pages(file_name, **context)
+            return
+        if self.fragments is None:
+            if context:
+                self._write_search_index(file_name)
+            # the page is written while it is rendered, it is never kept in memory as a whole
+            self.dump_template("html/page.html.j2", file_name, macros=self.macros, **context)
+            return
+        html = self.render()
         with open(file_name, "w+") as f:
-            f.write(self.html)
+            f.write(html)
+
+    def render(self) -> str:
+        """Renders the page with all chapters of the package."""
+        if self.fragments is None:
+            return self.render_template("html/page.html.j2", macros=self.macros)
+        return self.render_template(
+            "html/page.html.j2", package=self.package_view(chapters=self._render_chapters()), macros=self.macros
+        )
+
+    def _render_chapters(self) -> List[ChapterView]:
+        """Renders every chapter that has changed on its own, the page only includes the rendered chapters."""
+        fragments = {}
+        chapters = []
+        for index, chapter in enumerate(self.package.chapters, start=1):
+            key = hash_key(index, chapter.to_dict())
+            html = self.fragments.get(key)
+            if html is None:
+                html = self.render_template("html/chapter.html.j2", chapter=ChapterView(chapter), index=index)
+            fragments[key] = html
+            chapters.append(ChapterView(chapter, html=html))
+        logger.debug("Rendered %d of %d chapters", len(fragments.keys() - self.fragments.keys()), len(chapters))
+        self.fragments.clear()
+        self.fragments.update(fragments)
+        return chapters
+
+    def export_pages(self, file_name: str, **context):
+        """Exports an index page and one page per chapter (or per `output.html.page_size` items of a chapter), so
+        that a browser only has to load and typeset the items of one page at a time. The pages are written next to the
+        index page, so that relative paths of images stay valid.
+
+        The content of every page is cached in the cache directory (up to `cache.html_size` MB), only pages that have
+        changed are rendered again.
+
+        Args:
+            file_name (str): The file name of the index page
+            **context: Additional values for the templates
+        """
+        stem = Path(file_name).stem
+        pages = self._paginate(stem)
+        if "search" in context:
+            self._write_search_index(file_name, pages)
+        # the chapters link to their first page
+        hrefs: Dict[int, str] = {}
+        for page in reversed(pages):
+            hrefs[page.index] = f"{page.file_name}#chap-{page.index}"
+        navigation = [ChapterView(chp, href=hrefs.get(i)) for i, chp in enumerate(self.package.chapters, start=1)]
+        package = self.package_view(chapters=navigation)
+
+        self.dump_template(
+            "html/page.html.j2",
+            file_name,
+            package=package,
+            macros=self.macros,
+            page_chapters=[],
+            pagination={"index": file_name, "pages": [{"title": p.title, "href": p.file_name} for p in pages]},
+            **context,
+        )
+
+        # the pages of previous builds are removed once the cache exceeds its size (least recently used first)
+        cache = project_cache(self.config, "html", max_size=self.config.get("cache.html_size", 100) * 2**20)
+        template_source, _, _ = self.config.template_env.loader.get_source(
+            self.config.template_env, "html/chapter.html.j2"
+        )
+        n_rendered = 0
+        for i, page in enumerate(pages):
+            key = hash_key(
+                template_source,
+                "search" in context,
+                page.index,
+                page.chapter.chapter_id,
+                page.chapter.title,
+                [itm.to_dict() for itm in page.items],
+            )
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                html = cached.decode("utf-8")
+            else:
+                chapter = ChapterView(page.chapter, items=[ItemView(itm) for itm in page.items])
+                html = self.render_template("html/chapter.html.j2", chapter=chapter, index=page.index, **context)
+                n_rendered += 1
+                if cache is not None:
+                    cache.set(key, html.encode("utf-8"))
+            self.dump_template(
+                "html/page.html.j2",
+                page.file_name,
+                package=package,
+                macros=self.macros,
+                page_chapters=[ChapterView(page.chapter, html=html, index=page.index)],
+                pagination={
+                    "index": file_name,
+                    "previous": pages[i - 1].file_name if i > 0 else None,
+                    "next": pages[i + 1].file_name if i + 1 < len(pages) else None,
+                },
+                **context,
+            )
+        logger.debug("Rendered %d of %d pages", n_rendered, len(pages))
+        self._remove_stale_pages(Path(file_name).resolve().parent, stem, {page.file_name for page in pages})
+
+    def _paginate(self, stem: str) -> List[Page]:
+        page_size = self.config.get("output.html.page_size", 0)
+        pages = []
+        for index, chapter in enumerate(self.package.chapters, start=1):
+            if not page_size or chapter.n_items <= page_size:
+                parts = [chapter.items]
+            else:
+                items = list(chapter.items)
+                parts = [items[start : start + page_size] for start in range(0, len(items), page_size)]
+            for n, items in enumerate(parts, start=1):
+                title = chapter.title if len(parts) == 1 else f"{chapter.title} ({n}/{len(parts)})"
+                pages.append(Page(f"{stem}-{len(pages) + 1:03d}.html", index, chapter, items, title))
+        return pages
+
+    def _write_search_index(self, file_name: str, pages: Optional[List[Page]] = None):
+        """Writes the search index next to the page. The items link to the given pages or else to the single page."""
+        if pages is None:
+            pages = [Page("", i, chp, chp.items, chp.title) for i, chp in enumerate(self.package.chapters, start=1)]
+        index = SearchIndex()
+        chapter = None
+        for page in pages:
+            if page.index != chapter:
+                index.add_chapter(page.chapter.title)
+                chapter = page.index
+            for item in page.items:
+                index.add_item(item, f"{page.file_name}#item-{item.item_id}")
+        index.dump(Path(file_name).with_name(Path(file_name).stem + SEARCH_SUFFIX))
+
+    def _remove_stale_pages(self, directory: Path, stem: str, file_names: set):
+        # pages of a previous export with more pages than this one
+        pattern = re.compile(re.escape(stem) + r"-\d{3,}\.html")
+        for path in directory.glob(f"{stem}-*.html"):
+            if pattern.fullmatch(path.name) and path.name not in file_names:
+                logger.debug("Removing the stale page '%s'", path.name)
+                path.unlink()
 
     def _get_macros(self) -> str:
         macros_file = self.config.get("input.macros", None)
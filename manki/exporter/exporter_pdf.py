@@ -1,16 +1,11 @@
+import os
 from pathlib import Path
-from typing import Dict, Any, ItemsView, List
-from bs4 import BeautifulSoup, Tag
-
-from pygments.formatters import HtmlFormatter
+import tempfile
 from manki.configuration import MankiConfig
 
 from manki.data_struct import QAPackage
 from .base import MankiExporter
-from manki.util import deep_get, sanitize_string, get_hash
-from genanki import Deck, Model, Package, Note
-from rich import print, inspect
-import importlib.resources as pkg_resources
+from manki.util import sanitize_string
 
 
 import logging
@@ -26,19 +21,24 @@ class PdfExporter(MankiExporter):
     def __init__(self, config: MankiConfig, package: QAPackage):
         super().__init__(config, package)
 
-        macros = self._get_macros()
-        self.config.set("input.macros", macros)
-        self.html = self.config.render_template("html/page.html.j2")
+        # the rendered macros are passed to the templates, the configuration is not changed
+        self.macros = self._get_macros()
 
     def export(self):
         file_name = sanitize_string(self.package.title) + ".pdf"
-        n_decks = self.package.n_chapters
-        n_cards = self.package.n_items
+        n_decks = self.n_chapters
+        n_cards = self.n_items
         logger.info("Exporting '%s' with '%d' decks and %d cards in total to pdf", file_name, n_decks, n_cards)
 
-        pdf = pdfkit.from_string(self.html, options={"enable-local-file-access": ""})
-        with open(file_name, "wb") as f:
-            f.write(pdf)
+        # the page is streamed to a temporary file next to the output (so that relative paths of images stay valid)
+        # and wkhtmltopdf writes the PDF to disk directly, so neither of them has to be kept in memory
+        fd, html_file = tempfile.mkstemp(suffix=".html", dir=Path(file_name).resolve().parent)
+        os.close(fd)
+        try:
+            self.dump_template("html/page.html.j2", html_file, macros=self.macros)
+            pdfkit.from_file(html_file, file_name, options={"enable-local-file-access": ""})
+        finally:
+            os.remove(html_file)
 
     def _get_macros(self) -> str:
         macros_file = self.config.get("input.macros", None)
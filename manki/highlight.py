@@ -0,0 +1,63 @@
+from functools import partial
+from typing import Optional
+
+import pygments
+from pymdownx.__meta__ import __version__ as pymdownx_version
+from pymdownx.highlight import Highlight, HighlightExtension
+
+from manki.cache import DiskCache, hash_key
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+class CachedHighlight(Highlight):
+    """Highlighter that looks up code blocks in the cache before highlighting them with Pygments."""
+
+    def __init__(self, cache: Optional[DiskCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self._settings = kwargs
+
+    def highlight(self, src, language, css_class="highlight", **kwargs):
+        # inline code is returned as element (and is cheap to highlight anyway)
+        if self.cache is None or kwargs.get("inline"):
+            return super().highlight(src, language, css_class, **kwargs)
+
+        options = dict(kwargs)
+        if not (self.line_spans or self.line_anchors):
+            # the position of the code block only changes the output if it is used for anchors
+            options.pop("code_block_count", None)
+        key = hash_key(src, language, css_class, options, self._settings, pygments.__version__, pymdownx_version)
+
+        code = self.cache.get(key)
+        if code is not None:
+            return code.decode("utf-8")
+
+        code = super().highlight(src, language, css_class, **kwargs)
+        self.cache.set(key, code.encode("utf-8"))
+        return code
+
+
+class CachedHighlightExtension(HighlightExtension):
+    """Replaces the 'pymdownx.highlight' extension. It takes the same configuration and additionally the cache for
+    the highlighted code blocks.
+
+    Highlighting code blocks with Pygments is expensive, but the code blocks of a project rarely change. So every
+    fenced code block (via 'pymdownx.superfences') is looked up in the cache first and is lexed and formatted only
+    once across all runs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.cache: Optional[DiskCache] = kwargs.pop("cache", None)
+        super().__init__(*args, **kwargs)
+
+    def get_pymdownx_highlighter(self):
+        return partial(CachedHighlight, cache=self.cache)
+
+
+def makeExtension(*args, **kwargs):
+    return CachedHighlightExtension(*args, **kwargs)
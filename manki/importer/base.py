@@ -1,18 +1,76 @@
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
 
-from manki.data_struct import QAPackage
+from manki.cache import CACHE_DIR
+from manki.data_struct import QAChapter, QAPackage
+from manki.media import MediaRegistry
+from manki.store import SQLitePackage
 from manki.util import ensure_list
 
 
+def iter_sources(config) -> Iterator[Tuple[str, str]]:
+    """Reads the source files given by `input.source` one after another.
+
+    Args:
+        config (MankiConfig): The projects configuration
+
+    Yields:
+        Tuple[str, str]: The stem of the file name and the file content
+    """
+    root = Path(config.get("general.root"))
+    for input in ensure_list(config.get("input.source")):
+        file_path = root.joinpath(input)
+        with open(file_path, "r") as f:
+            yield file_path.stem, f.read()
+
+
 class MankiImporter:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], store: Optional[str] = None):
+        """
+        Args:
+            config (Dict[str, Any]): The configuration of the project
+            store (Optional[str]): Where the items of the package are kept, `"memory"` or `"sqlite"`. Defaults to
+                `general.store`.
+        """
         self.config = config
+        self.store = store or config.get("general.store", "memory")
         self.title = config.get("general.title")
         self.authors = ensure_list(config.get("general.author"))
-        self.package = QAPackage(title=self.title, author=self.authors)
+        self.package = self.reset_package()
+
+    def reset_package(self) -> QAPackage:
+        """Replaces the package by an empty one, so that the sources can be imported again. With `general.store`
+        set to `"sqlite"`, the items are stored in a database in the cache directory instead of in memory.
+
+        Returns:
+            QAPackage: The new package
+        """
+        if isinstance(getattr(self, "package", None), SQLitePackage):
+            self.package.close()
+        media = MediaRegistry(hashing=self.config.get("input.media_hashing", False))
+        if self.store == "sqlite":
+            root = Path(self.config.get("general.root"))
+            path = root.joinpath(self.config.get("cache.dir", CACHE_DIR), "package.sqlite")
+            self.package = SQLitePackage(path, title=self.title, author=self.authors, media=media)
+        else:
+            self.package = QAPackage(title=self.title, author=self.authors, media=media)
+        return self.package
 
-    def create_package(self, raw_source: Dict[str, str]) -> QAPackage:
-        """Custom method that creates the QAPackage with all QAChapter and QAItem
+    def iter_chapters(self, raw_source: Union[Dict[str, str], Iterable[Tuple[str, str]]]) -> Iterator[QAChapter]:
+        """Custom method that creates the QAChapter with all QAItem of the sources one after another. Media files are
+        added to the package directly.
+
+        Args:
+            raw_source: Dictionary with the file name of the source as key and the file content as value or an
+            iterable of (file name, file content)-pairs
+
+        Yields:
+            QAChapter: The fully defined chapters
+        """
+        raise NotImplementedError(f"The '{self.__class__}'-Importer is not implemented correctly!")
+
+    def create_package(self, raw_source: Union[Dict[str, str], Iterable[Tuple[str, str]]]) -> QAPackage:
+        """Creates the QAPackage with all QAChapter and QAItem
 
         Args:
             raw_source: Dictionary with the file name of the source as key and the file
@@ -21,4 +79,6 @@ class MankiImporter:
         Returns:
             QAPackage: The fully defined QAPackage
         """
-        raise NotImplementedError(f"The '{self.__class__}'-Importer is not implemented correctly!")
+        for chapter in self.iter_chapters(raw_source):
+            self.package.add_chapter(chapter)
+        return self.package
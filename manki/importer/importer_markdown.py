@@ -1,12 +1,20 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import copy
+import os
 from pathlib import Path
-from bs4 import BeautifulSoup, ResultSet, Tag
+import bs4
+from bs4 import BeautifulSoup, Comment, NavigableString, PageElement, ResultSet, Tag
 import markdown
+import pygments
+from pymdownx.__meta__ import __version__ as pymdownx_version
 from manki.configuration import MankiConfig
 from manki.importer import base
-from typing import Dict, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from manki.data_struct import QAChapter, QAItem, QAPackage
-from manki.util import split_at_tags
+from manki.cache import hash_key, project_cache
+from manki.data_struct import QAChapter, QAItem
+from manki.util import fragment_nodes, parse_html, resolve_html_parser, serialize, split_at_tags
 
 import logging
 
@@ -14,56 +22,206 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 logger.setLevel(logging.DEBUG)
 
+# has to be increased whenever the conversion changes its output for the same input. Otherwise stale results would be
+# loaded from the cache.
+CACHE_VERSION = 3
 
-class MarkdownImporter(base.MankiImporter):
-    def __init__(self, config: MankiConfig):
-        super().__init__(config)
-        extensions = [
-            "mdx_math",  # enable mathjax output
-            "pymdownx.highlight",  # enable code highlighting
-            "pymdownx.superfences",
-            "pymdownx.betterem",  # better interpretation of emphasize chars
-            "markdown.extensions.attr_list",  # enable attribute lists
-            "markdown.extensions.def_list",  # enable 'definition' list type
-            "markdown.extensions.tables",  # enable tables
-        ]
+# the extensions of Python-Markdown and their configuration (both are part of the key of the cached sources)
+EXTENSIONS = [
+    "mdx_math",  # enable mathjax output
+    "manki.highlight",  # enable code highlighting (with a cache for the highlighted code)
+    "pymdownx.superfences",
+    "pymdownx.betterem",  # better interpretation of emphasize chars
+    "markdown.extensions.attr_list",  # enable attribute lists
+    "markdown.extensions.def_list",  # enable 'definition' list type
+    "markdown.extensions.tables",  # enable tables
+]
+
+EXTENSION_CONFIG = {
+    "mdx_math": {"enable_dollar_delimiter": True},
+    "manki.highlight": {
+        "use_pygments": True,
+    },
+}
+
+# separates the questions of a source while they are converted
+QUESTION_SEPARATOR = "manki-question-separator"
+
+# the importer of a worker process, see `_init_worker`
+_worker_importer: "MarkdownImporter" = None
+
+
+def _init_worker(config: MankiConfig):
+    global _worker_importer
+    # the workers only convert sources, the package of the main process must not be touched (e.g. its database)
+    _worker_importer = MarkdownImporter(config, store="memory")
 
-        extension_config = {
-            "mdx_math": {"enable_dollar_delimiter": True},
-            "pymdownx.highlight": {
-                "use_pygments": True,
-            },
-        }
 
+def _import_source_in_worker(text: str) -> Tuple[List[QAChapter], List[Path]]:
+    return _worker_importer._import_source(text)
+
+
+class MarkdownImporter(base.MankiImporter):
+    def __init__(self, config: MankiConfig, memoize: bool = False, store: Optional[str] = None):
+        super().__init__(config, store)
+        self.html_parser = resolve_html_parser(config.get("processor.html_parser"))
+        # the libraries that convert the sources change their output between versions, too
+        self._cache_salt = hash_key(
+            CACHE_VERSION,
+            EXTENSIONS,
+            EXTENSION_CONFIG,
+            self.html_parser,
+            markdown.__version__,
+            pymdownx_version,
+            pygments.__version__,
+            bs4.__version__,
+        )
+
+        # the highlighted code blocks are cached independently of the converted sources
+        highlight_cache = project_cache(config, "highlight", max_size=config.get("cache.highlight_size", 100) * 2**20)
         self.md = markdown.Markdown(
-            extensions=extensions,
-            extension_configs=extension_config,
+            extensions=EXTENSIONS,
+            extension_configs={
+                **EXTENSION_CONFIG,
+                "manki.highlight": {**EXTENSION_CONFIG["manki.highlight"], "cache": highlight_cache},
+            },
             tab_length=2,  # makes sure that two spaces get interpreted as a tab (makes nested lists easier)
         )
 
-    def create_package(self, raw_source: Dict[str, str]) -> QAPackage:
-        """Convert and apped all markdown files to create one big file.
-        Files will be sorted in alphabetical order by their h1 header.
-        If they do not contain a h1 header, an error will be raised. If they contain more
-        than one h1 header, the first occuring header is relevant for sorting.
+        self.root = Path(self.config.get("general.root"))
+        # every source file that has been converted before is loaded from the cache. The key of each file depends on
+        # its content and on everything that influences the conversion.
+        self._cache = project_cache(config, "import")
+        # the images found in the source file that is currently processed
+        self._source_media: List[Path] = []
+        self._resolved_media: Dict[str, Path] = {}
+        # the images that are used by the sources, but do not exist (e.g. so that they can be watched)
+        self.missing_media: Set[Path] = set()
+        # with `memoize`, the results of the last run are kept in memory (by the content of the source), so that
+        # sources that have not changed are not converted again when the importer is used for another run
+        self._memo: Optional[Dict[str, Tuple[List[QAChapter], List[Path]]]] = {} if memoize else None
+        self._next_memo: Dict[str, Tuple[List[QAChapter], List[Path]]] = {}
+
+    def iter_chapters(self, raw_source: Union[Dict[str, str], Iterable[Tuple[str, str]]]) -> Iterator[QAChapter]:
+        """Convert all markdown files one after another and yield their chapters in the order of the sources.
+        The images of each file are added to the media of the package before its chapters are yielded.
 
         Args:
-            raw_source (Dict[str, str]): _description_
+            raw_source (Union[Dict[str, str], Iterable[Tuple[str, str]]]): The names and contents of the sources
 
-        Returns:
-            base.P: _description_
+        Yields:
+            QAChapter: The chapters of all sources
         """
+        if isinstance(raw_source, dict):
+            raw_source = raw_source.items()
 
-        ht_sources = [self.md.convert(text) for text in raw_source.values()]
-        sources_parsed = [BeautifulSoup(text, features="html.parser") for text in ht_sources]
-        sources_parsed = [self._fix_math(bs) for bs in sources_parsed]
-        for name, source in zip(raw_source.keys(), sources_parsed):
+        for name, (chapters, media) in self._import_sources(raw_source):
             logger.info(f"Processing '{name}'")
-            chap_sources = split_at_tags("h1", source)
-            for chap_source in chap_sources:
-                chap = self._create_chapter(chap_source)
-                self.package.add_chapter(chap)
-        return self.package
+            # the images are checked for every build, the result of the conversion might come from the cache. Every
+            # image is checked once, the registry remembers whether it exists.
+            for img_path in dict.fromkeys(media):
+                if self.package.media.exists(img_path):
+                    self.package.media.add(img_path)
+                    self.missing_media.discard(img_path)
+                elif img_path not in self.missing_media:
+                    logger.warning("Image at '%s' does not exists. Ignoring it. (Found in: '%s')", img_path, name)
+                    self.missing_media.add(img_path)
+            yield from chapters
+
+        if self._memo is not None:
+            # only the results of the current sources are kept
+            self._memo, self._next_memo = self._next_memo, {}
+
+    def _import_sources(
+        self, sources: Iterable[Tuple[str, str]]
+    ) -> Iterator[Tuple[str, Tuple[List[QAChapter], List[Path]]]]:
+        """Converts all sources, either one after another or distributed over a pool of `input.jobs` processes. The
+        results are returned in the order of `sources` in both cases. Sources are only read from `sources` when
+        a worker is ready to convert them.
+        """
+        jobs = self.config.get("input.jobs", 1) or os.cpu_count()
+        if jobs <= 1:
+            for name, text in sources:
+                result = self._recall(text)
+                yield name, result if result is not None else self._remember(text, self._import_source(text))
+            return
+
+        logger.info("Converting sources with %d processes", jobs)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.config,)) as pool:
+            pending = deque()
+            for name, text in sources:
+                result = self._recall(text)
+                if result is None:
+                    result = pool.submit(_import_source_in_worker, text)
+                pending.append((name, text, result))
+                if len(pending) >= 2 * jobs:
+                    name, text, result = pending.popleft()
+                    yield name, self._remember(text, result.result()) if isinstance(result, Future) else result
+            while pending:
+                name, text, result = pending.popleft()
+                yield name, self._remember(text, result.result()) if isinstance(result, Future) else result
+
+    def _recall(self, text: str) -> Optional[Tuple[List[QAChapter], List[Path]]]:
+        """Returns a copy of the result of the last run for the same source, if it is memoized."""
+        if self._memo is None or text not in self._memo:
+            return None
+        self._next_memo[text] = self._memo[text]
+        return copy.deepcopy(self._memo[text])
+
+    def _remember(
+        self, text: str, result: Tuple[List[QAChapter], List[Path]]
+    ) -> Tuple[List[QAChapter], List[Path]]:
+        if self._memo is not None:
+            # the chapters might be changed by processors, so a copy is kept
+            self._next_memo[text] = copy.deepcopy(result)
+        return result
+
+    def _import_source(self, text: str) -> Tuple[List[QAChapter], List[Path]]:
+        """Converts a single markdown source into its chapters. If the same source has been converted before, the
+        result is loaded from the cache instead.
+
+        Args:
+            text (str): The markdown source
+
+        Returns:
+            Tuple[List[QAChapter], List[Path]]: The chapters and all images that are used in the source (in order of
+            their occurrence), including the ones that do not exist (yet)
+        """
+        key = hash_key(self._cache_salt, text)
+        cached = self._cache.get_json(key) if self._cache else None
+        if cached is not None:
+            logger.debug("Using cached conversion '%s'", key)
+            chapters = [QAChapter.from_dict(chap) for chap in cached["chapters"]]
+            media = [self.root.joinpath(img).resolve() for img in cached["media"]]
+            return chapters, media
+
+        self._source_media = []
+        self._resolved_media = {}
+        source = parse_html(self.md.convert(text), self.html_parser)
+        source = self._fix_math(source)
+        chapter_sources = [
+            self._split_chapter(chap_nodes) for chap_nodes in split_at_tags("h1", fragment_nodes(source))
+        ]
+        # the questions of all items are converted at once, see `_convert_questions`
+        questions = self._convert_questions(
+            [
+                "".join([str(elem) for elem in item_nodes[0].contents])
+                for _, item_sources in chapter_sources
+                for _, item_nodes in item_sources
+            ]
+        )
+        chapters = [self._create_chapter(name, item_sources, questions) for name, item_sources in chapter_sources]
+        media = self._source_media
+
+        if self._cache:
+            self._cache.set_json(
+                key,
+                {
+                    "chapters": [chap.to_dict() for chap in chapters],
+                    "media": [os.path.relpath(img, self.root) for img in media],
+                },
+            )
+        return chapters, media
 
     def _fix_math(self, bs: BeautifulSoup):
         """As the only markdown extension that reliably detects math is the 'mdx_math' extension, we have to work around
@@ -95,48 +253,103 @@ class MarkdownImporter(base.MankiImporter):
 
         return bs
 
-    def _create_chapter(self, chapter_bs: BeautifulSoup) -> QAChapter:
-        name = chapter_bs.find("h1").string
+    def _split_chapter(
+        self, chapter_nodes: List[PageElement]
+    ) -> Tuple[str, List[Tuple[Optional[List[PageElement]], List[PageElement]]]]:
+        """Splits a chapter into the sources of its items.
+
+        Args:
+            chapter_nodes (List[PageElement]): The nodes of the chapter, starting with its <h1> tag
+
+        Returns:
+            Tuple[str, List[Tuple[Optional[List[PageElement]], List[PageElement]]]]: The name of the chapter and the
+            sources of all items. Every item is given by the nodes of a long question (or `None`) and the nodes of
+            the item itself.
+        """
+        name = chapter_nodes[0].string
         if name is None:
             logger.critical("I could not find a top-level heading (starting with a single '#').")
             exit()
-        chap = QAChapter(name)
-        item_sources = split_at_tags("h2", chapter_bs)
-        prev_source: BeautifulSoup = None
-        for item_source in item_sources:
+        items = []
+        prev_source: List[PageElement] = None
+        for item_source in split_at_tags("h2", chapter_nodes[1:]):
             if self._is_long_question(item_source) and prev_source is None:
                 prev_source = item_source
-            elif prev_source:
-                item = self._create_long_item(prev_source, item_source)
-                chap.add_item(item)
-                prev_source = None
             else:
-                item = self._create_normal_item(item_source)
-                chap.add_item(item)
+                items.append((prev_source, item_source))
+                prev_source = None
+        # a plain string, the chapter must not keep a reference to the parsed source
+        return str(name), items
+
+    def _create_chapter(
+        self,
+        name: str,
+        item_sources: List[Tuple[Optional[List[PageElement]], List[PageElement]]],
+        questions: Iterator[List[PageElement]],
+    ) -> QAChapter:
+        chap = QAChapter(name)
+        for long_question, item_source in item_sources:
+            item = self._create_normal_item(item_source, next(questions))
+            if long_question:
+                item = self._create_long_item(long_question, item)
+            chap.add_item(item)
         return chap
 
-    def _is_long_question(self, item_bs: BeautifulSoup):
-        h2_tag = item_bs.find("h2")
+    def _convert_questions(self, questions: List[str]) -> Iterator[List[PageElement]]:
+        """The content of <h2> tags is not parsed by the markdown extension. As the heading might contain complex
+        math, multiple paragraphs, images, ... or other markdown-content, it has to be converted again.
+
+        Every call of the markdown converter has a considerable overhead. So all questions are joined by separators
+        and converted (and parsed) at once. If the separators do not survive the conversion, every question is
+        converted on its own instead.
+
+        Args:
+            questions (List[str]): The contents of the <h2> tags
+
+        Returns:
+            Iterator[List[PageElement]]: The nodes of the converted questions
+        """
+        separator = f"\n\n<!--{QUESTION_SEPARATOR}-->\n\n"
+        converted = parse_html(self.md.convert(separator.join(questions)), self.html_parser)
+        parts = [[]]
+        for node in fragment_nodes(converted):
+            if isinstance(node, Comment) and node == QUESTION_SEPARATOR:
+                parts.append([])
+            else:
+                parts[-1].append(node)
+
+        if len(parts) != len(questions):
+            logger.debug("Converting %d questions one by one", len(questions))
+            parts = [fragment_nodes(parse_html(self.md.convert(q), self.html_parser)) for q in questions]
+
+        # the converter separates blocks by line breaks. They are not part of a single converted question.
+        for part in parts:
+            while part and isinstance(part[0], NavigableString) and part[0] == "\n":
+                part.pop(0)
+            while part and isinstance(part[-1], NavigableString) and part[-1] == "\n":
+                part.pop()
+        return iter(parts)
+
+    def _is_long_question(self, item_nodes: List[PageElement]):
+        h2_tag = item_nodes[0]
         title: str = h2_tag.contents[0] or None
         return title.startswith("---")
 
-    def _create_long_item(self, question_bs: BeautifulSoup, answer_bs: BeautifulSoup):
-        # this creates an item which has at least a correct answer
-        item = self._create_normal_item(answer_bs)
-        h2_tag = question_bs.find("h2")
-        question_string = "".join([str(elem) for elem in h2_tag.next_siblings])
-        question_bs = self._handle_media(question_string)
-        question_string = str(question_bs)
+    def _create_long_item(self, question_nodes: List[PageElement], item: QAItem):
+        # the item has been created from the answer part of a long question already
+        question_media = self._handle_media(question_nodes[1:])
+        question_string = serialize(question_nodes[1:])
+        media = list(dict.fromkeys(question_media + item.media))
 
-        return QAItem(question_string, item.answer, item.comment, item.tags)
+        return QAItem(question_string, item.answer, item.comment, item.tags, media)
 
-    def _create_normal_item(self, item_bs: BeautifulSoup) -> QAItem:
-        # exit()
-        h2_tag = item_bs.find("h2")
+    def _create_normal_item(self, item_nodes: List[PageElement], question_nodes: List[PageElement]) -> QAItem:
         answer, comment = [], []
         is_comment = False
-        for next_sibling in h2_tag.find_next_siblings():
-            if next_sibling.name == "hr":
+        for next_sibling in item_nodes[1:]:
+            if not isinstance(next_sibling, Tag):
+                continue
+            elif next_sibling.name == "hr":
                 # if a ruler is present, everything after is treated as comment
                 is_comment = True
             else:
@@ -145,15 +358,12 @@ class MarkdownImporter(base.MankiImporter):
                 else:
                     answer.append(next_sibling)
 
-        question_string = "".join([str(elem) for elem in h2_tag.contents])
-        # the content of <h2> tags is not parsed by the markdown extension.
-        # As the heading might contain complex math, multiple paragraphs, images, ... or
-        # other markdown-content, it has to be parsed again (manually).
-        question_string = self.md.convert(question_string)
-        question_bs = self._handle_media(question_string)
-        question_string = str(question_bs)
+        # the question has been converted from the contents of the <h2> tag already
+        media = self._handle_media(question_nodes)
+        question_string = serialize(question_nodes)
         # if display math is used in a normal markdown heading (`## Math: $$a+b=c$$`), the two dollars get interpreted
-        # as if they would introduce inline math twice and the result is parsed wrong in the second pass as well... This can be fixed manually.
+        # as if they would introduce inline math twice and the result is parsed wrong in the second pass as well...
+        # This can be fixed manually.
         question_string = question_string.replace(
             r'<span class="arithmatex"><span class="arithmatex">\(&lt;span class="arithmatex"&gt;\(',
             r'<span class="arithmatex">\(',
@@ -162,18 +372,16 @@ class MarkdownImporter(base.MankiImporter):
         question_string = question_string.replace(r'<script type="math/tex">', r"\(")
         question_string = question_string.replace(r"</script></span>", r"\)</span>")
 
-        # this part needs refactoring!
-        answer_string = "".join([str(elem) for elem in answer])
-        answer_bs = self._handle_media(answer_string)
-        answer_string = str(answer_bs)
-        # exit()
+        # answer and comment are part of the parsed source already, they are only serialized once
+        media += self._handle_media(answer)
+        answer_string = serialize(answer)
 
-        comment_string = "".join([str(elem) for elem in comment]) if comment else None
+        comment_string = None
         if comment:
-            comment_bs = self._handle_media(comment_string)
-            comment_string = str(comment_bs)
+            media += self._handle_media(comment)
+            comment_string = serialize(comment)
 
-        return QAItem(question_string, answer_string, comment_string)
+        return QAItem(question_string, answer_string, comment_string, media=list(dict.fromkeys(media)))
 
     def _find_chapter_name(self, html: BeautifulSoup):
         h1: ResultSet = html.find_all("h1")
@@ -184,38 +392,28 @@ class MarkdownImporter(base.MankiImporter):
         else:
             return h1[0].contents[0]
 
-    def _handle_media(self, bs: Union[str, BeautifulSoup]):
-        if not isinstance(bs, BeautifulSoup):
-            bs = BeautifulSoup(bs, features="html.parser")
-
-        for img in bs.find_all("img", recursive=True):
-            root = Path(self.config.get("general.root"))
-            img_path = root.joinpath(img.attrs["src"]).resolve()
-            if img_path.exists():
-                if not self._is_duplicate_image(img_path):
-                    self.package.media.append(img_path)
-                    logger.info("Using image: '%s' from '%s'", img.attrs["src"], img_path)
-                else:
-                    logger.debug("Skipping duplicate image %s", img.attrs["src"])
-            else:
-                logger.warning(
-                    "Image at '%s' does not exists. Ignoring it. (Found in: '%s...')", img_path, bs.get_text()[0:30]
-                )
-        return bs
+    def _resolve_media(self, src: str) -> Path:
+        # images are usually used many times, so each source is only resolved once
+        if src not in self._resolved_media:
+            self._resolved_media[src] = self.root.joinpath(src).resolve()
+        return self._resolved_media[src]
 
-    def _is_duplicate_image(self, img_path: Path):
-        for path in self.package.media:
-            if path == img_path:
-                logger.info("Reusing image '%s' from '%s'", img_path.name, img_path)
-                return True
-            elif path.name == img_path.name:
-                logger.warning(
-                    "A (different) image of name '%s' is already used. "
-                    + "Please rename the image to prevent unwanted results! "
-                    + "Current image is at '%s', but I already use an image at '%s'",
-                    img_path.name,
-                    img_path,
-                    path,
-                )
-                return True
-        return False
+    def _handle_media(self, nodes: Iterable[PageElement]) -> List[str]:
+        """Collects all images inside of `nodes` and remembers them as media of the current source. Whether they
+        exist is checked when the source is added to the package, as the result of the conversion is cached.
+
+        Args:
+            nodes (Iterable[PageElement]): The nodes that are searched for images
+
+        Returns:
+            List[str]: The sources of all images as they are given in the `src` attribute
+        """
+        sources = []
+        for node in nodes:
+            if not isinstance(node, Tag):
+                continue
+            for img in [node] if node.name == "img" else node.find_all("img"):
+                src = img.attrs["src"]
+                sources.append(src)
+                self._source_media.append(self._resolve_media(src))
+        return sources
\ No newline at end of file
@@ -1,59 +1,238 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-import warnings
+import threading
+from typing import Callable, Dict, List, Set
 
+from manki import snapshot
 from manki.configuration import MankiConfig
+from manki.data_struct import QAPackage
 
-from manki.exporter.exporter_html import HTMLExporter
-from manki.exporter.exporter_pdf import PdfExporter
+from manki.exporter import EXPORTERS, available_formats, get_exporter
+from manki.exporter.base import MankiExporter
 
 from manki.processor.random_question import RandomQuestionProcessor
-from manki.util import sanitize_string
+from manki.util import ensure_list, sanitize_string
 
 from .cli import parser
+from manki.importer.base import MankiImporter, iter_sources
 from manki.importer.importer_markdown import MarkdownImporter
-from manki.exporter.exporter_anki import AnkiExporter
 import logging
 from rich.logging import RichHandler
-import rich.traceback as traceback
 import os
 
 from jinja2 import Environment, FileSystemLoader
 
-traceback.install()
-
 logger = logging.getLogger()
 handler = RichHandler()
 handler.setLevel(logging.INFO)
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
-# filter warnings from genanki
-warnings.filterwarnings("ignore", module="genanki", message="^Field contained the following invalid HTML tags")
-
 
 def create_new(args):
     title = args.new
     title_sanitized = sanitize_string(title)
     folder = Path.cwd().joinpath(title_sanitized)
     folder.mkdir(exist_ok=True)
+    TMPLT_PATH = Path(__file__).parent.parent.joinpath("templates").resolve()
+    template_env = Environment(
+        loader=FileSystemLoader(TMPLT_PATH),
+        line_statement_prefix="§",
+        line_comment_prefix="°",
+        comment_start_string="°",
+    )
     for name in ["macros.md", "manki.toml", "questions.md"]:
         logger.debug("Creating '%s'", name)
-        TMPLT_PATH = Path(__file__).parent.parent.joinpath("templates").resolve()
-        loader = FileSystemLoader(TMPLT_PATH)
-        template_env = Environment(
-            loader=loader,
-            line_statement_prefix="§",
-            line_comment_prefix="°",
-            comment_start_string="°",
-        )
-        template_env.globals["title"] = title
-        template_env.globals["title_sanitized"] = title_sanitized
-        rendered = template_env.get_template(f"new_{name}.j2").render()
+        rendered = template_env.get_template(f"new_{name}.j2").render(title=title, title_sanitized=title_sanitized)
         with open(folder.joinpath(name), "w") as f:
             f.write(rendered)
 
 
+def run_streamed(config: MankiConfig, importer: MankiImporter, processors, exporter_classes) -> List[MankiExporter]:
+    """Passes the chapters one after another from the importer through all processors to the exporters. Sources are
+    read when they are converted and chapters are dropped as soon as the exporters have consumed them (if the
+    exporters support it). So only a few chapters have to be kept in memory at the same time.
+
+    Returns:
+        List[MankiExporter]: The exporters, ready to export
+    """
+    pack = importer.package
+    chapters = importer.iter_chapters(iter_sources(config))
+    for processor_cls in processors:
+        chapters = processor_cls(config, pack).process_chapters(chapters)
+
+    exporters = [exporter_cls(config.freeze(), pack) for exporter_cls in exporter_classes]
+    # exporters that do not export chapters one after another add them to the package. As they all share the
+    # package, it gets every chapter only once.
+    streaming = [exp for exp in exporters if type(exp).add_chapter is not MankiExporter.add_chapter]
+    collects = len(streaming) < len(exporters)
+    for chapter in chapters:
+        if collects:
+            pack.add_chapter(chapter)
+        for exporter in streaming:
+            exporter.add_chapter(chapter)
+    return exporters
+
+
+def load_config(root: Path, args) -> MankiConfig:
+    config = MankiConfig(root=root)
+    if args.no_cache:
+        config.set("cache.enabled", False)
+    if args.jobs is not None:
+        config.set("input.jobs", args.jobs)
+    return config
+
+
+def get_exporters(config: MankiConfig, args) -> list:
+    """Returns the exporters of all formats given by `--format` (separated by commas) or by `output.formats`. Every
+    format is exported once, in the order of its first occurrence.
+    """
+    formats = args.format.split(",") if args.format else ensure_list(config.get("output.formats", "apkg"))
+    exporters = []
+    for name in dict.fromkeys(name.strip() for name in formats):
+        try:
+            exporters.append(get_exporter(name))
+        except KeyError:
+            logger.error(
+                "The output format '%s' is unknown. Available formats: %s", name, ", ".join(available_formats())
+            )
+            exit(code=1)
+    return exporters
+
+
+def create_processors(config: MankiConfig) -> list:
+    processors = []
+    if config.get("processor.media"):
+        from manki.processor.media import MediaProcessor
+
+        logger.info("Running media processor.")
+        processors.append(MediaProcessor)
+    if config.get("processor.randomquestions"):
+        logger.info("Running random question processor.")
+        processors.append(RandomQuestionProcessor)
+    return processors
+
+
+def create_exporters(
+    config: MankiConfig, importer: MankiImporter, exporter_classes: list, stream: bool = False
+) -> List[MankiExporter]:
+    """Imports and processes the project once for all exporters.
+
+    Returns:
+        List[MankiExporter]: The exporters, ready to export
+    """
+    processors = create_processors(config)
+    if stream or config.get("general.stream", False):
+        return run_streamed(config, importer, processors, exporter_classes)
+
+    pack = importer.create_package(dict(iter_sources(config)))
+    return process_package(config, pack, exporter_classes, processors)
+
+
+def process_package(
+    config: MankiConfig, pack: QAPackage, exporter_classes: list, processors: list = None
+) -> List[MankiExporter]:
+    """Processes an imported package. Every exporter gets its own frozen copy of the configuration, so that they can
+    export at the same time.
+
+    Returns:
+        List[MankiExporter]: The exporters, ready to export
+    """
+    if processors is None:
+        processors = create_processors(config)
+    for processor_cls in processors:
+        processor_cls(config, pack).process()
+
+    return [exporter_cls(config.freeze(), pack) for exporter_cls in exporter_classes]
+
+
+def export_all(exporters: List[MankiExporter]):
+    """Exports all formats. Several exporters run in parallel threads, they only read the (processed) package."""
+    if len(exporters) == 1:
+        exporters[0].export()
+        return
+    with ThreadPoolExecutor(max_workers=len(exporters)) as pool:
+        for future in [pool.submit(exporter.export) for exporter in exporters]:
+            future.result()
+
+
+def conversion_log(exporters: List[MankiExporter]) -> str:
+    """Returns the conversion log of the GitHub action. It describes the Anki package or, if no package was exported,
+    the first format.
+    """
+    # the exporter is compared by its name, so that genanki is not imported if the package was not exported
+    module, _, name = EXPORTERS["apkg"].partition(":")
+    apkg = [exp for exp in exporters if (type(exp).__module__, type(exp).__name__) == (module, name)]
+    exporter = apkg[0] if apkg else exporters[0]
+    file_name = sanitize_string(exporter.package.title) + (".apkg" if apkg else "")
+    return f"Exporting '{file_name}' with {exporter.n_chapters} decks and {exporter.n_items} cards in total"
+
+
+def watch_project(root: Path, args, export: Callable[[MankiConfig, MankiImporter, List[Path]], None]):
+    """Exports the project whenever one of its files changes. The importer is kept between the builds, so only the
+    sources that have changed are converted again. It is only recreated if the configuration changes.
+
+    Args:
+        export (Callable[[MankiConfig, MankiImporter, List[Path]], None]): Exports the project with the given
+            configuration and importer, it gets the changed files
+    """
+    from manki.watch import project_files, watch
+
+    config_file = root.joinpath("manki.toml").resolve()
+    state = {}
+
+    def rebuild(changed: List[Path]):
+        # every build starts with a fresh configuration, so that e.g. the time of the build is up to date
+        state["config"] = config = load_config(root, args)
+        if "importer" not in state or config_file in changed:
+            state["importer"] = MarkdownImporter(config, memoize=True)
+        importer = state["importer"]
+        importer.reset_package()
+        export(config, importer, changed)
+
+    def files() -> Set[Path]:
+        if "config" not in state:
+            return {config_file}
+        importer = state["importer"]
+        # the missing images are watched as well, a build has to add them as soon as they exist
+        return project_files(state["config"], [*importer.package.media.all_paths(), *importer.missing_media])
+
+    watch(rebuild, files)
+
+
+def serve_project(root: Path, args):
+    """Serves a live preview of the HTML export that is updated whenever one of the files of the project changes.
+    Only chapters that have changed are rendered again.
+    """
+    from manki.server import PreviewServer
+
+    server = PreviewServer(root, args.host, args.port)
+    fragments: Dict[str, str] = {}
+    html_exporter = get_exporter("html")
+
+    def export(config: MankiConfig, importer: MankiImporter, changed: List[Path]):
+        if any(directory in path.parents for path in changed for directory in config.template_dirs):
+            fragments.clear()
+        exporter = create_exporters(config, importer, [partial(html_exporter, fragments=fragments)])[0]
+        server.publish(exporter.render())
+
+    threading.Thread(target=watch_project, args=(root, args, export), daemon=True).start()
+    logger.info("Serving the preview at %s (press Ctrl+C to stop)", server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped the preview")
+    finally:
+        server.server_close()
+
+
 def main():
+    # installed only when manki is run, not when it is imported
+    import rich.traceback as traceback
+
+    traceback.install()
+
     args = parser.parse_args()
     if args.verbose:
         handler.setLevel(logging.DEBUG)
@@ -66,45 +245,42 @@ def main():
         exit()
 
     root = Path(args.root or Path.cwd())
-    config = MankiConfig(root=root)
-    # page = config.render_template("anki/question.html")
-    # print(page)
-    sources = {}
-    for input in config.get("input.source"):
-        file_path = root.joinpath(input)
-        with open(file_path, "r") as f:
-            sources[file_path.stem] = f.read()
-            # print(sources)
-
-    # prepare the importer
-    importer = MarkdownImporter(config)
-    pack = importer.create_package(sources)
-    if config.get("processor.randomquestions"):
-        logger.info("Running random question processor.")
-        rqp = RandomQuestionProcessor(config, pack)
-        rqp.process()
 
-    config.set("package", pack.to_dict())
+    if args.command == "serve":
+        serve_project(root, args)
+        return
+
+    if args.watch:
+        watch_project(
+            root,
+            args,
+            lambda config, importer, changed: export_all(
+                create_exporters(config, importer, get_exporters(config, args), args.stream)
+            ),
+        )
+        return
+
+    config = load_config(root, args)
+    if args.command == "import":
+        pack = MarkdownImporter(config).create_package(dict(iter_sources(config)))
+        snapshot.dump(pack, args.output or sanitize_string(pack.title) + snapshot.SUFFIX, config.get("general.root"))
+        return
 
-    if args.format == "apkg":
-        exporter = AnkiExporter(config, pack)
-    elif args.format == "pdf":
-        exporter = PdfExporter(config, pack)
-    elif args.format == "html":
-        exporter = HTMLExporter(config, pack)
+    if args.command == "export":
+        try:
+            pack = snapshot.load(args.snapshot, config.get("general.root"))
+        except (OSError, ValueError) as e:
+            logger.critical("The snapshot '%s' could not be loaded: %s", args.snapshot, e)
+            exit(code=1)
+        exporters = process_package(config, pack, get_exporters(config, args))
     else:
-        logger.error("The output format '%s' is unknown.", args.format)
-        exit(code=1)
+        importer = MarkdownImporter(config)
+        exporters = create_exporters(config, importer, get_exporters(config, args), args.stream)
+    export_all(exporters)
 
-    exporter.export()
-    
     if args.git_action:
         with open(os.environ['GITHUB_OUTPUT'], 'a') as fh:
-            file_name = sanitize_string(exporter.package.title) + ".apkg"
-            n_decks = exporter.package.n_chapters
-            n_cards = exporter.package.n_items
-            info = f"Exporting '{file_name}' with {n_decks} decks and {n_cards} cards in total"
-            print(f'conversion-log={info}', file=fh)
+            print(f'conversion-log={conversion_log(exporters)}', file=fh)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+def file_hash(path: Path) -> str:
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class MediaRegistry:
+    """All media files of a package. Every file gets a unique name inside of the package (Anki only knows the names of
+    media files, not their paths).
+
+    Files are indexed by their (resolved) path and by their name, so adding a file that is used many times costs only
+    a dictionary lookup. If two different files have the same name, the later one is renamed deterministically by
+    appending a hash of its content. With `hashing` enabled, byte-identical files at different paths are stored only
+    once.
+    """
+
+    def __init__(self, hashing: bool = False):
+        self.hashing = hashing
+        # the unique files in the order they were added (a dictionary, so files can be replaced in constant time)
+        self._paths: Dict[Path, None] = {}
+        self._by_path: Dict[Path, str] = {}
+        self._by_name: Dict[str, Path] = {}
+        self._by_hash: Dict[str, str] = {}
+        # the reverse of `_by_path` and `_by_hash`, so replacing a file does not have to search them
+        self._users: Dict[str, List[Path]] = {}
+        self._digests: Dict[str, List[str]] = {}
+        self._exists: Dict[Path, bool] = {}
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, path: Path) -> bool:
+        return path in self._by_path
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MediaRegistry):
+            return self._by_path == other._by_path
+        return list(self) == other
+
+    def __repr__(self) -> str:
+        return f"MediaRegistry({list(self._paths)!r})"
+
+    def exists(self, path: Path) -> bool:
+        """Checks if the file exists. The result is cached, so every file is checked only once."""
+        if path not in self._exists:
+            self._exists[path] = path.is_file()
+        return self._exists[path]
+
+    def add(self, path: Path) -> Optional[str]:
+        """Adds a media file to the package, if it has not been added before.
+
+        Args:
+            path (Path): The resolved path of the file
+
+        Returns:
+            Optional[str]: The name of the file inside of the package or `None` if the file does not exist
+        """
+        name = self._by_path.get(path)
+        if name is not None:
+            logger.debug("Reusing image '%s' from '%s'", name, path)
+            return name
+        if not self.exists(path):
+            logger.warning("Image at '%s' does not exists. Ignoring it.", path)
+            return None
+
+        digest = file_hash(path) if self.hashing else None
+        if digest in self._by_hash:
+            name = self._by_hash[digest]
+            logger.info("Image '%s' is identical to '%s', using it instead", path, self._by_name[name])
+            self._by_path[path] = name
+            self._users[name].append(path)
+            return name
+
+        name = path.name
+        if name in self._by_name:
+            digest = digest or file_hash(path)
+            name = f"{path.stem}_{digest[:8]}{path.suffix}"
+            logger.warning(
+                "A (different) image of name '%s' is already used (at '%s'). The image at '%s' is renamed to '%s'",
+                path.name,
+                self._by_name[path.name],
+                path,
+                name,
+            )
+
+        self._paths[path] = None
+        self._by_path[path] = name
+        self._by_name[name] = path
+        self._users[name] = [path]
+        self._digests[name] = []
+        if digest is not None:
+            self._by_hash[digest] = name
+            self._digests[name].append(digest)
+        logger.info("Using image: '%s' from '%s'", name, path)
+        return name
+
+    def replace(self, path: Path, new_path: Path) -> Optional[str]:
+        """Replaces a file of the package by another one (e.g. a compressed version of it). The name inside of the
+        package keeps its stem, but gets the suffix of the new file.
+
+        Args:
+            path (Path): The resolved path of the file that is part of the package
+            new_path (Path): The resolved path of the replacement
+
+        Returns:
+            Optional[str]: The new name of the file inside of the package or `None` if `path` is not part of it
+        """
+        name = self._by_path.get(path)
+        if name is None:
+            return None
+        original = self._by_name[name]
+        if original == new_path:
+            # an identical file has been replaced already
+            return name
+        del self._by_name[name]
+        del self._paths[original]
+
+        new_name = self._by_path.get(new_path)
+        if new_name is None:
+            new_name = Path(name).stem + new_path.suffix
+            if new_name in self._by_name:
+                new_name = f"{Path(name).stem}_{file_hash(new_path)[:8]}{new_path.suffix}"
+            self._paths[new_path] = None
+            self._by_name[new_name] = new_path
+            self._by_path[new_path] = new_name
+            self._users[new_name] = [new_path]
+            self._digests[new_name] = []
+            self._exists[new_path] = True
+
+        # files that are identical to the replaced one use the replacement, too
+        users = self._users.pop(name)
+        for alias in users:
+            self._by_path[alias] = new_name
+        self._users[new_name].extend(users)
+        digests = self._digests.pop(name)
+        for digest in digests:
+            self._by_hash[digest] = new_name
+        self._digests[new_name].extend(digests)
+        logger.debug("Replaced image '%s' by '%s' from '%s'", name, new_name, new_path)
+        return new_name
+
+    def name(self, path: Path) -> Optional[str]:
+        """Returns the name of the file inside of the package or `None` if it is not part of the package."""
+        return self._by_path.get(path)
+
+    @classmethod
+    def from_files(
+        cls, files: Iterable[Tuple[str, Path]], aliases: Iterable[Tuple[Path, str]] = (), hashing: bool = False
+    ) -> "MediaRegistry":
+        """Restores a registry from the result of `files` and `aliases`. The files are not checked again."""
+        registry = cls(hashing=hashing)
+        for name, path in files:
+            registry._paths[path] = None
+            registry._by_path[path] = name
+            registry._by_name[name] = path
+            registry._users[name] = [path]
+            registry._digests[name] = []
+            registry._exists[path] = True
+        for path, name in aliases:
+            registry._by_path[path] = name
+            registry._users[name].append(path)
+        return registry
+
+    def aliases(self) -> List[Tuple[Path, str]]:
+        """Returns the paths that are not stored themselves and the names of the files that are used instead (e.g.
+        identical or replaced files)."""
+        return [(path, name) for path, name in self._by_path.items() if self._by_name.get(name) != path]
+
+    def all_paths(self) -> List[Path]:
+        """Returns the paths of all files that have been added, including identical and replaced files."""
+        return list(self._by_path)
+
+    def files(self) -> List[Tuple[str, Path]]:
+        """Returns the name inside of the package and the path of all (unique) files."""
+        return [(self._by_path[path], path) for path in self._paths]
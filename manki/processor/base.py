@@ -1,6 +1,6 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 from manki.configuration import MankiConfig
-from manki.data_struct import QAPackage
+from manki.data_struct import QAChapter, QAPackage
 
 
 class MankiProcessor:
@@ -10,3 +10,20 @@ class MankiProcessor:
 
     def process(self):
         raise NotImplementedError(f"The '{self.__class__}'-Processor is not implemented correctly!")
+
+    def process_chapters(self, chapters: Iterable[QAChapter]) -> Iterator[QAChapter]:
+        """Processes a stream of chapters that are not part of the package (yet). By default all chapters are collected
+        and processed at once by `process`. Processors that can work on single chapters should override this method,
+        so that the chapters do not have to be kept in memory.
+
+        Args:
+            chapters (Iterable[QAChapter]): The chapters to be processed
+
+        Returns:
+            Iterator[QAChapter]: The processed chapters
+        """
+        package = self.package
+        self.package = QAPackage(package.title, package.author, list(chapters), package.media)
+        self.process()
+        chapters, self.package = self.package.chapters, package
+        return iter(chapters)
@@ -0,0 +1,189 @@
+import atexit
+import io
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from manki.cache import CACHE_DIR, hash_key
+from manki.configuration import MankiConfig
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.media import file_hash
+from manki.util import replace_img_src
+from .base import MankiProcessor
+
+import logging
+
+try:
+    import PIL
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is an optional dependency
+    PIL = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+# the Pillow format and the suffix of the converted images
+FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "jpg": ("JPEG", ".jpg"),
+    "png": ("PNG", ".png"),
+}
+# only raster images are processed, vector graphics and (possibly animated) GIFs are kept as they are
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+
+_temp_dir: Optional[Path] = None
+
+
+def _temporary_directory() -> Path:
+    """Returns the directory of the processed images if caching is disabled. It is shared by all runs and removed
+    when Manki exits (the exporters read the images after the processor is done)."""
+    global _temp_dir
+    if _temp_dir is None:
+        _temp_dir = Path(tempfile.mkdtemp(prefix="manki-media-")).resolve()
+        atexit.register(shutil.rmtree, _temp_dir, ignore_errors=True)
+    return _temp_dir
+
+
+class MediaProcessor(MankiProcessor):
+    """Shrinks, recompresses and converts the images of the package.
+
+    The processed images are written to the `media` directory of the cache. Their name is derived from the content of
+    the original image and the settings, so an image is processed only once as long as neither changes. If caching is
+    disabled, they are written to a temporary directory instead. The sources of the images in the items are rewritten
+    to the processed files.
+    """
+
+    def __init__(self, config: MankiConfig, package: QAPackage):
+        super().__init__(config, package)
+        self.root = Path(config.get("general.root"))
+        # without the cache, the images are processed again on every run
+        self.reuse = config.get("cache.enabled", True)
+        if self.reuse:
+            self.directory = self.root.joinpath(config.get("cache.dir", CACHE_DIR), "media")
+        else:
+            self.directory = _temporary_directory()
+
+        image_format = self._deep_get("format")
+        if image_format is not None and image_format.lower() not in FORMATS:
+            logger.warning("The image format '%s' is unknown, the images keep their format.", image_format)
+            image_format = None
+        self.settings: Dict[str, Any] = {
+            "max_width": self._deep_get("max_width", 0),
+            "max_height": self._deep_get("max_height", 0),
+            "format": image_format.lower() if image_format else None,
+            "quality": self._deep_get("quality", 80),
+        }
+        self._processed: Dict[Path, Optional[Path]] = {}
+
+        if PIL is None:
+            logger.warning("Processing images requires Pillow ('pip install Pillow'). The images are used as they are.")
+
+    def _deep_get(self, key, default=None):
+        return self.config.get("processor.media." + key, default=default)
+
+    def process(self):
+        for chapter in self.package.chapters:
+            self._process_chapter(chapter)
+
+    def process_chapters(self, chapters: Iterable[QAChapter]) -> Iterator[QAChapter]:
+        # the images of a chapter are part of the package before the chapter is passed on
+        for chapter in chapters:
+            self._process_chapter(chapter)
+            yield chapter
+
+    def _process_chapter(self, chapter: QAChapter):
+        if PIL is None:
+            return
+        for item in chapter.items:
+            self._process_item(item)
+
+    def _process_item(self, item: QAItem):
+        sources = {src: self._processed_src(src) for src in item.media}
+        if all(src == new_src for src, new_src in sources.items()):
+            return
+        item.question = replace_img_src(item.question, sources)
+        item.answer = replace_img_src(item.answer, sources)
+        item.comment = replace_img_src(item.comment, sources)
+        item.media = list(dict.fromkeys(sources[src] for src in item.media))
+
+    def _processed_src(self, src: str) -> str:
+        """Returns the source of the processed image (relative to the root of the project)."""
+        img_path = self.root.joinpath(src).resolve()
+        if img_path not in self._processed:
+            new_path = None
+            if img_path in self.package.media and img_path.suffix.lower() in RASTER_SUFFIXES:
+                new_path = self._process_image(img_path)
+            if new_path is not None:
+                self.package.media.replace(img_path, new_path)
+            self._processed[img_path] = new_path
+
+        new_path = self._processed[img_path]
+        if new_path is None:
+            return src
+        return Path(os.path.relpath(new_path, self.root)).as_posix()
+
+    def _process_image(self, img_path: Path) -> Optional[Path]:
+        image_format, suffix = FORMATS.get(self.settings["format"], (None, img_path.suffix.lower()))
+        key = hash_key(file_hash(img_path), self.settings, PIL.__version__)
+        new_path = self.directory.joinpath(key[:2], key + suffix)
+        if self.reuse and new_path.is_file():
+            logger.debug("Using processed image '%s' for '%s'", new_path, img_path)
+            return new_path.resolve()
+
+        try:
+            with Image.open(img_path) as img:
+                original_format = img.format
+                image_format = image_format or original_format
+                img = ImageOps.exif_transpose(img)
+                size = img.size
+                img.thumbnail(
+                    (self.settings["max_width"] or size[0], self.settings["max_height"] or size[1]),
+                    Image.LANCZOS,
+                )
+                resized = img.size != size
+                if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+                    # JPEG has no transparency, transparent areas become white
+                    rgba = img.convert("RGBA")
+                    img = Image.new("RGB", rgba.size, "white")
+                    img.paste(rgba, mask=rgba.getchannel("A"))
+
+                buffer = io.BytesIO()
+                options = {"optimize": True}
+                if image_format in ("JPEG", "WEBP"):
+                    options["quality"] = self.settings["quality"]
+                img.save(buffer, format=image_format, **options)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not process image '%s', it is used as it is: %s", img_path, e)
+            return None
+
+        data = buffer.getvalue()
+        original_size = img_path.stat().st_size
+        if image_format == original_format and not resized and len(data) >= original_size:
+            # recompressing did not help, the original is used (and cached, so it is not tried again)
+            data = img_path.read_bytes()
+
+        tmp = None
+        try:
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            # every run writes its own temporary file, so that concurrent runs do not write into the same file
+            fd, tmp = tempfile.mkstemp(prefix=f".{new_path.stem}.", suffix=".tmp", dir=new_path.parent)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, new_path)
+        except OSError as e:
+            logger.warning("Could not write processed image '%s': %s", new_path, e)
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return None
+        logger.info(
+            "Processed image '%s' (%d kB -> %d kB)", img_path.name, original_size // 1024, len(data) // 1024
+        )
+        return new_path.resolve()
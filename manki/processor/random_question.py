@@ -1,8 +1,8 @@
 from manki.configuration import MankiConfig
 from .base import MankiProcessor
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 from manki.util import deep_get
-from manki.data_struct import QAItem, QAPackage
+from manki.data_struct import QAChapter, QAItem, QAPackage
 import random
 
 
@@ -13,15 +13,20 @@ class RandomQuestionProcessor(MankiProcessor):
     def _deep_get(self, key, default=None):
         return self.config.get("processor.randomquestions." + key, default=default)
 
+    def process_chapters(self, chapters: Iterable[QAChapter]) -> Iterator[QAChapter]:
+        # the positions of the random questions depend on the total number of items. They can only be chosen if
+        # all chapters are known, unless there are no random questions at all.
+        if self._deep_get("max_questions", 3) == 0:
+            return iter(chapters)
+        return super().process_chapters(chapters)
+
     def process(self):
         max_qa = self._deep_get("max_questions", 3)
         start_after = self._deep_get("start_after", 5)
         qas = self._deep_get("questions", "foo")
         items = [QAItem(q, a) for q, a in qas]
 
-        n_cards = 0
-        for chp in self.package.chapters:
-            n_cards += len(chp.items)
+        n_cards = self.package.n_items
 
         positions = [random.choice(range(start_after, n_cards)) for _ in range(max_qa)]
         positions = sorted(positions)
@@ -32,9 +37,9 @@ class RandomQuestionProcessor(MankiProcessor):
         for chp in self.package.chapters:
             # this loops through all chapters and checks if a random question has to be
             # inserted in the
-            chp_items = len(chp.items)
+            chp_items = chp.n_items
             while j < max_qa and positions[j] < i + chp_items:
-                chp.items.insert(positions[j], items[j])
+                chp.insert_item(positions[j], items[j])
                 j += 1
                 chp_items += 1
             i += chp_items
@@ -0,0 +1,93 @@
+"""A full-text search index for the HTML export.
+
+The index is built from the text of the questions and answers (without HTML tags and math) when the package is
+exported. It maps every word to the items that contain it. The IDs of the items of a word are stored as differences
+to the previous ID, which keeps the index small. It is written as a script next to the HTML page (browsers do not
+allow pages opened from disk to fetch JSON files), the search box of the page loads it when it is used for the first
+time. The words are sorted, so that the search box finds the words that start with a query by binary search.
+"""
+from html import unescape
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+from manki.data_struct import QAItem
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+SUFFIX = ".search.js"
+# the maximum length of the question that is shown as title of a result
+TITLE_LENGTH = 100
+
+_MATH = re.compile(r"\\\(.*?\\\)|\\\[.*?\\\]|\$\$.*?\$\$|\$[^$]*?\$", re.DOTALL)
+_TAG = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]*>", re.DOTALL | re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+# the words of the index and of the search box: letters, numbers and "_". JavaScript has no Unicode `\w`, the search
+# box gets `WORD_PATTERN` instead (Python's `\w` matches exactly these characters).
+WORD_PATTERN = r"[\p{L}\p{N}_]{2,}"
+_WORD = re.compile(r"\w{2,}")
+
+
+def words(text: str) -> List[str]:
+    """Returns the words of a text like the search box splits a query (see `html/search.html.j2`)."""
+    return _WORD.findall(unicodedata.normalize("NFC", text).lower())
+
+
+def plain_text(html: str) -> str:
+    """Returns the text of an HTML fragment without tags and math."""
+    text = _MATH.sub(" ", html)
+    text = _TAG.sub(" ", text)
+    return _SPACE.sub(" ", unescape(text)).strip()
+
+
+class SearchIndex:
+    """An inverted index of the items of a package."""
+
+    def __init__(self):
+        self.docs: List[List[Any]] = []
+        self.chapters: List[str] = []
+        self._terms: Dict[str, List[int]] = {}
+
+    def add_chapter(self, title: str):
+        """Starts a new chapter, the following items belong to it."""
+        self.chapters.append(title)
+
+    def add_item(self, item: QAItem, href: str):
+        """Adds an item of the current chapter.
+
+        Args:
+            item (QAItem): The item
+            href (str): The link to the item in the exported page(s)
+        """
+        doc = len(self.docs)
+        question = plain_text(item.question)
+        title = question if len(question) <= TITLE_LENGTH else question[: TITLE_LENGTH - 1].rstrip() + "…"
+        self.docs.append([href, title, len(self.chapters) - 1])
+        for word in set(words(question + " " + plain_text(item.answer))):
+            self._terms.setdefault(word, []).append(doc)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # the words are sorted like JavaScript compares strings (by UTF-16 code units), the IDs of the items of
+        # `words[i]` are `postings[i]`
+        sorted_words = sorted(self._terms, key=lambda word: word.encode("utf-16-be"))
+        postings = []
+        for word in sorted_words:
+            docs = self._terms[word]
+            postings.append([docs[0]] + [b - a for a, b in zip(docs, docs[1:])])
+        return {"docs": self.docs, "chapters": self.chapters, "words": sorted_words, "postings": postings}
+
+    def dump(self, file_path: Union[str, Path]):
+        """Writes the index as a script that sets `window.MANKI_SEARCH`."""
+        data = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("window.MANKI_SEARCH=")
+            f.write(data)
+            f.write(";\n")
+        logger.debug("Wrote the search index with %d words of %d items", len(self._terms), len(self.docs))
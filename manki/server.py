@@ -0,0 +1,113 @@
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from urllib.parse import unquote, urlsplit
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+# reloads the page as soon as the server sends an event
+RELOAD_SCRIPT = """<script>
+  new EventSource("/events").onmessage = function () { window.location.reload(); };
+</script>
+"""
+PLACEHOLDER = "<!DOCTYPE html><html><body><p>Building the project...</p>" + RELOAD_SCRIPT + "</body></html>"
+
+
+class PreviewServer(ThreadingMixIn, HTTPServer):
+    """A local HTTP server for the live preview of the HTML export. It serves the most recent page at `/` and the
+    files of the project (e.g. images) by their path relative to the root.
+
+    Browsers listen to the server sent events at `/events`. Whenever a new page is published, they are told to
+    reload it.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, host: str = "127.0.0.1", port: int = 8000):
+        super().__init__((host, port), PreviewHandler)
+        self.root = Path(root).resolve()
+        self.page = PLACEHOLDER
+        self.version = 0
+        self._published = threading.Condition()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def publish(self, page: str):
+        """Replaces the served page and notifies all browsers."""
+        if "</body>" in page:
+            page = page.replace("</body>", RELOAD_SCRIPT + "</body>", 1)
+        else:
+            page += RELOAD_SCRIPT
+        with self._published:
+            self.page = page
+            self.version += 1
+            self._published.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Waits until a page newer than `version` is published (or the timeout is over) and returns the version of
+        the current page."""
+        with self._published:
+            self._published.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    server: PreviewServer
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        if path in ("/", "/index.html"):
+            self._send(self.server.page.encode("utf-8"), "text/html; charset=utf-8")
+        elif path == "/events":
+            self._send_events()
+        else:
+            self._send_file(path)
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        # changed images have to be loaded again
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: str):
+        file_path = self.server.root.joinpath(path.lstrip("/")).resolve()
+        if self.server.root not in file_path.parents or not file_path.is_file():
+            self.send_error(404)
+            return
+        content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        self._send(file_path.read_bytes(), content_type)
+
+    def _send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.server.version
+        try:
+            while True:
+                new_version = self.server.wait(version, timeout=15)
+                if new_version != version:
+                    version = new_version
+                    self.wfile.write(f"data: {version}\n\n".encode("utf-8"))
+                else:
+                    # keeps the connection open and detects closed connections
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
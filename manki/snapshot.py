@@ -0,0 +1,264 @@
+"""A compact binary format for imported packages.
+
+A snapshot starts with the magic bytes `MANKI` and the format version, followed by the zlib compressed package. The
+package is stored in three parts, so that it can be loaded without looking at every single byte in Python: all
+numbers (lengths, counts and indices) as an array of 32 bit integers, the IDs of the items as an array of 64 bit
+integers, and the text of all strings, one after another. Strings that are used again and again (authors, tags,
+image sources and media names) are stored only once in a string table and referenced by their index.
+
+The paths of media files are stored relative to the root of the project, so a snapshot can be exported in another
+checkout of the same project.
+"""
+from array import array
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.media import MediaRegistry
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+MAGIC = b"MANKI"
+# has to be increased whenever the format changes. Snapshots of other versions cannot be loaded.
+FORMAT_VERSION = 2
+SUFFIX = ".mpk"
+_VERSION = struct.Struct("<H")
+# the number of strings in the string table, of the numbers and of the IDs
+_HEADER = struct.Struct("<QQQ")
+# the typecode of unsigned 32 bit integers
+_UINT32 = next(code for code in "IL" if array(code).itemsize == 4)
+
+
+def _to_bytes(numbers: array) -> bytes:
+    if sys.byteorder == "big":
+        numbers = array(numbers.typecode, numbers)
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    numbers = array(typecode)
+    numbers.frombytes(data)
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    return numbers
+
+
+class _Writer:
+    def __init__(self):
+        self.numbers = array(_UINT32)
+        self.ids = array("Q")
+        self.text: List[str] = []
+        self._refs: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def uint(self, value: int):
+        self.numbers.append(value)
+
+    def str(self, value: str):
+        self.numbers.append(len(value))
+        self.text.append(value)
+
+    def optional_str(self, value: Optional[str]):
+        # 0 marks a missing string, the length of all others is shifted by one
+        if value is None:
+            self.numbers.append(0)
+        else:
+            self.numbers.append(len(value) + 1)
+            self.text.append(value)
+
+    def ref(self, value: str):
+        """Stores the index of a string in the string table."""
+        index = self._refs.get(value)
+        if index is None:
+            index = self._refs[value] = len(self.strings)
+            self.strings.append(value)
+        self.numbers.append(index)
+
+    def refs(self, values: Optional[List[str]]):
+        # 0 marks a missing list, the length of all others is shifted by one
+        if values is None:
+            self.numbers.append(0)
+            return
+        self.numbers.append(len(values) + 1)
+        for value in values:
+            self.ref(value)
+
+    def tobytes(self) -> bytes:
+        # the string table is needed before the package can be read, so it comes first
+        numbers = array(_UINT32, [len(string) for string in self.strings]) + self.numbers
+        text = "".join(self.strings + self.text).encode("utf-8")
+        return (
+            _HEADER.pack(len(self.strings), len(numbers), len(self.ids))
+            + _to_bytes(numbers)
+            + _to_bytes(self.ids)
+            + text
+        )
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        n_strings, n_numbers, n_ids = _HEADER.unpack_from(data)
+        pos = _HEADER.size
+        numbers = _from_bytes(_UINT32, data[pos : pos + 4 * n_numbers])
+        pos += 4 * n_numbers
+        self.ids = _from_bytes("Q", data[pos : pos + 8 * n_ids])
+        pos += 8 * n_ids
+        self.text = data[pos:].decode("utf-8")
+        self.pos = 0
+
+        self.strings = [sys.intern(self._slice(length)) for length in numbers[:n_strings]]
+        self.uint = iter(numbers[n_strings:]).__next__
+
+    def _slice(self, length: int) -> str:
+        start = self.pos
+        self.pos += length
+        return self.text[start : self.pos]
+
+    def str(self) -> str:
+        return self._slice(self.uint())
+
+    def optional_str(self) -> Optional[str]:
+        length = self.uint()
+        if length == 0:
+            return None
+        return self._slice(length - 1)
+
+    def ref(self) -> str:
+        return self.strings[self.uint()]
+
+    def refs(self) -> Optional[List[str]]:
+        length = self.uint()
+        if length == 0:
+            return None
+        return [self.strings[self.uint()] for _ in range(length - 1)]
+
+
+def dumps(package: QAPackage, root: Union[str, Path]) -> bytes:
+    """Serializes a package.
+
+    Args:
+        package (QAPackage): The package
+        root (Union[str, Path]): The root of the project, the paths of media files are stored relative to it
+
+    Returns:
+        bytes: The snapshot
+    """
+    root = Path(root)
+    body = _Writer()
+    body.str(package.title)
+    # the author is a single name, a list of names or missing
+    body.uint(isinstance(package.author, str))
+    if isinstance(package.author, str):
+        body.ref(package.author)
+    else:
+        body.refs(package.author)
+
+    def relative(path: Path) -> str:
+        return Path(os.path.relpath(path, root)).as_posix()
+
+    files = package.media.files()
+    aliases = package.media.aliases()
+    body.uint(int(package.media.hashing))
+    body.uint(len(files))
+    for name, path in files:
+        body.ref(name)
+        body.str(relative(path))
+    body.uint(len(aliases))
+    for path, name in aliases:
+        body.str(relative(path))
+        body.ref(name)
+
+    body.uint(package.n_chapters)
+    for chapter in package.chapters:
+        body.str(chapter.title)
+        body.uint(chapter.n_items)
+        for item in chapter.items:
+            body.str(item.question)
+            body.str(item.answer)
+            body.optional_str(item.comment)
+            body.refs(item.tags)
+            body.refs(item.media)
+            # the ID is stored, as it might not match the (processed) question and answer anymore
+            body.ids.append(item.item_id)
+
+    return MAGIC + _VERSION.pack(FORMAT_VERSION) + zlib.compress(body.tobytes())
+
+
+def loads(data: bytes, root: Union[str, Path]) -> QAPackage:
+    """Loads a package from a snapshot.
+
+    Args:
+        data (bytes): The snapshot
+        root (Union[str, Path]): The root of the project, the paths of media files are relative to it
+
+    Raises:
+        ValueError: If the data is no snapshot, a snapshot of another version or damaged
+
+    Returns:
+        QAPackage: The package
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("The file is no Manki snapshot")
+    try:
+        (version,) = _VERSION.unpack_from(data, len(MAGIC))
+    except struct.error as e:
+        raise ValueError("The snapshot is damaged") from e
+    if version != FORMAT_VERSION:
+        raise ValueError(f"The snapshot has version {version}, but only version {FORMAT_VERSION} is supported")
+    try:
+        body = _Reader(zlib.decompress(data[len(MAGIC) + _VERSION.size :]))
+        return _read_package(body, Path(root).resolve())
+    except (zlib.error, struct.error, LookupError, StopIteration, ValueError) as e:
+        # a truncated or otherwise changed file fails somewhere while decompressing or reading the numbers
+        raise ValueError("The snapshot is damaged") from e
+
+
+def _read_package(body: _Reader, root: Path) -> QAPackage:
+    title = body.str()
+    author = body.ref() if body.uint() else body.refs()
+
+    def absolute(path: str) -> Path:
+        return root.joinpath(path).resolve()
+
+    hashing = bool(body.uint())
+    files = [(body.ref(), absolute(body.str())) for _ in range(body.uint())]
+    aliases = [(absolute(body.str()), body.ref()) for _ in range(body.uint())]
+    package = QAPackage(title, author, media=MediaRegistry.from_files(files, aliases, hashing))
+
+    ids = iter(body.ids)
+    for _ in range(body.uint()):
+        chapter = QAChapter(body.str())
+        items = []
+        for _ in range(body.uint()):
+            item = QAItem(body.str(), body.str(), body.optional_str())
+            # the strings of the string table are interned already
+            tags = body.refs()
+            item._tags = tuple(tags) if tags is not None else None
+            item.media = body.refs() or []
+            item._item_id = next(ids)
+            items.append(item)
+        chapter._add_items(items)
+        package.add_chapter(chapter)
+    return package
+
+
+def dump(package: QAPackage, file_path: Union[str, Path], root: Union[str, Path]):
+    data = dumps(package, root)
+    Path(file_path).write_bytes(data)
+    logger.info("Saved the package with %d items to '%s' (%d kB)", package.n_items, file_path, len(data) // 1024)
+
+
+def load(file_path: Union[str, Path], root: Union[str, Path]) -> QAPackage:
+    package = loads(Path(file_path).read_bytes(), root)
+    logger.info("Loaded the package with %d items from '%s'", package.n_items, file_path)
+    return package
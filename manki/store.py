@@ -0,0 +1,363 @@
+"""A package that keeps its chapters and items in an SQLite database instead of Python lists.
+
+`SQLitePackage` and `SQLiteChapter` can be used wherever a `QAPackage` or a `QAChapter` is expected. Items are read
+from the database in small batches while they are iterated, so only a few of them are kept in memory at the same
+time. Changes to an item (e.g. by a processor) are written back to the database as soon as the iteration moves on to
+the next item. Items that are accessed by index or returned by a query are copies, changing them has no effect.
+
+Besides the usual interface, the package can look up items and chapters by their ID and query items by their tag.
+"""
+import json
+import os
+import sqlite3
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from manki.data_struct import QAChapter, QAItem
+from manki.media import MediaRegistry
+from manki.util import get_hash
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+# the number of items that are read from the database at once
+BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE chapters (
+    position INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    chapter_id INTEGER NOT NULL
+);
+CREATE INDEX chapters_chapter_id ON chapters (chapter_id);
+CREATE TABLE items (
+    chapter INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    comment TEXT,
+    tags TEXT,
+    media TEXT NOT NULL,
+    item_id INTEGER NOT NULL
+);
+CREATE INDEX items_position ON items (chapter, position);
+CREATE INDEX items_item_id ON items (item_id);
+CREATE TABLE tags (
+    item INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX tags_tag ON tags (tag, item);
+CREATE INDEX tags_item ON tags (item);
+"""
+
+_ITEM_COLUMNS = "items.rowid, chapters.position, items.position, question, answer, comment, tags, media, item_id"
+
+
+def _item_state(item: QAItem) -> Tuple:
+    return item.question, item.answer, item.comment, item.tags, list(item.media)
+
+
+def _item_from_row(row: Tuple) -> QAItem:
+    _, _, _, question, answer, comment, tags, media, item_id = row
+    item = QAItem(question, answer, comment, json.loads(tags) if tags is not None else None, json.loads(media))
+    item._item_id = item_id
+    return item
+
+
+class SQLitePackage:
+    """A package with its chapters and items in an SQLite database.
+
+    The database is created from scratch, an existing file at `path` is replaced. The media files are few compared to
+    the items, they are kept in memory as usual.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        title: str,
+        author: Union[str, List[str]],
+        media: MediaRegistry = None,
+    ):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # the database is a scratch file that is created again for every run, it does not have to survive a crash
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(_SCHEMA)
+
+        self.title = title
+        self.author = author
+        self.media: MediaRegistry = media if media is not None else MediaRegistry()
+        self._package_id: Optional[int] = None
+        self._n_chapters = 0
+        self._n_items = 0
+        self._next_rowid = 1
+
+    def close(self):
+        self._db.close()
+
+    @property
+    def chapters(self) -> "_Chapters":
+        return _Chapters(self)
+
+    @property
+    def package_id(self) -> int:
+        if self._package_id is None:
+            self._package_id = get_hash(self.title)
+        return self._package_id
+
+    def add_chapter(self, chapter: QAChapter):
+        """Stores a chapter with all of its items in the database. Later changes to `chapter` are not stored."""
+        position = self._n_chapters
+        with self._db:
+            self._db.execute(
+                "INSERT INTO chapters (position, title, chapter_id) VALUES (?, ?, ?)",
+                (position, chapter.title, chapter.chapter_id),
+            )
+            self._insert_items(position, 0, chapter.items)
+        self._n_chapters += 1
+        self._n_items += chapter.n_items
+
+    @property
+    def n_chapters(self) -> int:
+        return self._n_chapters
+
+    @property
+    def n_items(self) -> int:
+        return self._n_items
+
+    def chapter(self, chapter_id: int) -> Optional["SQLiteChapter"]:
+        """Returns the (first) chapter with the ID or `None` if there is none."""
+        row = self._db.execute(
+            "SELECT position, title, chapter_id FROM chapters WHERE chapter_id = ? ORDER BY position LIMIT 1",
+            (chapter_id,),
+        ).fetchone()
+        return SQLiteChapter(self, *row) if row is not None else None
+
+    def item(self, item_id: int) -> Optional[QAItem]:
+        """Returns (a copy of) the first item with the ID or `None` if there is none."""
+        row = self._db.execute(
+            f"SELECT {_ITEM_COLUMNS} FROM items JOIN chapters ON items.chapter = chapters.position "
+            "WHERE item_id = ? ORDER BY chapters.position, items.position LIMIT 1",
+            (item_id,),
+        ).fetchone()
+        return _item_from_row(row) if row is not None else None
+
+    def query(self, chapter_id: Optional[int] = None, tag: Optional[str] = None) -> Iterator[QAItem]:
+        """Iterates over (copies of) all items in the order of the package that match all given conditions.
+
+        Args:
+            chapter_id (Optional[int]): Only items of the chapter(s) with this ID
+            tag (Optional[str]): Only items with this tag
+
+        Yields:
+            QAItem: The matching items
+        """
+        conditions, params = [], []
+        if chapter_id is not None:
+            conditions.append("chapters.chapter_id = ?")
+            params.append(chapter_id)
+        if tag is not None:
+            conditions.append("items.rowid IN (SELECT item FROM tags WHERE tag = ?)")
+            params.append(tag)
+        for row in self._rows(conditions, params):
+            yield _item_from_row(row)
+
+    def _rows(self, conditions: List[str], params: List[Any]) -> Iterator[Tuple]:
+        """Reads the matching items batch by batch. Every batch continues after the last item of the previous one, so
+        no cursor is kept open while the caller updates the items.
+        """
+        last = (-1, -1)
+        while True:
+            where = " AND ".join(conditions + ["(chapters.position, items.position) > (?, ?)"])
+            rows = self._db.execute(
+                f"SELECT {_ITEM_COLUMNS} FROM items JOIN chapters ON items.chapter = chapters.position "
+                f"WHERE {where} ORDER BY chapters.position, items.position LIMIT {BATCH_SIZE}",
+                (*params, *last),
+            ).fetchall()
+            yield from rows
+            if len(rows) < BATCH_SIZE:
+                return
+            last = rows[-1][1:3]
+
+    def _insert_items(self, chapter: int, position: int, items: List[QAItem]):
+        """Inserts items with consecutive positions, starting at `position`."""
+        rows, tag_rows = [], []
+        for item in items:
+            rowid = self._next_rowid
+            self._next_rowid += 1
+            tags = json.dumps(list(item.tags)) if item.tags is not None else None
+            media = json.dumps(item.media)
+            rows.append(
+                (rowid, chapter, position, item.question, item.answer, item.comment, tags, media, item.item_id)
+            )
+            tag_rows.extend((rowid, tag) for tag in item.tags or ())
+            position += 1
+        self._db.executemany(
+            "INSERT INTO items (rowid, chapter, position, question, answer, comment, tags, media, item_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._db.executemany("INSERT INTO tags (item, tag) VALUES (?, ?)", tag_rows)
+
+    def _update_item(self, rowid: int, item: QAItem):
+        tags = json.dumps(list(item.tags)) if item.tags is not None else None
+        with self._db:
+            self._db.execute(
+                "UPDATE items SET question = ?, answer = ?, comment = ?, tags = ?, media = ? WHERE rowid = ?",
+                (item.question, item.answer, item.comment, tags, json.dumps(item.media), rowid),
+            )
+            self._db.execute("DELETE FROM tags WHERE item = ?", (rowid,))
+            if item.tags:
+                self._db.executemany("INSERT INTO tags (item, tag) VALUES (?, ?)", [(rowid, tag) for tag in item.tags])
+
+    def __repr__(self) -> str:
+        return f"SQLitePackage(path={self.path!r}, title={self.title!r}, author={self.author!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        dct = {}
+        dct["title"] = self.title
+        dct["author"] = self.author
+        dct["media"] = list(self.media)
+        dct["package_id"] = self.package_id
+        dct["n_chapters"] = self.n_chapters
+        dct["n_items"] = self.n_items
+        dct["chapters"] = [chp.to_dict() for chp in self.chapters]
+        return dct
+
+
+class _Chapters(Sequence):
+    """The chapters of a `SQLitePackage`, they are read from the database when they are accessed."""
+
+    def __init__(self, package: SQLitePackage):
+        self._package = package
+
+    def __len__(self) -> int:
+        return self._package.n_chapters
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        row = self._package._db.execute(
+            "SELECT position, title, chapter_id FROM chapters WHERE position = ?", (index,)
+        ).fetchone()
+        if row is None:
+            raise IndexError("chapter index out of range")
+        return SQLiteChapter(self._package, *row)
+
+    def __iter__(self) -> Iterator["SQLiteChapter"]:
+        rows = self._package._db.execute("SELECT position, title, chapter_id FROM chapters ORDER BY position")
+        return (SQLiteChapter(self._package, *row) for row in rows.fetchall())
+
+
+class SQLiteChapter:
+    """A chapter of a `SQLitePackage`. It only knows its position in the package, the items stay in the database."""
+
+    def __init__(self, package: SQLitePackage, position: int, title: str, chapter_id: int):
+        self._package = package
+        self._position = position
+        self._title = title
+        self._chapter_id = chapter_id
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, title: str):
+        # the ID does not change, as for `QAChapter`
+        with self._package._db:
+            self._package._db.execute("UPDATE chapters SET title = ? WHERE position = ?", (title, self._position))
+        self._title = title
+
+    @property
+    def chapter_id(self) -> int:
+        return self._chapter_id
+
+    @property
+    def items(self) -> "_Items":
+        return _Items(self)
+
+    def add_item(self, item: QAItem):
+        self.insert_item(self.n_items, item)
+
+    def insert_item(self, index: int, item: QAItem):
+        """Inserts an item like `list.insert`. Items must not be inserted while the items of the chapter are
+        iterated.
+        """
+        n_items = self.n_items
+        if index < 0:
+            index += n_items
+        index = min(max(index, 0), n_items)
+        db = self._package._db
+        with db:
+            db.execute(
+                "UPDATE items SET position = position + 1 WHERE chapter = ? AND position >= ?", (self._position, index)
+            )
+            self._package._insert_items(self._position, index, [item])
+        self._package._n_items += 1
+
+    @property
+    def n_items(self) -> int:
+        (n_items,) = self._package._db.execute(
+            "SELECT COUNT(*) FROM items WHERE chapter = ?", (self._position,)
+        ).fetchone()
+        return n_items
+
+    def __repr__(self) -> str:
+        return f"SQLiteChapter(title={self.title!r}, chapter_id={self.chapter_id!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        dct = {}
+        dct["title"] = self.title
+        dct["chapter_id"] = self.chapter_id
+        dct["n_items"] = self.n_items
+        dct["items"] = [itm.to_dict() for itm in self.items]
+        return dct
+
+
+class _Items(Sequence):
+    """The items of a `SQLiteChapter`. Iterating reads them in batches and writes changed items back."""
+
+    def __init__(self, chapter: SQLiteChapter):
+        self._chapter = chapter
+
+    def __len__(self) -> int:
+        return self._chapter.n_items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        rows = self._chapter._package._rows(
+            ["chapters.position = ?", "items.position = ?"], [self._chapter._position, index]
+        )
+        row = next(rows, None)
+        if row is None:
+            raise IndexError("item index out of range")
+        return _item_from_row(row)
+
+    def __iter__(self) -> Iterator[QAItem]:
+        package = self._chapter._package
+        for row in package._rows(["chapters.position = ?"], [self._chapter._position]):
+            item = _item_from_row(row)
+            state = _item_state(item)
+            try:
+                yield item
+            finally:
+                if _item_state(item) != state:
+                    package._update_item(row[0], item)
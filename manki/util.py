@@ -1,7 +1,17 @@
-from functools import reduce
-from bs4 import BeautifulSoup, Tag
+from functools import lru_cache, reduce
+from typing import Dict, Iterable, List
+from bs4 import BeautifulSoup, FeatureNotFound, NavigableString, PageElement, Tag
+from bs4.dammit import EntitySubstitution
 import hashlib
 import inflection
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_HTML_PARSER = "html.parser"
 
 
 def deep_get(dictionary, keys, default=None):
@@ -21,25 +31,108 @@ def ensure_list(input):
     return input if isinstance(input, list) else [input]
 
 
-def extract_html_between_tags(start_tag: Tag, end_tag: Tag, include_start_tag=False) -> BeautifulSoup:
-    curr_tag = start_tag if include_start_tag else start_tag.next_sibling
-    content = ""
-    while curr_tag is not end_tag and curr_tag is not None:
-        content += str(curr_tag)
-        curr_tag = curr_tag.next_sibling
+@lru_cache(maxsize=None)
+def resolve_html_parser(name: str = None) -> str:
+    """Checks if the HTML parser `name` (e.g. 'lxml') can be used by BeautifulSoup. If it is not installed, the
+    (slower) builtin parser is used instead.
+
+    Args:
+        name (str, optional): The name of the parser. Defaults to the builtin parser.
+
+    Returns:
+        str: The name of the parser that can be used
+    """
+    name = name or DEFAULT_HTML_PARSER
+    try:
+        BeautifulSoup("", features=name)
+    except FeatureNotFound:
+        logger.warning("The HTML parser '%s' is not installed. Using '%s' instead.", name, DEFAULT_HTML_PARSER)
+        name = DEFAULT_HTML_PARSER
+    return name
+
+
+def parse_html(markup: str, parser: str = None) -> BeautifulSoup:
+    """Parses an HTML fragment. Use `fragment_nodes` to get the top-level nodes of the fragment as some parsers wrap
+    fragments into a complete document.
+
+    Args:
+        markup (str): The HTML fragment
+        parser (str, optional): The name of the parser, see `resolve_html_parser`
+
+    Returns:
+        BeautifulSoup: The parsed fragment
+    """
+    return BeautifulSoup(markup, features=resolve_html_parser(parser))
+
+
+def fragment_nodes(soup: BeautifulSoup) -> List[PageElement]:
+    """Returns the top-level nodes of a fragment parsed by `parse_html`."""
+    if soup.body is not None and soup.body.parent is not None and soup.body.parent.name == "html":
+        return soup.body.contents
+    return soup.contents
+
+
+def split_at_tags(name: str, nodes: Iterable[PageElement]) -> List[List[PageElement]]:
+    """Splits a sequence of sibling nodes into groups. Every group starts with a tag of the given name and contains all
+    following nodes up to the next tag of this name. Nodes in front of the first tag are dropped.
+
+    The nodes stay part of the parsed document, they are neither copied nor serialized. So the whole sequence is
+    walked only once.
+
+    Args:
+        name (str): The name of the tag that starts a new group, e.g. 'h1'
+        nodes (Iterable[PageElement]): The sibling nodes, e.g. the contents of a parsed document
+
+    Returns:
+        List[List[PageElement]]: The groups of nodes
+    """
+    groups = []
+    for node in nodes:
+        if isinstance(node, Tag) and node.name == name:
+            groups.append([node])
+        elif groups:
+            groups[-1].append(node)
+    return groups
+
+
+def serialize(nodes: Iterable[PageElement]) -> str:
+    """Serializes a sequence of nodes to HTML. Text nodes are escaped the same way as the text inside of tags.
+
+    Args:
+        nodes (Iterable[PageElement]): The nodes to be serialized
+
+    Returns:
+        str: The HTML string
+    """
+    return "".join([node.output_ready() if isinstance(node, NavigableString) else node.decode() for node in nodes])
+
+
+_IMG_TAG = re.compile(r"<img\b[^>]*>")
+
+
+def _quoted_attribute(value: str) -> str:
+    # the same formatting as the 'minimal' formatter of BeautifulSoup
+    return EntitySubstitution.quoted_attribute_value(EntitySubstitution.substitute_xml(value))
+
 
-    return BeautifulSoup(content, features="html.parser")
+def replace_img_src(html: str, sources: Dict[str, str]) -> str:
+    """Replaces the `src` attribute of images without parsing the HTML again. The HTML has to be serialized by
+    BeautifulSoup, so that the attributes are formatted the same way.
 
+    Args:
+        html (str): The serialized HTML
+        sources (Dict[str, str]): The current sources of the images and their replacements
 
-def split_at_tags(name: str, soup: BeautifulSoup):
-    splitted = []
-    tags = soup.find_all(name)
-    if tags:
-        tags.append(None)
-        start_tag = tags[0]
-        for i in range(1, len(tags)):
-            end_tag = tags[i]
-            splitted.append(extract_html_between_tags(start_tag, end_tag, include_start_tag=True))
-            start_tag = end_tag
+    Returns:
+        str: The HTML with replaced image sources
+    """
+    attrs = {
+        " src=" + _quoted_attribute(src): " src=" + _quoted_attribute(new_src)
+        for src, new_src in sources.items()
+        if src != new_src
+    }
+    if not html or not attrs:
+        return html
 
-    return splitted
+    attr_pattern = re.compile("|".join(re.escape(attr) for attr in attrs))
+    return _IMG_TAG.sub(lambda tag: attr_pattern.sub(lambda attr: attrs[attr.group(0)], tag.group(0)), html)
@@ -0,0 +1,103 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Iterator, Tuple
+
+from manki.data_struct import QAChapter, QAItem, QAPackage
+
+
+class _ObjectView(Mapping):
+    """A read-only mapping over the `fields` of an object. Values are read from the object when they are accessed,
+    nothing is copied. Additional values (or values that replace fields) can be given as keyword arguments.
+    """
+
+    __slots__ = ("_obj", "_extra")
+    fields: Tuple[str, ...] = ()
+
+    def __init__(self, obj, **extra):
+        self._obj = obj
+        self._extra = extra
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._extra:
+            return self._extra[key]
+        if key not in self.fields:
+            raise KeyError(key)
+        return self._get(key)
+
+    def _get(self, key: str) -> Any:
+        return getattr(self._obj, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.fields
+        yield from (key for key in self._extra if key not in self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields) + sum(1 for key in self._extra if key not in self.fields)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._obj!r})"
+
+
+class _SequenceView(Sequence):
+    """A read-only sequence that wraps the elements of `items` in views when they are accessed."""
+
+    __slots__ = ("_items", "_view")
+
+    def __init__(self, items: Sequence, view: Callable[[Any], _ObjectView]):
+        self._items = items
+        self._view = view
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(item) for item in self._items[index]]
+        return self._view(self._items[index])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return map(self._view, self._items)
+
+
+class ItemView(_ObjectView):
+    """The fields of a `QAItem` as they are seen by the templates."""
+
+    __slots__ = ()
+    fields = ("question", "answer", "comment", "tags", "media", "item_id")
+
+    def __init__(self, item: QAItem, **extra):
+        super().__init__(item, **extra)
+
+
+class ChapterView(_ObjectView):
+    """The fields of a `QAChapter` as they are seen by the templates."""
+
+    __slots__ = ()
+    fields = ("title", "chapter_id", "n_items", "items")
+
+    def __init__(self, chapter: QAChapter, **extra):
+        super().__init__(chapter, **extra)
+
+    def _get(self, key: str) -> Any:
+        if key == "items":
+            return _SequenceView(self._obj.items, ItemView)
+        return super()._get(key)
+
+
+class PackageView(_ObjectView):
+    """A lazy, read-only view over a package for the templates. It has the same keys as `QAPackage.to_dict()`, but
+    the chapters and items are only read from the package when a template uses them. So rendering a template that
+    only uses e.g. the number of items does not have to copy every item of the package.
+    """
+
+    __slots__ = ()
+    fields = ("title", "author", "media", "package_id", "n_chapters", "n_items", "chapters")
+
+    def __init__(self, package: QAPackage, **extra):
+        super().__init__(package, **extra)
+
+    def _get(self, key: str) -> Any:
+        if key == "media":
+            return list(self._obj.media)
+        if key == "chapters":
+            return _SequenceView(self._obj.chapters, ChapterView)
+        return super()._get(key)
@@ -0,0 +1,104 @@
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from manki.util import ensure_list
+
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.DEBUG)
+
+
+def project_files(config, media: Iterable[Path] = ()) -> Set[Path]:
+    """Returns all files a build of the project depends on: the configuration, the sources, the macros, the files of
+    the active template and the images.
+
+    Args:
+        config (MankiConfig): The projects configuration
+        media (Iterable[Path]): The images used by the package, including the ones that do not exist (yet)
+    """
+    root = Path(config.get("general.root"))
+    files = {root.joinpath("manki.toml")}
+    files.update(root.joinpath(src) for src in ensure_list(config.get("input.source")))
+    if config.get("input.macros"):
+        files.add(root.joinpath(config.get("input.macros")))
+    for directory in config.template_dirs:
+        files.update(path for path in directory.rglob("*") if path.is_file())
+    files.update(media)
+    return {path.resolve() for path in files}
+
+
+class PollingWatcher:
+    """Detects changes of files by comparing their modification time and size in regular intervals. Polling works on
+    every platform and file system (network drives, containers, ...) and needs no additional dependencies.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._state: Dict[Path, Optional[Tuple[int, int]]] = {}
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def watch(self, paths: Iterable[Path]):
+        """Replaces the watched files. Changes are reported relative to the state of the files at this moment."""
+        self._state = {path: self._stat(path) for path in paths}
+
+    def changes(self) -> List[Path]:
+        """Returns the files that have been changed, created or removed since the last call."""
+        changed = []
+        for path, state in self._state.items():
+            new_state = self._stat(path)
+            if new_state != state:
+                self._state[path] = new_state
+                changed.append(path)
+        return changed
+
+    def wait(self) -> List[Path]:
+        """Blocks until at least one file has changed and returns all changed files."""
+        while True:
+            time.sleep(self.interval)
+            changed = self.changes()
+            if changed:
+                # editors often write a file in several steps, wait for them to finish
+                time.sleep(self.interval / 5)
+                return changed + [path for path in self.changes() if path not in changed]
+
+
+def watch(build: Callable[[List[Path]], None], files: Callable[[], Iterable[Path]], interval: float = 0.5):
+    """Builds the project and rebuilds it whenever one of the files it depends on changes, until it is interrupted.
+
+    Args:
+        build (Callable[[List[Path]], None]): Builds the project, it gets the changed files (none for the first build)
+        files (Callable[[], Iterable[Path]]): Returns all files the last build depends on
+        interval (float): The polling interval in seconds
+    """
+    watcher = PollingWatcher(interval)
+    changed: List[Path] = []
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                build(changed)
+                logger.info("Built in %.0f ms", (time.perf_counter() - start) * 1e3)
+            except (Exception, SystemExit):
+                # keep watching, the error is most likely fixed with the next change (an invalid configuration exits)
+                logger.exception("Building the project failed")
+            watcher.watch(files())
+            logger.info("Watching %d files for changes (press Ctrl+C to stop)", len(watcher))
+            changed = watcher.wait()
+            for path in changed:
+                logger.info("Changed: '%s'", path)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
@@ -0,0 +1,249 @@
+from pathlib import Path
+import json
+import sqlite3
+import zipfile
+
+from genanki import Deck, Model, Note, Package
+import pytest
+
+from manki.exporter import apkg_writer
+from manki.exporter.apkg_writer import ApkgWriter, field_checksums
+
+TIMESTAMP = 1600000000.5
+MODEL = Model(
+    1234567890,
+    "Model",
+    fields=[{"name": "Front"}, {"name": "Back"}],
+    templates=[{"name": "Card", "qfmt": "{{Front}}", "afmt": "{{FrontSide}}<hr/>{{Back}}"}],
+    css=".card { color: black; }",
+)
+# the title, ID and notes (GUID, question, answer) of every chapter, two of them are in the same deck
+CHAPTERS = [
+    ("One", 111, [(1, "<p>Question 1</p>", "<p>Answer 1</p>"), (2, '<img src="a.png"/>', "Answer 2")]),
+    ("Two", 222, [(3, "What is $x &lt; y$?", "<b>x</b>"), (4, "", "A note without a card")]),
+    ("One", 111, [(5, "<!-- comment -->Question 5", "Answer 5")]),
+]
+
+
+def read_apkg(file_name: Path, directory: Path) -> dict:
+    """Returns the contents of all tables of the collection and the media files of a package."""
+    with zipfile.ZipFile(file_name) as apkg:
+        apkg.extract("collection.anki2", directory)
+        media = {name: apkg.read(idx) for idx, name in json.loads(apkg.read("media")).items()}
+    conn = sqlite3.connect(directory.joinpath("collection.anki2"))
+    contents = {"media": media}
+    for table in ["col", "notes", "cards", "revlog", "graves"]:
+        contents[table] = conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+    conn.close()
+    return contents
+
+
+@pytest.fixture
+def media(tmp_path: Path):
+    path = tmp_path.joinpath("image-1234.png")
+    path.write_bytes(b"\x89PNG not really")
+    return path
+
+
+def write_genanki(file_name: Path, media: Path):
+    decks = [Deck(999, "Package", "The preamble")]
+    for title, deck_id, notes in CHAPTERS:
+        deck = Deck(deck_id, "Package::" + title)
+        deck.add_model(MODEL)
+        for guid, *fields in notes:
+            deck.add_note(Note(model=MODEL, fields=fields, guid=guid))
+        decks.append(deck)
+    # genanki uses the name of the file
+    copy = file_name.parent.joinpath("a.png")
+    copy.write_bytes(media.read_bytes())
+    Package(decks, [str(copy)]).write_to_file(file_name, timestamp=TIMESTAMP)
+
+
+def write_manki(file_name: Path, media: list, chapters=CHAPTERS, timestamp=TIMESTAMP, update=False, **kwargs):
+    writer = ApkgWriter(MODEL, **kwargs)
+    writer.add_deck(999, "Package", "The preamble")
+    for title, deck_id, notes in chapters:
+        writer.add_deck(deck_id, "Package::" + title)
+        for guid, *fields in notes:
+            writer.add_note(guid, fields)
+    if update:
+        writer.update(file_name, media, timestamp=timestamp)
+    else:
+        writer.write(file_name, media, timestamp=timestamp)
+
+
+# the notes are kept in memory or moved to the temporary database (and inserted) one by one
+@pytest.mark.parametrize("batch_size", [apkg_writer.BATCH_SIZE, 1])
+def test_same_collection_as_genanki(tmp_path: Path, media: Path, monkeypatch, batch_size):
+    monkeypatch.setattr(apkg_writer, "BATCH_SIZE", batch_size)
+    write_genanki(tmp_path.joinpath("genanki.apkg"), media)
+    write_manki(tmp_path.joinpath("manki.apkg"), [("a.png", media)])
+    expected = read_apkg(tmp_path.joinpath("genanki.apkg"), tmp_path.joinpath("genanki"))
+    actual = read_apkg(tmp_path.joinpath("manki.apkg"), tmp_path.joinpath("manki"))
+
+    assert actual["media"] == expected["media"] == {"a.png": media.read_bytes()}
+    assert actual["cards"] == expected["cards"]
+    assert len(actual["cards"]) == 4
+    for table in ["revlog", "graves"]:
+        assert actual[table] == expected[table] == []
+
+    # the JSON of the models and decks is compared as objects
+    (actual_col,) = actual["col"]
+    (expected_col,) = expected["col"]
+    assert actual_col[:9] == expected_col[:9]
+    assert [json.loads(col) for col in actual_col[9:11]] == [json.loads(col) for col in expected_col[9:11]]
+    assert actual_col[11:] == expected_col[11:]
+
+    # genanki does not compute the checksums
+    checksums = field_checksums(note[7] for note in actual["notes"])
+    assert [note[:8] + (checksums[i],) + note[9:] for i, note in enumerate(expected["notes"])] == actual["notes"]
+
+
+@pytest.mark.parametrize("batch_size", [apkg_writer.BATCH_SIZE, 1])
+def test_update(tmp_path: Path, media: Path, monkeypatch, batch_size):
+    monkeypatch.setattr(apkg_writer, "BATCH_SIZE", batch_size)
+    other = tmp_path.joinpath("other.png")
+    other.write_bytes(b"\x89PNG another one")
+    file_name = tmp_path.joinpath("package.apkg")
+    write_manki(file_name, [("a.png", media), ("b.png", other)])
+    before = read_apkg(file_name, tmp_path.joinpath("before"))
+
+    # note 1 is changed, note 3 is moved to a new deck, note 5 is removed and note 6 is added
+    chapters = [
+        ("One", 111, [(1, "<p>Question 1 changed</p>", "<p>Answer 1</p>"), (2, '<img src="a.png"/>', "Answer 2")]),
+        ("Two", 222, [(4, "", "A note without a card"), (6, "A new question", "A new answer")]),
+        ("Three", 333, [(3, "What is $x &lt; y$?", "<b>x</b>")]),
+    ]
+    other.write_bytes(b"\x89PNG changed")
+    media_files = [("b.png", other), ("a.png", media)]
+    write_manki(file_name, media_files, chapters, TIMESTAMP + 3600, update=True)
+    write_manki(tmp_path.joinpath("new.apkg"), media_files, chapters, TIMESTAMP + 3600)
+    actual = read_apkg(file_name, tmp_path.joinpath("updated"))
+    expected = read_apkg(tmp_path.joinpath("new.apkg"), tmp_path.joinpath("new"))
+
+    assert actual["media"] == expected["media"] == {"a.png": media.read_bytes(), "b.png": other.read_bytes()}
+    assert actual["col"] == expected["col"]
+
+    # the notes and cards of a new build, without their IDs and times
+    def notes(contents):
+        return sorted(note[1:3] + note[5:] for note in contents["notes"])
+
+    def cards(contents):
+        guids = {note[0]: note[1] for note in contents["notes"]}
+        return sorted((guids[card[1]],) + card[2:4] + card[5:] for card in contents["cards"])
+
+    assert notes(actual) == notes(expected)
+    assert cards(actual) == cards(expected)
+    # the unchanged notes are kept as they are
+    unchanged = {note for note in before["notes"] if note[1] in ("2", "4")}
+    assert unchanged == {note for note in actual["notes"] if note[1] in ("2", "4")}
+
+
+# no package, a file that is no archive, a package without collection and a package with a broken collection
+PREVIOUS = [None, b"not an archive", {"media": "{}"}, {"media": "{}", "collection.anki2": "no database"}]
+
+
+@pytest.mark.parametrize("previous", PREVIOUS)
+def test_update_without_previous_package(tmp_path: Path, media: Path, previous):
+    file_name = tmp_path.joinpath("updated.apkg")
+    if isinstance(previous, bytes):
+        file_name.write_bytes(previous)
+    elif previous is not None:
+        with zipfile.ZipFile(file_name, "w") as apkg:
+            for name, data in previous.items():
+                apkg.writestr(name, data)
+    write_manki(file_name, [("a.png", media)], update=True)
+    write_manki(tmp_path.joinpath("new.apkg"), [("a.png", media)])
+    assert read_apkg(tmp_path.joinpath("updated.apkg"), tmp_path.joinpath("updated")) == read_apkg(
+        tmp_path.joinpath("new.apkg"), tmp_path.joinpath("new")
+    )
+
+
+@pytest.mark.parametrize("member", ["collection.anki2", "0"])
+def test_update_broken_package(tmp_path: Path, media: Path, member: str):
+    file_name = tmp_path.joinpath("updated.apkg")
+    write_manki(file_name, [("a.png", media)])
+    # a byte in the middle of the data of the member is changed, its CRC does not match anymore
+    with zipfile.ZipFile(file_name) as apkg:
+        info = apkg.getinfo(member)
+    data = bytearray(file_name.read_bytes())
+    pos = info.header_offset + 30 + len(info.filename) + len(info.extra) + info.compress_size // 2
+    data[pos] ^= 0xFF
+    file_name.write_bytes(data)
+
+    write_manki(file_name, [("a.png", media)], update=True)
+    write_manki(tmp_path.joinpath("new.apkg"), [("a.png", media)])
+    with zipfile.ZipFile(file_name) as apkg:
+        assert apkg.testzip() is None
+    assert read_apkg(file_name, tmp_path.joinpath("updated")) == read_apkg(
+        tmp_path.joinpath("new.apkg"), tmp_path.joinpath("new")
+    )
+
+
+@pytest.mark.parametrize("raw_members", [True, False])
+@pytest.mark.parametrize("parallel_size", [1, 2**30])
+def test_compression(tmp_path: Path, media: Path, monkeypatch, parallel_size, raw_members):
+    monkeypatch.setattr(apkg_writer, "PARALLEL_SIZE", parallel_size)
+    monkeypatch.setattr(apkg_writer, "RAW_MEMBERS", raw_members)
+    copied = []
+    copy_member = apkg_writer._copy_member
+    monkeypatch.setattr(apkg_writer, "_copy_member", lambda *args: copied.append(args[3]) or copy_member(*args))
+    svg = tmp_path.joinpath("image.svg")
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg">' + "<rect/>" * 10000 + "</svg>")
+    text = tmp_path.joinpath("notes.txt")
+    text.write_text("Some text. " * 1000)
+    media_files = [("a.png", media), ("b.svg", svg), ("c.txt", text)]
+    file_name = tmp_path.joinpath("package.apkg")
+    write_manki(file_name, media_files, compression={".TXT": "store", "*": 1}, workers=2)
+
+    with zipfile.ZipFile(file_name) as apkg:
+        assert apkg.testzip() is None
+        compression = {info.filename: info.compress_type for info in apkg.infolist()}
+        svg_size = apkg.getinfo("1").compress_size
+    assert compression == {
+        "collection.anki2": zipfile.ZIP_DEFLATED,
+        "media": zipfile.ZIP_DEFLATED,
+        "0": zipfile.ZIP_STORED,
+        "1": zipfile.ZIP_DEFLATED,
+        "2": zipfile.ZIP_STORED,
+    }
+    expected = {"a.png": media.read_bytes(), "b.svg": svg.read_bytes(), "c.txt": text.read_bytes()}
+    assert read_apkg(file_name, tmp_path.joinpath("new"))["media"] == expected
+
+    # the stored image is copied when the package is updated, the text file is deflated now and the SVG is deflated
+    # again with the default level
+    write_manki(file_name, media_files[::-1], update=True)
+    with zipfile.ZipFile(file_name) as apkg:
+        assert apkg.testzip() is None
+        assert [info.compress_type for info in apkg.infolist()[2:]] == [zipfile.ZIP_DEFLATED] * 2 + [zipfile.ZIP_STORED]
+        assert apkg.getinfo("1").compress_size < svg_size
+    assert read_apkg(file_name, tmp_path.joinpath("updated"))["media"] == expected
+    assert copied == (["2"] if raw_members else [])
+
+    # nothing changed, all media files are copied
+    write_manki(file_name, media_files[::-1], update=True)
+    assert read_apkg(file_name, tmp_path.joinpath("again"))["media"] == expected
+    assert copied == (["2", "0", "1", "2"] if raw_members else [])
+
+
+@pytest.mark.parametrize("level", ["deflate", 10, -1, True])
+def test_invalid_compression(level):
+    with pytest.raises(ValueError):
+        ApkgWriter(MODEL, {".svg": level})
+
+
+def test_field_checksums():
+    # the first 8 hex digits of the SHA1 of the text, without HTML
+    assert field_checksums(["Question", "<b>Question</b>", '<img src="a.png">', "&lt;"]) == [
+        0x002FF598,
+        0x002FF598,
+        field_checksums(["a.png"])[0],
+        field_checksums(["<"])[0],
+    ]
+
+
+def test_wrong_number_of_fields():
+    writer = ApkgWriter(MODEL)
+    writer.add_deck(1, "Deck")
+    with pytest.raises(ValueError):
+        writer.add_note(1, ["Only the question"])
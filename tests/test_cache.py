@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from manki.cache import DiskCache
+
+
+def test_overwritten_entries(tmp_path: Path):
+    cache = DiskCache(tmp_path, max_size=100)
+    cache.set("aa01", b"x" * 10)
+    for _ in range(20):
+        cache.set("aa02", b"y" * 30)
+    # the size only counts the current value of an entry, so nothing is evicted
+    assert cache._size == 40
+    assert cache.get("aa01") == b"x" * 10
+    assert cache.get("aa02") == b"y" * 30
+    # no temporary files are left behind
+    assert sorted(path.name for path in tmp_path.glob("*/*")) == ["aa01", "aa02"]
+
+
+def test_eviction(tmp_path: Path):
+    cache = DiskCache(tmp_path, max_size=100)
+    for i in range(10):
+        cache.set(f"aa{i:02d}", b"x" * 20)
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*")) <= 100
+    assert cache.get("aa09") == b"x" * 20
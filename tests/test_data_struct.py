@@ -0,0 +1,27 @@
+from manki.data_struct import QAChapter, QAItem, QAPackage
+
+
+def create_chapters():
+    return [
+        QAChapter("One", [QAItem("<p>Q1</p>", "<p>A1</p>"), QAItem("<p>Q2</p>", "<p>A2</p>")]),
+        QAChapter("Two", [QAItem("<p>Q3</p>", "<p>A3</p>")]),
+        QAChapter("Three", [QAItem("<p>Q4</p>", "<p>A4</p>")]),
+    ]
+
+
+def test_number_of_items():
+    chapters = create_chapters()
+    package = QAPackage("Package", ["Author"], chapters[:2])
+    assert package.n_items == 3
+    package.add_chapter(chapters[2])
+    chapters[0].add_item(QAItem("<p>Q5</p>", "<p>A5</p>"))
+    chapters[1].insert_item(0, QAItem("<p>Q6</p>", "<p>A6</p>"))
+    assert package.n_items == 6
+    chapters[0].remove_item(chapters[0].items[0])
+    package.remove_chapter(chapters[1])
+    assert package.n_items == sum(chapter.n_items for chapter in package.chapters) == 3
+    # the items and chapters can only be changed through the chapter and the package
+    assert isinstance(package.chapters, tuple) and isinstance(chapters[0].items, tuple)
+    # a removed chapter does not count for the package anymore
+    chapters[1].add_item(QAItem("<p>Q7</p>", "<p>A7</p>"))
+    assert package.n_items == 3
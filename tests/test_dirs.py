@@ -3,6 +3,7 @@ from typing import Any, Dict
 from manki.configuration import MankiConfig
 from manki.data_struct import QAPackage
 from manki.importer.importer_markdown import MarkdownImporter
+from manki.util import DEFAULT_HTML_PARSER
 import json
 import pytest
 
@@ -37,17 +38,23 @@ def check_json_recursively(dcta: Dict[str, Any], dctb: Dict[str, Any], level=0)
     return success
 
 
+@pytest.mark.parametrize("html_parser", ["html.parser", "lxml"])
 @pytest.mark.parametrize("directory", ["plain", "math", "images", "code"])
-def test_directories(directory):
+def test_directories(directory, html_parser):
+    if html_parser != DEFAULT_HTML_PARSER:
+        pytest.importorskip(html_parser)
     path = Path.cwd().joinpath(TEST_DIR).joinpath(directory)
     stem = path.stem
     config = MankiConfig(root=path)
+    config.set("processor.html_parser", html_parser)
     importer = MarkdownImporter(config)
     sources = {src: open(path.joinpath(src)).read() for src in config.get("input.source")}
     pack = importer.create_package(sources)
     pack_dict = pack.to_dict()
     pack_dict["media"] = [str(_make_media_path_relative(x)) for x in pack_dict["media"]]
-    _create_test_references(path, pack)
+    if html_parser == DEFAULT_HTML_PARSER:
+        # the references are created with the default parser, all other parsers have to match them
+        _create_test_references(path, pack)
     js = json.load(open(path.joinpath(f"{stem}.json")))
     assert check_json_recursively(pack_dict, js)
 
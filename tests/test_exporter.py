@@ -0,0 +1,62 @@
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+import manki.exporter
+from manki import main as manki_main
+from manki.configuration import MankiConfig
+from manki.exporter import available_formats, get_exporter
+from manki.exporter.base import MankiExporter
+
+
+class CsvExporter(MankiExporter):
+    pass
+
+
+class EntryPoint:
+    """Stands in for an installed entry point of the group `manki.exporters`."""
+
+    def __init__(self, name: str, value: str, cls: type):
+        self.name = name
+        self.value = value
+        self.cls = cls
+
+    def load(self) -> type:
+        return self.cls
+
+
+@pytest.fixture
+def entry_points(monkeypatch):
+    eps = [
+        EntryPoint("csv", "tests.test_exporter:CsvExporter", CsvExporter),
+        # an entry point can not replace a built-in format
+        EntryPoint("apkg", "tests.test_exporter:CsvExporter", CsvExporter),
+    ]
+    monkeypatch.setattr(manki.exporter, "_entry_points", lambda: eps)
+    return eps
+
+
+def test_builtin_formats():
+    from manki.exporter.exporter_anki import AnkiExporter
+    from manki.exporter.exporter_html import HTMLExporter
+
+    assert available_formats()[:3] == ["apkg", "html", "pdf"]
+    assert get_exporter("apkg") is AnkiExporter
+    assert get_exporter("html") is HTMLExporter
+
+
+def test_registered_exporter(entry_points: list):
+    assert available_formats() == ["apkg", "html", "pdf", "csv"]
+    assert get_exporter("csv") is CsvExporter
+    assert get_exporter("apkg") is not CsvExporter
+
+
+def test_unknown_format(entry_points: list, tmp_path: Path):
+    with pytest.raises(KeyError):
+        get_exporter("docx")
+
+    tmp_path.joinpath("manki.toml").write_text('[general]\ntitle = "Formats"\n')
+    config = MankiConfig(root=tmp_path)
+    with pytest.raises(SystemExit):
+        manki_main.get_exporters(config, Namespace(format="html,docx"))
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import markdown
+import pytest
+from pymdownx.highlight import Highlight
+
+from manki.cache import DiskCache
+from manki.configuration import MankiConfig
+from manki.importer.importer_markdown import MarkdownImporter
+
+CODE = """```{}
+def square(x):
+    return x * x
+```
+"""
+
+
+@pytest.fixture
+def highlighted(monkeypatch):
+    """The languages of the code blocks that are highlighted with Pygments (i.e. not loaded from the cache)."""
+    calls = []
+    highlight = Highlight.highlight
+
+    def counting_highlight(self, src, language, *args, **kwargs):
+        if not kwargs.get("inline"):
+            calls.append(language)
+        return highlight(self, src, language, *args, **kwargs)
+
+    monkeypatch.setattr(Highlight, "highlight", counting_highlight)
+    return calls
+
+
+def convert(cache: DiskCache, text: str) -> str:
+    md = markdown.Markdown(
+        extensions=["manki.highlight", "pymdownx.superfences"],
+        extension_configs={"manki.highlight": {"cache": cache}},
+    )
+    return md.convert(text)
+
+
+def test_cache_hit(tmp_path: Path, highlighted: list):
+    cache = DiskCache(tmp_path)
+    html = convert(cache, CODE.format("python"))
+    assert convert(cache, CODE.format("python")) == html
+    # the same block is highlighted once, within one conversion and across conversions
+    convert(DiskCache(tmp_path), CODE.format("python") + "\n" + CODE.format("python"))
+    assert highlighted == ["python"]
+
+
+def test_cache_key(tmp_path: Path, highlighted: list):
+    cache = DiskCache(tmp_path)
+    convert(cache, CODE.format("python"))
+    # the language and the options of the block are part of the key
+    convert(cache, CODE.format("javascript"))
+    convert(cache, CODE.format('python linenums="1"'))
+    convert(cache, CODE.format('python linenums="2"'))
+    assert highlighted == ["python", "javascript", "python", "python"]
+    convert(cache, CODE.format('python linenums="1"'))
+    assert len(highlighted) == 4
+
+
+def test_cache_size(tmp_path: Path, monkeypatch, highlighted: list):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("manki.toml").write_text('[general]\ntitle = "Code"\n')
+    config = MankiConfig(root=tmp_path)
+    # 2 kB
+    config.set("cache.highlight_size", 2 / 1024)
+    blocks = "".join(
+        f"# Chapter\n\n## Question {i}?\n\n" + CODE.format("python").replace("x", f"x{i}") for i in range(20)
+    )
+    MarkdownImporter(config).create_package({"code.md": blocks})
+    assert len(highlighted) == 20
+
+    entries = list(tmp_path.joinpath(".manki-cache", "highlight").glob("*/*"))
+    assert 0 < len(entries) < 20
+    assert sum(path.stat().st_size for path in entries) <= 2 * 1024
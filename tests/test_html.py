@@ -0,0 +1,94 @@
+from pathlib import Path
+import re
+
+import pytest
+
+from manki.configuration import MankiConfig
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.exporter.exporter_html import HTMLExporter
+
+
+def create_package(answer: str = "Answer") -> QAPackage:
+    chapters = [
+        QAChapter("One", [QAItem(f"<p>Question {i}</p>", f"<p>{answer} {i}</p>") for i in range(5)]),
+        QAChapter("Two", [QAItem("<p>Another question</p>", "<p>Another answer</p>")]),
+    ]
+    return QAPackage("Paged", "Author", chapters)
+
+
+@pytest.fixture
+def config(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("manki.toml").write_text('[general]\ntitle = "Paged"\n')
+    config = MankiConfig(root=tmp_path)
+    config.set("output.html.paginate", True)
+    config.set("output.html.page_size", 2)
+    return config
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """The questions of the first item of every page that is rendered (i.e. not loaded from the cache)."""
+    pages = []
+    render_template = HTMLExporter.render_template
+
+    def counting_render_template(self, name, **context):
+        if name == "html/chapter.html.j2":
+            pages.append(context["chapter"]["items"][0]["question"])
+        return render_template(self, name, **context)
+
+    monkeypatch.setattr(HTMLExporter, "render_template", counting_render_template)
+    return pages
+
+
+def links(path: Path) -> list:
+    return re.findall(r'<a href="([^"#]+\.html)[^"]*"', path.read_text())
+
+
+def test_pages(tmp_path: Path, config: MankiConfig, rendered: list):
+    HTMLExporter(config.freeze(), create_package()).export()
+
+    # the first chapter is split into three pages, the pages of a chapter share its title
+    pages = ["paged-001.html", "paged-002.html", "paged-003.html", "paged-004.html"]
+    assert {path.name for path in tmp_path.glob("*.html")} == {"paged.html", *pages}
+    assert len(rendered) == 4
+    index = tmp_path.joinpath("paged.html").read_text()
+    for title in ["One (1/3)", "One (2/3)", "One (3/3)", "Two"]:
+        assert title in index
+    # the navigation links the chapters to their first page, the content lists all pages
+    assert links(tmp_path.joinpath("paged.html")) == ["paged-001.html", "paged-004.html", "paged.html", *pages]
+    # a page links to the previous and the next page and to the content
+    assert links(tmp_path.joinpath("paged-002.html"))[-3:] == ["paged-001.html", "paged.html", "paged-003.html"]
+    assert "Question 2" in tmp_path.joinpath("paged-002.html").read_text()
+    assert "Question 4" in tmp_path.joinpath("paged-003.html").read_text()
+
+
+def test_rebuild_renders_changed_pages(tmp_path: Path, config: MankiConfig, rendered: list):
+    HTMLExporter(config.freeze(), create_package()).export()
+    rendered.clear()
+    HTMLExporter(config.freeze(), create_package()).export()
+    assert rendered == []
+
+    package = create_package()
+    package.chapters[0].items[3].answer = "<p>Changed</p>"
+    HTMLExporter(config.freeze(), package).export()
+    assert rendered == ["<p>Question 2</p>"]
+    assert "Changed" in tmp_path.joinpath("paged-002.html").read_text()
+
+    # the pages of a chapter that shrinks are removed
+    package.chapters[0].remove_item(package.chapters[0].items[4])
+    HTMLExporter(config.freeze(), package).export()
+    assert sorted(path.name for path in tmp_path.glob("paged-*.html")) == [
+        "paged-001.html",
+        "paged-002.html",
+        "paged-003.html",
+    ]
+
+
+def test_cache_size(tmp_path: Path, config: MankiConfig, rendered: list):
+    # without room in the cache, every page is rendered again
+    config.set("cache.html_size", 0)
+    HTMLExporter(config.freeze(), create_package()).export()
+    HTMLExporter(config.freeze(), create_package()).export()
+    assert len(rendered) == 8
+    assert list(tmp_path.joinpath(".manki-cache", "html").glob("*/*")) == []
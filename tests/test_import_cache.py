@@ -0,0 +1,113 @@
+from pathlib import Path
+import shutil
+
+import pytest
+
+from manki.configuration import MankiConfig
+from manki.importer import importer_markdown
+from manki.importer.base import iter_sources
+from manki.importer.importer_markdown import MarkdownImporter
+
+TEST_DIR = Path(__file__).parent
+SOURCE = """# Chapter
+
+## A question?
+
+An image: ![Image](./img/{}.png)
+"""
+
+
+@pytest.fixture
+def root(tmp_path: Path):
+    root = tmp_path.joinpath("project")
+    root.mkdir()
+    root.joinpath("manki.toml").write_text('[general]\ntitle = "Cache"\n\n[input]\nsource = ["source.md"]\n')
+    root.joinpath("source.md").write_text(SOURCE.format("a"))
+    root.joinpath("img").mkdir()
+    shutil.copy(TEST_DIR.joinpath("images", "img", "kernel_machine.png"), root.joinpath("img", "a.png"))
+    return root
+
+
+@pytest.fixture
+def conversions(monkeypatch):
+    """Counts the sources that are converted (i.e. not loaded from the cache)."""
+    calls = []
+    fix_math = MarkdownImporter._fix_math
+
+    def counting_fix_math(self, source):
+        calls.append(source)
+        return fix_math(self, source)
+
+    monkeypatch.setattr(MarkdownImporter, "_fix_math", counting_fix_math)
+    return calls
+
+
+def build(root: Path, **settings):
+    config = MankiConfig(root=root)
+    for name, value in settings.items():
+        config.set(name, value)
+    importer = MarkdownImporter(config)
+    return importer, importer.create_package(dict(iter_sources(config)))
+
+
+def test_cache_hit(root: Path, conversions: list):
+    _, package = build(root)
+    assert len(conversions) == 1
+    _, cached = build(root)
+    assert len(conversions) == 1
+    assert cached.to_dict() == package.to_dict()
+    assert cached.media.all_paths() == package.media.all_paths() == [root.joinpath("img", "a.png").resolve()]
+
+
+def test_cache_invalidation(root: Path, conversions: list, monkeypatch):
+    build(root)
+    root.joinpath("source.md").write_text(SOURCE.format("a") + "\nChanged.\n")
+    build(root)
+    assert len(conversions) == 2
+
+    monkeypatch.setitem(importer_markdown.EXTENSION_CONFIG, "mdx_math", {"enable_dollar_delimiter": False})
+    build(root)
+    assert len(conversions) == 3
+
+    # another version of a library that converts the sources
+    monkeypatch.setattr(importer_markdown.pygments, "__version__", "0.0")
+    build(root)
+    assert len(conversions) == 4
+
+    pytest.importorskip("lxml")
+    build(root, **{"processor.html_parser": "lxml"})
+    assert len(conversions) == 5
+    build(root, **{"processor.html_parser": "lxml"})
+    assert len(conversions) == 5
+
+
+def test_image_added_after_cached_build(root: Path, conversions: list):
+    root.joinpath("source.md").write_text(SOURCE.format("b"))
+    importer, package = build(root)
+    image = root.joinpath("img", "b.png").resolve()
+    assert package.media.all_paths() == []
+    assert importer.missing_media == {image}
+
+    # the source is not converted again, but the image is found now
+    shutil.copy(root.joinpath("img", "a.png"), image)
+    importer, package = build(root)
+    assert len(conversions) == 1
+    assert package.media.all_paths() == [image]
+    assert importer.missing_media == set()
+
+
+def test_images_checked_once(root: Path, monkeypatch):
+    root.joinpath("source.md").write_text(SOURCE.format("a") + "\n![Again](img/a.png) ![Missing](img/b.png)\n" * 3)
+    checked = []
+    is_file = Path.is_file
+
+    def counting_is_file(self):
+        if self.parent.name == "img":
+            checked.append(self.name)
+        return is_file(self)
+
+    monkeypatch.setattr(Path, "is_file", counting_is_file)
+    importer, package = build(root)
+    assert sorted(checked) == ["a.png", "b.png"]
+    assert package.media.all_paths() == [root.joinpath("img", "a.png").resolve()]
+    assert importer.missing_media == {root.joinpath("img", "b.png").resolve()}
@@ -0,0 +1,25 @@
+from pathlib import Path
+import shutil
+
+import pytest
+
+from manki.configuration import MankiConfig
+from manki.importer.base import iter_sources
+from manki.importer.importer_markdown import MarkdownImporter
+
+TEST_DIR = Path(__file__).parent
+
+
+def import_package(root: Path, jobs: int) -> dict:
+    config = MankiConfig(root=root)
+    config.set("cache.enabled", False)
+    config.set("input.jobs", jobs)
+    importer = MarkdownImporter(config, memoize=False)
+    return importer.create_package(dict(iter_sources(config))).to_dict()
+
+
+@pytest.mark.parametrize("directory", ["plain", "math", "images", "code"])
+def test_same_package_with_several_processes(tmp_path: Path, directory: str):
+    root = tmp_path.joinpath(directory)
+    shutil.copytree(TEST_DIR.joinpath(directory), root, ignore=shutil.ignore_patterns(".*"))
+    assert import_package(root, jobs=2) == import_package(root, jobs=1)
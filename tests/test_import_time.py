@@ -0,0 +1,51 @@
+from typing import Dict
+import subprocess
+import sys
+import pytest
+
+from manki.exporter import EXPORTERS, get_exporter
+
+
+# modules that are only needed by some formats or commands and must not slow down the start of every other one
+HEAVY_MODULES = ["genanki", "pdfkit", "PIL", "http.server"]
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """Runs `code` in a fresh interpreter with `-X importtime` and returns the cumulative import time (in µs) of every
+    imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_main_imports_no_exporter():
+    times = _import_times("import manki.main")
+    print(f"Importing manki.main took {times['manki.main'] / 1000:.0f} ms")
+    for module in HEAVY_MODULES + [path.partition(":")[0] for path in EXPORTERS.values()]:
+        assert module not in times, f"'{module}' is imported by 'manki.main'"
+
+
+@pytest.mark.parametrize("name", ["html", "pdf"])
+def test_exporter_imports_only_its_format(name):
+    # `-X importtime` only times the import machinery behind import statements. The module that `get_exporter` loads
+    # with `importlib.import_module` is missing from its report (only the modules it imports itself are listed), so
+    # the loaded modules are taken from `sys.modules` instead.
+    code = f"import sys; from manki.exporter import get_exporter; get_exporter({name!r}); print(*sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    modules = result.stdout.split()
+    assert EXPORTERS[name].partition(":")[0] in modules
+    assert "genanki" not in modules
+
+
+def test_get_exporter():
+    assert get_exporter("html").__name__ == "HTMLExporter"
+    with pytest.raises(KeyError):
+        get_exporter("unknown-format")
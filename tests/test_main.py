@@ -0,0 +1,109 @@
+from argparse import Namespace
+from pathlib import Path
+import json
+import random
+import shutil
+import sqlite3
+import sys
+import zipfile
+
+import pytest
+
+from manki import main as manki_main
+from manki.configuration import MankiConfig
+from manki.exporter import get_exporter
+from manki.importer.base import iter_sources
+from manki.importer.importer_markdown import MarkdownImporter
+
+TEST_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def root(tmp_path: Path):
+    root = tmp_path.joinpath("plain")
+    shutil.copytree(TEST_DIR.joinpath("plain"), root, ignore=shutil.ignore_patterns(".*"))
+    return root
+
+
+def read_outputs(directory: Path) -> dict:
+    """Returns the HTML files and the notes, cards and media of the Anki package (without IDs and timestamps)."""
+    outputs = {path.name: path.read_text() for path in directory.glob("*.html")}
+    (apkg,) = directory.glob("*.apkg")
+    with zipfile.ZipFile(apkg) as archive:
+        archive.extract("collection.anki2", directory)
+        outputs["media"] = {name: archive.read(idx) for idx, name in json.loads(archive.read("media")).items()}
+    conn = sqlite3.connect(directory.joinpath("collection.anki2"))
+    outputs["notes"] = conn.execute("SELECT guid, flds, tags FROM notes ORDER BY rowid").fetchall()
+    outputs["cards"] = conn.execute(
+        "SELECT n.guid, c.did, c.ord FROM cards c JOIN notes n ON c.nid = n.id ORDER BY c.rowid"
+    ).fetchall()
+    conn.close()
+    return outputs
+
+
+def test_formats_without_duplicates(root: Path):
+    config = MankiConfig(root=root)
+    assert manki_main.get_exporters(config, Namespace(format=" html,apkg , html")) == [
+        get_exporter("html"),
+        get_exporter("apkg"),
+    ]
+    config.set("output.formats", ["apkg", "apkg"])
+    assert manki_main.get_exporters(config, Namespace(format=None)) == [get_exporter("apkg")]
+
+
+def test_exporters_get_frozen_configurations(root: Path):
+    config = MankiConfig(root=root)
+    pack = MarkdownImporter(config).create_package(dict(iter_sources(config)))
+    exporters = manki_main.process_package(config, pack, [get_exporter("html"), get_exporter("apkg")], [])
+    assert len({id(exporter.config) for exporter in exporters} | {id(config)}) == 3
+    for exporter in exporters:
+        with pytest.raises(TypeError):
+            exporter.config.set("general.title", "Changed")
+        assert exporter.config.get("general.title") == "plain"
+    # only the copies are frozen
+    config.set("general.title", "Changed")
+    assert [exporter.config.get("general.title") for exporter in exporters] == ["plain", "plain"]
+
+
+def test_several_formats(root: Path, tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path.joinpath("github_output")
+    monkeypatch.setenv("GITHUB_OUTPUT", str(output))
+    monkeypatch.setattr(sys, "argv", ["manki", "--root", str(root), "-f", "html,apkg,html", "--git-action"])
+    # `main` installs the tracebacks of rich
+    monkeypatch.setattr(sys, "excepthook", sys.excepthook)
+    manki_main.main()
+
+    assert tmp_path.joinpath("plain.html").is_file()
+    assert tmp_path.joinpath("plain.apkg").is_file()
+    # the log describes the Anki package, although it is not the first format
+    (log,) = output.read_text().splitlines()
+    assert log.startswith("conversion-log=Exporting 'plain.apkg' with ")
+
+
+@pytest.mark.parametrize("max_questions", [None, 0, 2])
+def test_streamed_export(tmp_path: Path, monkeypatch, max_questions):
+    root = tmp_path.joinpath("images")
+    shutil.copytree(TEST_DIR.joinpath("images"), root, ignore=shutil.ignore_patterns(".*"))
+    outputs = []
+    for stream in [False, True]:
+        directory = tmp_path.joinpath(f"stream-{stream}")
+        directory.mkdir()
+        monkeypatch.chdir(directory)
+        config = MankiConfig(root=root)
+        config.set("general.stream", stream)
+        if max_questions is not None:
+            config.set("processor.randomquestions.max_questions", max_questions)
+            config.set("processor.randomquestions.start_after", 1)
+            config.set("processor.randomquestions.questions", [["Random question", "Random answer"]])
+        # the random questions are inserted at the same positions in both runs
+        random.seed(0)
+        exporters = manki_main.create_exporters(
+            config, MarkdownImporter(config), [get_exporter("html"), get_exporter("apkg")]
+        )
+        manki_main.export_all(exporters)
+        outputs.append(read_outputs(directory))
+
+    assert outputs[1] == outputs[0]
+    assert outputs[0]["media"] and outputs[0]["notes"]
+    assert sum("Random question" in fields for _, fields, _ in outputs[0]["notes"]) == (max_questions or 0)
@@ -0,0 +1,93 @@
+from pathlib import Path
+import os
+import shutil
+
+import pytest
+
+from manki.configuration import MankiConfig
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.media import MediaRegistry, file_hash
+
+TEST_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def images(tmp_path: Path):
+    """Two images named "a.png" with different contents and a copy of the first one."""
+    for directory, name, data in [("one", "a.png", b"first"), ("two", "a.png", b"second"), ("two", "b.png", b"first")]:
+        tmp_path.joinpath(directory).mkdir(exist_ok=True)
+        tmp_path.joinpath(directory, name).write_bytes(data)
+    return [tmp_path.joinpath("one", "a.png"), tmp_path.joinpath("two", "a.png"), tmp_path.joinpath("two", "b.png")]
+
+
+def test_renaming(images: list):
+    first, second, copy = images
+    media = MediaRegistry()
+    assert media.add(first) == "a.png"
+    assert media.add(first) == "a.png"
+    # a different file of the same name is renamed by the hash of its content
+    renamed = f"a_{file_hash(second)[:8]}.png"
+    assert media.add(second) == renamed
+    assert media.add(copy) == "b.png"
+    assert media.add(first.with_name("missing.png")) is None
+    assert media.files() == [("a.png", first), (renamed, second), ("b.png", copy)]
+    assert media.aliases() == []
+    assert len(media) == 3
+
+
+def test_hashing(images: list):
+    first, second, copy = images
+    media = MediaRegistry(hashing=True)
+    for path in [copy, first, second]:
+        media.add(path)
+    # the identical file is stored once, under the name of the first one
+    assert media.name(first) == "b.png"
+    assert media.files() == [("b.png", copy), ("a.png", second)]
+    assert media.aliases() == [(first, "b.png")]
+
+
+def test_replace(images: list, tmp_path: Path):
+    first, second, copy = images
+    media = MediaRegistry(hashing=True)
+    for path in images:
+        media.add(path)
+    converted = tmp_path.joinpath("converted.webp")
+    converted.write_bytes(b"converted")
+    # the name keeps its stem and the identical file uses the replacement, too
+    assert media.replace(first, converted) == "a.webp"
+    assert media.replace(copy, converted) == "a.webp"
+    assert media.replace(tmp_path.joinpath("unknown.png"), converted) is None
+    renamed = f"a_{file_hash(second)[:8]}.png"
+    assert media.files() == [(renamed, second), ("a.webp", converted)]
+    assert media.aliases() == [(first, "a.webp"), (copy, "a.webp")]
+    assert list(media) == [second, converted]
+    # the registry is restored with the replacements
+    restored = MediaRegistry.from_files(media.files(), media.aliases())
+    assert restored == media
+    assert restored.replace(second, converted) == "a.webp"
+    assert restored.files() == [("a.webp", converted)]
+
+
+def test_processor_without_cache(tmp_path: Path):
+    pytest.importorskip("PIL")
+    from manki.processor.media import MediaProcessor
+
+    tmp_path.joinpath("manki.toml").write_text('[general]\ntitle = "Images"\n')
+    shutil.copy(TEST_DIR.joinpath("images", "img", "kernel_machine.png"), tmp_path.joinpath("image.png"))
+    config = MankiConfig(root=tmp_path)
+    config.set("cache.enabled", False)
+    config.set("processor.media.format", "jpeg")
+    media = MediaRegistry()
+    media.add(tmp_path.joinpath("image.png").resolve())
+    item = QAItem('<p><img src="image.png"></p>', "<p>Answer</p>", media=["image.png"])
+    package = QAPackage("Images", "Author", [QAChapter("One", [item])], media)
+    MediaProcessor(config, package).process()
+
+    ((name, path),) = media.files()
+    assert name == "image.jpg" and path.is_file()
+    # the converted image is not written to the cache directory of the project
+    assert tmp_path not in path.parents
+    assert not tmp_path.joinpath(".manki-cache").exists()
+    assert item.media == [Path(os.path.relpath(path, tmp_path)).as_posix()]
+    # no temporary files are left behind
+    assert list(path.parent.glob("*.tmp")) == []
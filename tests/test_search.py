@@ -0,0 +1,97 @@
+from pathlib import Path
+import json
+import re
+import unicodedata
+
+from manki import search
+from manki.configuration import MankiConfig
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.exporter.exporter_html import HTMLExporter
+from manki.search import SearchIndex
+
+
+def read_index(path: Path) -> dict:
+    script = path.read_text(encoding="utf-8")
+    assert script.startswith("window.MANKI_SEARCH=") and script.endswith(";\n")
+    return json.loads(script[len("window.MANKI_SEARCH=") : -2])
+
+
+def postings(index: dict) -> dict:
+    """Returns the IDs of the items of every word (instead of their differences)."""
+    ids = {}
+    for word, deltas in zip(index["words"], index["postings"]):
+        ids[word] = [sum(deltas[: i + 1]) for i in range(len(deltas))]
+    return ids
+
+
+def test_index():
+    index = SearchIndex()
+    index.add_chapter("One")
+    index.add_item(QAItem("<p>What is <b>Café</b> 10?</p>", "<p>It is $x^2$ and a</p>"), "#item-1")
+    index.add_item(QAItem("<p>" + "Long question " * 10 + "</p>", "<p>It is 𝔸𝔹 and ﬁx café</p>"), "#item-2")
+    index.add_chapter("Two")
+    index.add_item(QAItem("<p>Zebra 2020</p>", "<script>hidden()</script>"), "#item-3")
+    dct = index.to_dict()
+
+    assert dct["chapters"] == ["One", "Two"]
+    assert dct["docs"] == [
+        ["#item-1", "What is Café 10?", 0],
+        ["#item-2", ("Long question " * 10)[: search.TITLE_LENGTH - 1].rstrip() + "…", 0],
+        ["#item-3", "Zebra 2020", 1],
+    ]
+    # math, tags and single characters are not indexed. The words are sorted like JavaScript compares them: numbers
+    # as strings and characters outside of the BMP (surrogates) before "ﬁ" (U+FB01).
+    assert dct["words"][:-2] == ["10", "2020", "and", "café", "is", "it", "long", "question", "what", "zebra"]
+    assert dct["words"][-2:] == ["𝔸𝔹", "ﬁx"]
+    assert postings(dct) == {
+        "10": [0],
+        "2020": [2],
+        "and": [0, 1],
+        "café": [0, 1],
+        "is": [0, 1],
+        "it": [0, 1],
+        "long": [1],
+        "question": [1],
+        "what": [0],
+        "zebra": [2],
+        "𝔸𝔹": [1],
+        "ﬁx": [1],
+    }
+
+
+def test_same_words_as_javascript():
+    # `WORD_PATTERN` (letters, numbers and "_") describes the same characters as `\w`
+    assert search.WORD_PATTERN == r"[\p{L}\p{N}_]{2,}"
+    for code in range(0x10000):
+        char = chr(code)
+        assert bool(re.fullmatch(r"\w", char)) == (unicodedata.category(char)[0] in "LN" or char == "_"), hex(code)
+    # decomposed characters are composed like in the search box
+    assert search.words("Cafe\u0301 Au LAIT") == ["caf\u00e9", "au", "lait"]
+
+
+def test_paginated_index(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("manki.toml").write_text('[general]\ntitle = "Paged"\n')
+    config = MankiConfig(root=tmp_path)
+    for key, value in [("output.html.paginate", True), ("output.html.page_size", 2), ("output.html.search", True)]:
+        config.set(key, value)
+    chapters = [
+        QAChapter("One", [QAItem(f"<p>Question {i}</p>", "<p>Answer</p>") for i in range(3)]),
+        QAChapter("Two", [QAItem("<p>Another question</p>", "<p>Answer</p>")]),
+    ]
+    package = QAPackage("Paged", "Author", chapters)
+    HTMLExporter(config.freeze(), package).export()
+
+    index = read_index(tmp_path.joinpath("paged.search.js"))
+    items = [item.item_id for chapter in chapters for item in chapter.items]
+    # every item links to its page, the pages of a chapter share its title
+    assert index["chapters"] == ["One", "Two"]
+    assert index["docs"] == [
+        ["paged-001.html#item-%d" % items[0], "Question 0", 0],
+        ["paged-001.html#item-%d" % items[1], "Question 1", 0],
+        ["paged-002.html#item-%d" % items[2], "Question 2", 0],
+        ["paged-003.html#item-%d" % items[3], "Another question", 1],
+    ]
+    assert postings(index)["question"] == [0, 1, 2, 3]
+    for page in ["paged-001.html", "paged-002.html", "paged-003.html"]:
+        assert 'id="item-' in tmp_path.joinpath(page).read_text()
@@ -0,0 +1,79 @@
+from pathlib import Path
+import zlib
+
+import pytest
+
+from manki import snapshot
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.media import MediaRegistry
+
+
+def create_package(root: Path, author=("Author A", "Author B")) -> QAPackage:
+    root.joinpath("img").mkdir(parents=True)
+    for name, data in [("a.png", b"a"), ("b.png", b"b"), ("copy.png", b"a")]:
+        root.joinpath("img", name).write_bytes(data)
+    media = MediaRegistry(hashing=True)
+    for name in ["a.png", "b.png", "copy.png"]:
+        media.add(root.joinpath("img", name))
+    chapters = [
+        QAChapter(
+            "One",
+            [
+                QAItem("<p>Q1</p>", "<p>A1</p>", comment="A comment", tags=["week-1", "math"], media=["img/a.png"]),
+                QAItem("<p>Q2</p>", "<p>Ä2 ✓</p>", tags=["week-1"], media=["img/b.png", "img/copy.png"]),
+            ],
+        ),
+        QAChapter("Two", [QAItem("<p>Q3</p>", "<p>A3</p>")]),
+        QAChapter("Empty"),
+    ]
+    return QAPackage("Package", list(author) if isinstance(author, tuple) else author, chapters, media)
+
+
+def test_round_trip(tmp_path: Path):
+    package = create_package(tmp_path)
+    loaded = snapshot.loads(snapshot.dumps(package, tmp_path), tmp_path)
+    assert loaded.to_dict() == package.to_dict()
+    assert loaded.n_items == 3
+    assert loaded.media.files() == package.media.files()
+    assert loaded.media.aliases() == package.media.aliases()
+    assert [item.item_id for chap in loaded.chapters for item in chap.items] == [
+        item.item_id for chap in package.chapters for item in chap.items
+    ]
+
+
+@pytest.mark.parametrize("author", [None, "A single author", []])
+def test_missing_values(tmp_path: Path, author):
+    package = create_package(tmp_path, author)
+    loaded = snapshot.loads(snapshot.dumps(package, tmp_path), tmp_path)
+    assert loaded.author == author
+    assert [(item.comment, item.tags) for chap in loaded.chapters for item in chap.items] == [
+        ("A comment", ("week-1", "math")),
+        (None, ("week-1",)),
+        (None, None),
+    ]
+
+
+def test_media_relative_to_root(tmp_path: Path):
+    data = snapshot.dumps(create_package(tmp_path.joinpath("checkout")), tmp_path.joinpath("checkout"))
+    loaded = snapshot.loads(data, tmp_path.joinpath("other", "..", "moved"))
+    moved = tmp_path.joinpath("moved", "img").resolve()
+    assert loaded.media.files() == [("a.png", moved.joinpath("a.png")), ("b.png", moved.joinpath("b.png"))]
+    assert loaded.media.aliases() == [(moved.joinpath("copy.png"), "a.png")]
+
+
+def test_invalid_snapshot(tmp_path: Path):
+    data = snapshot.dumps(create_package(tmp_path), tmp_path)
+    with pytest.raises(ValueError, match="no Manki snapshot"):
+        snapshot.loads(b"MANKY" + data[5:], tmp_path)
+    version = snapshot._VERSION.pack(snapshot.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match="version"):
+        snapshot.loads(snapshot.MAGIC + version + data[len(snapshot.MAGIC) + len(version) :], tmp_path)
+    # truncated and changed snapshots
+    flipped = bytearray(data)
+    flipped[len(data) // 2] ^= 0x01
+    header = snapshot.MAGIC + snapshot._VERSION.pack(snapshot.FORMAT_VERSION)
+    # a valid zlib stream with too few numbers
+    short = header + zlib.compress(zlib.decompress(data[len(header) :])[:60])
+    for damaged in [data[:40], data[:-1], data[: len(snapshot.MAGIC) + 1], bytes(flipped), short]:
+        with pytest.raises(ValueError, match="damaged"):
+            snapshot.loads(damaged, tmp_path)
@@ -0,0 +1,87 @@
+from pathlib import Path
+import shutil
+import sqlite3
+
+import pytest
+
+from manki.configuration import MankiConfig
+from manki.data_struct import QAChapter, QAItem, QAPackage
+from manki.importer.base import iter_sources
+from manki.importer.importer_markdown import MarkdownImporter
+from manki.store import SQLitePackage
+
+TEST_DIR = Path(__file__).parent
+
+
+def create_chapters():
+    return [
+        QAChapter(
+            "One",
+            [
+                QAItem("<p>Q1</p>", "<p>A1</p>", tags=["week-1", "math"]),
+                QAItem("<p>Q2</p>", "<p>A2</p>", comment="A comment", tags=["week-2"]),
+                QAItem("<p>Q3</p>", "<p>A3</p>", media=["img/a.png"]),
+            ],
+        ),
+        QAChapter("Two", [QAItem("<p>Q4</p>", "<p>A4</p>", tags=["week-1"])]),
+        QAChapter("One", [QAItem("<p>Q5</p>", "<p>A5</p>", tags=["week-1"])]),
+    ]
+
+
+@pytest.fixture
+def package(tmp_path: Path):
+    package = SQLitePackage(tmp_path.joinpath("package.sqlite"), "Package", ["Author"])
+    for chapter in create_chapters():
+        package.add_chapter(chapter)
+    yield package
+    package.close()
+
+
+def test_same_dict_as_memory(package: SQLitePackage):
+    memory = QAPackage("Package", ["Author"], create_chapters())
+    assert package.to_dict() == memory.to_dict()
+    assert package.n_items == memory.n_items == 5
+
+
+def test_query(package: SQLitePackage):
+    chapter_id = package.chapters[0].chapter_id
+    assert [item.question for item in package.query(chapter_id=chapter_id)] == [
+        "<p>Q1</p>",
+        "<p>Q2</p>",
+        "<p>Q3</p>",
+        "<p>Q5</p>",
+    ]
+    assert [item.question for item in package.query(tag="week-1")] == ["<p>Q1</p>", "<p>Q4</p>", "<p>Q5</p>"]
+    assert [item.question for item in package.query(chapter_id=chapter_id, tag="week-1")] == ["<p>Q1</p>", "<p>Q5</p>"]
+    assert list(package.query(tag="unknown")) == []
+    assert package.chapter(package.chapters[1].chapter_id).title == "Two"
+    assert package.item(package.chapters[1].items[0].item_id).question == "<p>Q4</p>"
+
+
+def test_changed_items_are_stored(package: SQLitePackage):
+    for item in package.chapters[1].items:
+        item.answer = "<p>Changed</p>"
+        item.tags = ["week-3"]
+    assert [item.answer for item in package.query(tag="week-3")] == ["<p>Changed</p>"]
+    assert list(package.query(chapter_id=package.chapters[1].chapter_id, tag="week-1")) == []
+
+
+def test_parallel_import(tmp_path: Path):
+    # the workers must neither replace nor write the database of the main process
+    root = tmp_path.joinpath("images")
+    shutil.copytree(TEST_DIR.joinpath("images"), root, ignore=shutil.ignore_patterns(".*"))
+    config = MankiConfig(root=root)
+    config.set("cache.enabled", False)
+    expected = MarkdownImporter(config, store="memory").create_package(dict(iter_sources(config))).to_dict()
+
+    config.set("input.jobs", 2)
+    config.set("general.store", "sqlite")
+    package = MarkdownImporter(config).create_package(dict(iter_sources(config)))
+    try:
+        assert isinstance(package, SQLitePackage)
+        assert package.to_dict() == expected
+        conn = sqlite3.connect(package.path)
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone() == (package.n_items,)
+        conn.close()
+    finally:
+        package.close()